@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
-from .models import User, UserProfile, MembershipPlan, MembershipHistory
+from .models import User, UserProfile, MembershipPlan, MembershipHistory, UserStats
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -199,3 +199,11 @@ class MembershipHistoryAdmin(admin.ModelAdmin):
     def payment_amount_display(self, obj):
         return f"KSH {obj.payment_amount:,.2f}"
     payment_amount_display.short_description = 'Amount'
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'order_count', 'payment_count', 'booking_count', 'updated_at']
+    search_fields = ['user__email']
+    raw_id_fields = ['user']
+    readonly_fields = ['updated_at']
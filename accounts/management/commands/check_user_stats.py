@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import User, UserStats
+from accounts.stats import compute
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-user stats and report (or with --repair, fix) rows that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Overwrite drifted rows and create missing ones')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        fields = UserStats.counter_fields()
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        checked = drifted = missing = 0
+
+        for start in range(0, len(user_ids), options['batch_size']):
+            batch = user_ids[start:start + options['batch_size']]
+            with transaction.atomic():
+                rows = UserStats.objects.filter(user__in=batch)
+                if options['repair']:
+                    # Locked so a concurrent delta isn't overwritten by the repair
+                    rows = rows.select_for_update()
+                stored = {row.pk: row for row in rows}
+                expected = compute(batch)
+                stale, new = [], []
+                for user_id in batch:
+                    checked += 1
+                    row = stored.get(user_id)
+                    if row is None:
+                        missing += 1
+                        new.append(UserStats(user_id=user_id, **expected[user_id]))
+                        continue
+                    diff = {name: (getattr(row, name), value) for name, value in expected[user_id].items()
+                            if getattr(row, name) != value}
+                    if diff:
+                        drifted += 1
+                        self.stdout.write(f'User {user_id}: ' + ', '.join(
+                            f'{name} {stored_value} != {value}' for name, (stored_value, value) in diff.items()
+                        ))
+                        for name, value in expected[user_id].items():
+                            setattr(row, name, value)
+                        stale.append(row)
+                if options['repair']:
+                    UserStats.objects.bulk_create(new, ignore_conflicts=True)
+                    UserStats.objects.bulk_update(stale, fields)
+
+        summary = f'Checked {checked} users: {drifted} drifted, {missing} without stats.'
+        if options['repair']:
+            self.stdout.write(self.style.SUCCESS(summary + ' Repaired.'))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(summary + ' Run with --repair to fix them.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
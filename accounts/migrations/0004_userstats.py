@@ -0,0 +1,43 @@
+# Generated by Django 5.2.2 on 2026-10-17 03:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_membershipplan_user_address_user_membership_end_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('order_count', models.IntegerField(default=0)),
+                ('order_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('delivered_orders', models.IntegerField(default=0)),
+                ('delivered_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('successful_payments', models.IntegerField(default=0)),
+                ('failed_payments', models.IntegerField(default=0)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refund_count', models.IntegerField(default=0)),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('booking_count', models.IntegerField(default=0)),
+                ('pending_bookings', models.IntegerField(default=0)),
+                ('confirmed_bookings', models.IntegerField(default=0)),
+                ('completed_bookings', models.IntegerField(default=0)),
+                ('cancelled_bookings', models.IntegerField(default=0)),
+                ('completed_booking_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User Stats',
+                'verbose_name_plural': 'User Stats',
+            },
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import timedelta
 
+from core.contributions import difference
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -230,3 +232,62 @@ class MembershipHistory(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.plan.name} ({self.status})"
+
+
+class UserStats(models.Model):
+    """
+    A user's order, payment and booking totals, kept up to date by the
+    accounts signals so the stats endpoints read one row.
+    `manage.py check_user_stats --repair` fixes rows that drifted.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+
+    order_count = models.IntegerField(default=0)
+    order_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending_orders = models.IntegerField(default=0)
+    delivered_orders = models.IntegerField(default=0)
+    delivered_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    payment_count = models.IntegerField(default=0)
+    successful_payments = models.IntegerField(default=0)
+    failed_payments = models.IntegerField(default=0)
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refund_count = models.IntegerField(default=0)
+    refunded_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    booking_count = models.IntegerField(default=0)
+    pending_bookings = models.IntegerField(default=0)
+    confirmed_bookings = models.IntegerField(default=0)
+    completed_bookings = models.IntegerField(default=0)
+    cancelled_bookings = models.IntegerField(default=0)
+    completed_booking_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('User Stats')
+        verbose_name_plural = _('User Stats')
+
+    def __str__(self):
+        return f"{self.user_id} stats"
+
+    @classmethod
+    def counter_fields(cls):
+        return [
+            field.name for field in cls._meta.concrete_fields
+            if field.name not in ('user', 'updated_at')
+        ]
+
+    @classmethod
+    def apply_changes(cls, before, after):
+        """
+        Apply the difference between two {user_id: {field: value}}
+        contributions, e.g. an order's before and after a status change,
+        one UPDATE per user. Users without a row are skipped: their row is
+        computed in full when first read.
+        """
+        deltas = difference(before, after)
+        for user_id in sorted(deltas):
+            changes = {name: models.F(name) + value for name, value in deltas[user_id].items() if value}
+            if changes:
+                cls.objects.filter(user_id=user_id).update(**changes, updated_at=timezone.now())
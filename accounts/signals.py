@@ -0,0 +1,61 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models import F
+from django.dispatch import receiver
+from core.signals import post_bulk_create
+from .models import User, UserStats
+from .stats import SOURCES, contribution
+
+
+def _row(sender, instance):
+    owner, fields, _ = SOURCES[sender]
+    row = {name: getattr(instance, name) for name in fields}
+    # owner is a lookup path, e.g. payment__user_id for refunds
+    value = instance
+    for attribute in owner.split('__'):
+        value = getattr(value, attribute)
+    row['owner'] = value
+    return row
+
+
+def remember_user_stats(sender, instance, raw=False, **kwargs):
+    instance._user_stats_before = {}
+    if instance.pk and not instance._state.adding and not raw:
+        owner, fields, _ = SOURCES[sender]
+        row = sender.objects.filter(pk=instance.pk).values(*fields, owner=F(owner)).first()
+        instance._user_stats_before = contribution(sender, row)
+
+
+def update_user_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    after = contribution(sender, _row(sender, instance))
+    UserStats.apply_changes(getattr(instance, '_user_stats_before', {}), after)
+    instance._user_stats_before = after
+
+
+def remove_user_stats(sender, instance, **kwargs):
+    UserStats.apply_changes(contribution(sender, _row(sender, instance)), {})
+
+
+def bulk_add_user_stats(sender, instances, **kwargs):
+    after = {}
+    for instance in instances:
+        for user_id, values in contribution(sender, _row(sender, instance)).items():
+            row = after.setdefault(user_id, {})
+            for name, value in values.items():
+                row[name] = row.get(name, 0) + value
+    UserStats.apply_changes({}, after)
+
+
+for model in SOURCES:
+    pre_save.connect(remember_user_stats, sender=model, dispatch_uid=f'user_stats:{model._meta.label}')
+    post_save.connect(update_user_stats, sender=model, dispatch_uid=f'user_stats:{model._meta.label}')
+    post_delete.connect(remove_user_stats, sender=model, dispatch_uid=f'user_stats:{model._meta.label}')
+    post_bulk_create.connect(bulk_add_user_stats, sender=model, dispatch_uid=f'user_stats:{model._meta.label}')
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    # A new user has nothing to count yet
+    if created and not raw:
+        UserStats.objects.create(user=instance)
@@ -0,0 +1,135 @@
+"""
+Per-user stats.
+
+Each source row (order, payment, refund, booking) contributes a set of
+UserStats counters to its owner. The accounts signals apply the difference
+between a row's contribution before and after every save or delete; compute()
+derives the same counters from scratch with one GROUP BY query per table, for
+rows read for the first time and for check_user_stats.
+"""
+from django.db import IntegrityError, transaction
+
+from appointments.models import Booking, BookingStatus
+from core.stats import count, grouped, total
+from orders.models import Order, OrderStatus
+from payments.models import Payment, PaymentRefund, PaymentStatus
+
+from .models import UserStats
+
+
+def order_contribution(row):
+    status, amount = row['status'], row['total_amount'] or 0
+    delivered = status == OrderStatus.DELIVERED
+    return {
+        'order_count': 1,
+        'order_amount': amount,
+        'pending_orders': int(status == OrderStatus.PENDING),
+        'delivered_orders': int(delivered),
+        'delivered_amount': amount if delivered else 0,
+    }
+
+
+def payment_contribution(row):
+    completed = row['status'] == PaymentStatus.COMPLETED
+    return {
+        'payment_count': 1,
+        'successful_payments': int(completed),
+        'failed_payments': int(row['status'] == PaymentStatus.FAILED),
+        'paid_amount': row['amount'] if completed else 0,
+    }
+
+
+def refund_contribution(row):
+    if row['status'] != PaymentStatus.COMPLETED:
+        return {}
+    return {'refund_count': 1, 'refunded_amount': row['amount']}
+
+
+def booking_contribution(row):
+    status = row['status']
+    return {
+        'booking_count': 1,
+        'pending_bookings': int(status == BookingStatus.PENDING),
+        'confirmed_bookings': int(status == BookingStatus.CONFIRMED),
+        'completed_bookings': int(status == BookingStatus.COMPLETED),
+        'cancelled_bookings': int(status == BookingStatus.CANCELLED),
+        'completed_booking_amount': row['total_amount'] if status == BookingStatus.COMPLETED else 0,
+    }
+
+
+# model: (owner lookup, fields the contribution reads, contribution)
+SOURCES = {
+    Order: ('user_id', ['status', 'total_amount'], order_contribution),
+    Payment: ('user_id', ['status', 'amount'], payment_contribution),
+    PaymentRefund: ('payment__user_id', ['status', 'amount'], refund_contribution),
+    Booking: ('user_id', ['status', 'total_amount'], booking_contribution),
+}
+
+
+def contribution(model, row):
+    """{user_id: {counter: value}} a source row (dict with 'owner' and fields) adds"""
+    if not row or row.get('owner') is None:
+        return {}
+    values = SOURCES[model][2](row)
+    return {row['owner']: values} if values else {}
+
+
+def compute(user_ids):
+    """{user_id: {counter: value}} for every given user, from the source tables"""
+    per_user = {user_id: {name: 0 for name in UserStats.counter_fields()} for user_id in user_ids}
+    queries = [
+        (Order.objects.filter(user__in=user_ids), 'user_id', {
+            'order_count': count(),
+            'order_amount': total('total_amount'),
+            'pending_orders': count(status=OrderStatus.PENDING),
+            'delivered_orders': count(status=OrderStatus.DELIVERED),
+            'delivered_amount': total('total_amount', status=OrderStatus.DELIVERED),
+        }),
+        (Payment.objects.filter(user__in=user_ids), 'user_id', {
+            'payment_count': count(),
+            'successful_payments': count(status=PaymentStatus.COMPLETED),
+            'failed_payments': count(status=PaymentStatus.FAILED),
+            'paid_amount': total('amount', status=PaymentStatus.COMPLETED),
+        }),
+        (PaymentRefund.objects.filter(payment__user__in=user_ids, status=PaymentStatus.COMPLETED), 'payment__user_id', {
+            'refund_count': count(),
+            'refunded_amount': total('amount'),
+        }),
+        (Booking.objects.filter(user__in=user_ids), 'user_id', {
+            'booking_count': count(),
+            'pending_bookings': count(status=BookingStatus.PENDING),
+            'confirmed_bookings': count(status=BookingStatus.CONFIRMED),
+            'completed_bookings': count(status=BookingStatus.COMPLETED),
+            'cancelled_bookings': count(status=BookingStatus.CANCELLED),
+            'completed_booking_amount': total('total_amount', status=BookingStatus.COMPLETED),
+        }),
+    ]
+    for queryset, owner, metrics in queries:
+        for user_id, values in grouped(queryset, owner, metrics).items():
+            per_user[user_id].update(values)
+    return per_user
+
+
+def for_user(user):
+    """
+    The user's UserStats row, computed and stored on first use. Changes
+    saved while the row was being computed found no row to update, so once
+    it exists the counters are computed again under its lock: changes still
+    in flight then either hold the lock first (and are counted) or wait and
+    apply their delta after.
+    """
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is not None:
+        return stats
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(user=user, **compute([user.pk])[user.pk])
+    except IntegrityError:
+        # Created concurrently, its creator recomputes it
+        return UserStats.objects.get(user=user)
+    with transaction.atomic():
+        stats = UserStats.objects.select_for_update().get(user=user)
+        for name, value in compute([user.pk])[user.pk].items():
+            setattr(stats, name, value)
+        stats.save()
+    return stats
@@ -0,0 +1,81 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderStatus
+from payments.models import Payment, PaymentRefund, PaymentStatus
+
+from .models import User, UserStats
+from .stats import compute, for_user
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_counters_follow_status_changes(self):
+        order = Order.objects.create(user=self.user, subtotal=100, total_amount=100)
+        Order.objects.create(user=self.user, subtotal=50, total_amount=50, status=OrderStatus.DELIVERED)
+        order.status = OrderStatus.DELIVERED
+        order.save()
+
+        with self.assertNumQueries(1):
+            stats = self.client.get('/api/orders/stats/').data
+        self.assertEqual(stats, {
+            'total_orders': 2, 'pending_orders': 0, 'completed_orders': 2,
+            'total_spent': Decimal('150.00'), 'average_order_value': Decimal('75.00'),
+        })
+
+        payment = Payment.objects.create(user=self.user, amount=150, payment_method='mpesa', status=PaymentStatus.COMPLETED)
+        refund = PaymentRefund.objects.create(payment=payment, refund_id='R1', amount=20, reason='-')
+        refund.status = PaymentStatus.COMPLETED
+        refund.save()
+        stats = self.client.get('/api/payments/stats/').data
+        self.assertEqual((stats['successful_payments'], stats['total_amount']), (1, Decimal('150.00')))
+        self.assertEqual((stats['total_refunds'], stats['refund_amount']), (1, Decimal('20.00')))
+
+        order.delete()
+        self.assertEqual(self.client.get('/api/orders/stats/').data['total_orders'], 1)
+
+    def test_missing_row_is_computed_on_first_read(self):
+        Order.objects.create(user=self.user, subtotal=40, total_amount=40)
+        UserStats.objects.all().delete()
+        self.assertEqual(self.client.get('/api/orders/stats/').data['pending_orders'], 1)
+        self.assertTrue(UserStats.objects.filter(user=self.user).exists())
+
+    def test_change_saved_while_the_row_is_computed_is_kept(self):
+        UserStats.objects.all().delete()
+        calls = []
+
+        def compute_then_order(user_ids):
+            counters = compute(user_ids)
+            if not calls:
+                # Saved after the counters were read but before the row exists
+                Order.objects.create(user=self.user, subtotal=40, total_amount=40)
+            calls.append(user_ids)
+            return counters
+
+        with mock.patch('accounts.stats.compute', side_effect=compute_then_order):
+            stats = for_user(self.user)
+        self.assertEqual(stats.order_count, 1)
+        self.assertEqual(UserStats.objects.get().order_amount, Decimal('40.00'))
+
+    def test_check_repairs_drift(self):
+        Order.objects.create(user=self.user, subtotal=40, total_amount=40)
+        # QuerySet.update sends no signals
+        Order.objects.update(status=OrderStatus.DELIVERED)
+
+        out = StringIO()
+        call_command('check_user_stats', stdout=out)
+        self.assertIn('1 drifted', out.getvalue())
+        self.assertEqual(UserStats.objects.get().delivered_orders, 0)
+
+        call_command('check_user_stats', '--repair', stdout=StringIO())
+        stats = UserStats.objects.get()
+        self.assertEqual((stats.pending_orders, stats.delivered_orders), (0, 1))
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
+from core.mixins import CatalogVersionMixin
 from .models import UserProfile, MembershipPlan, MembershipHistory
 from .serializers import (
     UserRegistrationSerializer, 
@@ -140,8 +141,9 @@ def logout_view(request):
     except Exception as e:
         return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
-class MembershipPlansListView(generics.ListAPIView):
+class MembershipPlansListView(CatalogVersionMixin, generics.ListAPIView):
     """Get all available membership plans"""
+    catalog_groups = ('memberships',)
     queryset = MembershipPlan.objects.filter(is_active=True)
     serializer_class = MembershipPlanSerializer
     permission_classes = [permissions.AllowAny]
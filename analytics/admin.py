@@ -0,0 +1,31 @@
+from django.contrib import admin
+from .models import DailyBookingRollup, DailyPaymentRollup, DailySalesRollup
+
+
+class RollupAdmin(admin.ModelAdmin):
+    date_hierarchy = 'date'
+
+    # Maintained by analytics.rollups, edits would only drift from the source tables
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(RollupAdmin):
+    list_display = ['date', 'status', 'order_count', 'total_amount']
+    list_filter = ['status']
+
+
+@admin.register(DailyPaymentRollup)
+class DailyPaymentRollupAdmin(RollupAdmin):
+    list_display = ['date', 'payment_method', 'status', 'payment_count', 'amount']
+    list_filter = ['payment_method', 'status']
+
+
+@admin.register(DailyBookingRollup)
+class DailyBookingRollupAdmin(RollupAdmin):
+    list_display = ['date', 'therapist', 'status', 'booking_count', 'total_amount']
+    list_filter = ['status', 'therapist']
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AnalyticsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'analytics'
+
+    def ready(self):
+        from .rollups import connect_rollups
+        connect_rollups()
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from analytics.rollups import ROLLUPS, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily rollups from orders, payments and bookings (all days, or from --since on)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild, YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be a date, YYYY-MM-DD')
+
+        for spec in ROLLUPS:
+            rows = rebuild(spec, since=since)
+            self.stdout.write(f'{spec.model._meta.verbose_name_plural}: {rows} rows')
+        self.stdout.write(self.style.SUCCESS('Rollups rebuilt.'))
@@ -0,0 +1,58 @@
+from django.db import models
+from payments.models import PaymentMethod, PaymentStatus
+from orders.models import OrderStatus
+from appointments.models import BookingStatus
+from services.models import Therapist
+
+
+class DailySalesRollup(models.Model):
+    """Orders placed per day and status (see analytics.rollups)"""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    order_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status'], name='sales_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.order_count} orders, {self.total_amount}"
+
+
+class DailyPaymentRollup(models.Model):
+    """Payments created per day, status and method"""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=PaymentStatus.choices)
+    payment_method = models.CharField(max_length=20, choices=PaymentMethod.choices)
+    payment_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status', 'payment_method'], name='payment_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.payment_method} {self.status}: {self.payment_count} payments, {self.amount}"
+
+
+class DailyBookingRollup(models.Model):
+    """Bookings per appointment day, status and therapist"""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=BookingStatus.choices)
+    therapist = models.ForeignKey(Therapist, on_delete=models.CASCADE, related_name='booking_rollups')
+    booking_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status', 'therapist'], name='booking_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} therapist {self.therapist_id} {self.status}: {self.booking_count} bookings"
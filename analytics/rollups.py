@@ -0,0 +1,208 @@
+"""
+Daily rollups.
+
+Revenue and volume questions are answered from small per-day tables instead
+of scanning orders, payments and bookings. Each rollup row holds a count and
+an amount for one (date, key...) bucket. Saving or deleting a source row
+applies the difference between what the row contributed before and after
+(pre_save snapshot, post_save/post_delete delta), so a status change moves
+the row from one bucket to another in the same transaction as the change.
+Bulk inserts catch up through core's post_bulk_create signal. Updates that
+bypass signals (QuerySet.update, raw SQL, fixtures) leave the rollups
+behind: `manage.py rebuild_rollups --since` recomputes them.
+"""
+from dataclasses import dataclass, field
+from datetime import date as date_type
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from core.contributions import difference, merge
+from core.signals import post_bulk_create
+
+from .models import DailyBookingRollup, DailyPaymentRollup, DailySalesRollup
+
+
+@dataclass
+class RollupSpec:
+    model: type
+    source: str
+    # Source field giving the bucket's day, a DateTimeField is bucketed in local time
+    date_field: str
+    # Source attributes that key a bucket besides the date, same names on the rollup
+    keys: list
+    count_field: str
+    # rollup amount field -> source field summed into it
+    amounts: dict = field(default_factory=dict)
+
+    @property
+    def source_model(self):
+        return apps.get_model(self.source)
+
+    @property
+    def fields(self):
+        return [self.date_field, *self.keys, *self.amounts.values()]
+
+    def bucket_date(self, value):
+        if value is None:
+            return None
+        if isinstance(value, date_type) and not hasattr(value, 'hour'):
+            return value
+        return timezone.localtime(value).date()
+
+    def contribution(self, row):
+        """{bucket key: {measure: value}} a source row (dict of fields) adds"""
+        if not row:
+            return {}
+        day = self.bucket_date(row[self.date_field])
+        if day is None:
+            return {}
+        measures = {self.count_field: 1}
+        for target, source in self.amounts.items():
+            measures[target] = row[source] or 0
+        return {(day, *(row[key] for key in self.keys)): measures}
+
+
+ROLLUPS = [
+    RollupSpec(
+        model=DailySalesRollup, source='orders.Order', date_field='created_at',
+        keys=['status'], count_field='order_count', amounts={'total_amount': 'total_amount'},
+    ),
+    RollupSpec(
+        model=DailyPaymentRollup, source='payments.Payment', date_field='created_at',
+        keys=['status', 'payment_method'], count_field='payment_count', amounts={'amount': 'amount'},
+    ),
+    RollupSpec(
+        model=DailyBookingRollup, source='appointments.Booking', date_field='booking_date',
+        keys=['status', 'therapist_id'], count_field='booking_count', amounts={'total_amount': 'total_amount'},
+    ),
+]
+
+
+def apply_deltas(spec, deltas):
+    """Add {bucket key: {measure: delta}} to the rollup rows, creating missing buckets"""
+    # Sorted so concurrent writers lock shared buckets in the same order
+    for key in sorted(deltas, key=repr):
+        measures = deltas[key]
+        lookup = dict(zip(['date', *spec.keys], key))
+        increments = {name: F(name) + value for name, value in measures.items()}
+        if spec.model.objects.filter(**lookup).update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                spec.model.objects.create(**lookup, **measures)
+        except IntegrityError:
+            # Another transaction created the bucket first
+            spec.model.objects.filter(**lookup).update(**increments)
+
+
+def apply_many(spec, deltas):
+    """
+    apply_deltas() for many buckets at once: the existing rows are locked and
+    updated in one statement, the missing ones inserted in another
+    """
+    if not deltas:
+        return
+    key_fields = ['date', *spec.keys]
+    measures = [spec.count_field, *spec.amounts]
+    now = timezone.now()
+    with transaction.atomic():
+        rows = spec.model.objects.select_for_update().filter(date__in={key[0] for key in deltas})
+        existing = {tuple(getattr(row, name) for name in key_fields): row for row in rows}
+        changed, missing = [], {}
+        for key, delta in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                missing[key] = delta
+                continue
+            for name, value in delta.items():
+                setattr(row, name, getattr(row, name) + value)
+            row.updated_at = now
+            changed.append(row)
+        spec.model.objects.bulk_update(changed, [*measures, 'updated_at'], batch_size=500)
+        try:
+            with transaction.atomic():
+                spec.model.objects.bulk_create(
+                    [spec.model(**dict(zip(key_fields, key)), **delta) for key, delta in missing.items()],
+                    batch_size=500,
+                )
+        except IntegrityError:
+            # A concurrent writer created some of these buckets, go one by one
+            apply_deltas(spec, missing)
+
+
+def _snapshot(spec, instance):
+    return {name: getattr(instance, name) for name in spec.fields}
+
+
+def _receivers(spec):
+    attribute = f'_rollup_before_{spec.model._meta.model_name}'
+
+    def remember(sender, instance, raw=False, **kwargs):
+        before = None
+        if instance.pk and not instance._state.adding and not raw:
+            before = sender.objects.filter(pk=instance.pk).values(*spec.fields).first()
+        setattr(instance, attribute, spec.contribution(before))
+
+    def saved(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        before = getattr(instance, attribute, {})
+        apply_deltas(spec, difference(before, spec.contribution(_snapshot(spec, instance))))
+        setattr(instance, attribute, spec.contribution(_snapshot(spec, instance)))
+
+    def deleted(sender, instance, **kwargs):
+        apply_deltas(spec, difference(spec.contribution(_snapshot(spec, instance)), {}))
+
+    def bulk_created(sender, instances, **kwargs):
+        merged = merge(spec.contribution(_snapshot(spec, instance)) for instance in instances)
+        apply_many(spec, difference({}, merged))
+
+    return remember, saved, deleted, bulk_created
+
+
+def connect_rollups():
+    for spec in ROLLUPS:
+        remember, saved, deleted, bulk_created = _receivers(spec)
+        model = spec.source_model
+        uid = f'rollup:{spec.model._meta.label}'
+        pre_save.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
+        post_bulk_create.connect(bulk_created, sender=model, weak=False, dispatch_uid=uid)
+
+
+def rebuild(spec, since=None):
+    """Recompute a rollup's buckets from the source table (all of it, or from since on)"""
+    source = spec.source_model.objects.order_by()
+    date_field = spec.source_model._meta.get_field(spec.date_field)
+    is_datetime = date_field.get_internal_type() == 'DateTimeField'
+    day = TruncDate(spec.date_field) if is_datetime else F(spec.date_field)
+    if since is not None:
+        source = source.filter(**{f'{spec.date_field}__date__gte' if is_datetime else f'{spec.date_field}__gte': since})
+
+    measures = {spec.count_field: Count('pk')}
+    measures.update({target: Sum(source_field) for target, source_field in spec.amounts.items()})
+    rows = source.annotate(rollup_date=day).values('rollup_date', *spec.keys).annotate(**measures)
+
+    with transaction.atomic():
+        stale = spec.model.objects.all()
+        if since is not None:
+            stale = stale.filter(date__gte=since)
+        stale.delete()
+        spec.model.objects.bulk_create(
+            [
+                spec.model(
+                    date=row['rollup_date'],
+                    **{key: row[key] for key in spec.keys},
+                    **{name: row[name] or 0 for name in measures},
+                )
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+    return spec.model.objects.filter(**({'date__gte': since} if since is not None else {})).count()
@@ -0,0 +1,183 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from appointments.models import Booking, BookingStatus
+from orders.models import Order, OrderStatus
+from payments.models import Payment, PaymentMethod, PaymentRefund, PaymentStatus
+from services.models import Service, ServiceCategory, Therapist
+
+from .models import DailyBookingRollup, DailySalesRollup
+
+
+def rollup_rows(model, *fields):
+    return sorted(model.objects.filter(**{f'{fields[-1]}__gt': 0}).values_list(*fields))
+
+
+@override_settings(STATS_CACHE_TIMEOUT=0)
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='admin@example.com', password='secret', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def order(self, amount, status=OrderStatus.PENDING):
+        return Order.objects.create(user=self.user, subtotal=amount, total_amount=amount, status=status)
+
+    def test_status_change_moves_order_between_buckets(self):
+        order = self.order(100)
+        self.order(50, OrderStatus.DELIVERED)
+        order.status = OrderStatus.DELIVERED
+        order.save()
+        self.assertEqual(rollup_rows(DailySalesRollup, 'date', 'status', 'total_amount', 'order_count'), [
+            (self.today, OrderStatus.DELIVERED, Decimal('150.00'), 2),
+        ])
+
+        order.delete()
+        stats = self.client.get('/api/orders/dashboard-stats/').data
+        self.assertEqual(stats['total_orders'], 1)
+        self.assertEqual(stats['delivered_orders'], 1)
+        self.assertEqual(stats['total_revenue'], Decimal('50.00'))
+        self.assertEqual(stats['average_order_value'], Decimal('50.00'))
+
+    def test_rebuild_catches_up_with_bulk_updates(self):
+        self.order(100)
+        self.order(30)
+        # QuerySet.update sends no signals
+        Order.objects.update(status=OrderStatus.CANCELLED)
+        call_command('rebuild_rollups', since=self.today.isoformat(), stdout=open('/dev/null', 'w'))
+        self.assertEqual(rollup_rows(DailySalesRollup, 'status', 'order_count'), [
+            (OrderStatus.CANCELLED, 2),
+        ])
+
+    def test_therapist_revenue(self):
+        category = ServiceCategory.objects.create(name='Massage')
+        service = Service.objects.create(name='Deep tissue', category=category, description='-', price=80)
+        therapist = Therapist.objects.create(
+            user=User.objects.create_user(email='t@example.com', password='secret', first_name='Ann', last_name='M')
+        )
+        day = date(2026, 3, 2)
+        for hour, status in ((9, BookingStatus.COMPLETED), (11, BookingStatus.COMPLETED), (13, BookingStatus.CANCELLED)):
+            Booking.objects.create(
+                user=self.user, service=service, therapist=therapist, booking_date=day,
+                booking_time=time(hour), total_amount=80, status=status,
+            )
+        self.assertEqual(DailyBookingRollup.objects.count(), 2)
+
+        response = self.client.get('/api/appointments/therapist-revenue/', {'start': '2026-03-01', 'end': '2026-03-31'})
+        self.assertEqual(response.data, [{
+            'therapist_id': therapist.pk, 'therapist': 'Ann M', 'bookings': 2, 'revenue': Decimal('160.00'),
+        }])
+        later = self.client.get('/api/appointments/therapist-revenue/', {'start': str(day + timedelta(days=1))})
+        self.assertEqual(later.data, [])
+
+
+@override_settings(STATS_CACHE_TIMEOUT=0)
+class DashboardStatsTests(TestCase):
+    """Each dashboard is one query per table and agrees with counting the source rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password='secret', is_staff=True)
+        for amount, status in ((100, OrderStatus.PENDING), (40, OrderStatus.DELIVERED), (60, OrderStatus.DELIVERED),
+                               (25, OrderStatus.CANCELLED)):
+            Order.objects.create(user=cls.admin, subtotal=amount, total_amount=amount, status=status)
+        for amount, method, status in ((250, PaymentMethod.MPESA, PaymentStatus.COMPLETED),
+                                       (120, PaymentMethod.MPESA, PaymentStatus.FAILED),
+                                       (80, PaymentMethod.CARD, PaymentStatus.COMPLETED),
+                                       (10, PaymentMethod.CARD, PaymentStatus.PENDING)):
+            Payment.objects.create(user=cls.admin, amount=amount, payment_method=method, status=status)
+        PaymentRefund.objects.create(
+            payment=Payment.objects.filter(payment_method=PaymentMethod.MPESA).first(), refund_id='R1',
+            amount=50, reason='-', status=PaymentStatus.COMPLETED,
+        )
+        service = Service.objects.create(
+            name='Facial', category=ServiceCategory.objects.create(name='Face'), description='-', price=70,
+        )
+        therapist = Therapist.objects.create(user=User.objects.create_user(email='t@example.com', password='secret'))
+        today = timezone.localdate()
+        for day, hour, status in ((today, 9, BookingStatus.COMPLETED), (today, 11, BookingStatus.PENDING),
+                                  (today - timedelta(days=40), 9, BookingStatus.COMPLETED),
+                                  (today + timedelta(days=3), 9, BookingStatus.CANCELLED)):
+            Booking.objects.create(
+                user=cls.admin, service=service, therapist=therapist, booking_date=day,
+                booking_time=time(hour), total_amount=70, status=status,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_orders(self):
+        stats = self.get('/api/orders/dashboard-stats/', 1)
+        orders = Order.objects.all()
+        delivered = orders.filter(status=OrderStatus.DELIVERED)
+        revenue = sum(order.total_amount for order in delivered)
+        self.assertEqual(stats, {
+            'total_orders': orders.count(),
+            'pending_orders': orders.filter(status=OrderStatus.PENDING).count(),
+            'processing_orders': 0,
+            'shipped_orders': 0,
+            'delivered_orders': delivered.count(),
+            'cancelled_orders': orders.filter(status=OrderStatus.CANCELLED).count(),
+            'total_revenue': revenue,
+            'this_month_revenue': revenue,
+            'average_order_value': sum(order.total_amount for order in orders) / orders.count(),
+        })
+
+    def test_payments(self):
+        stats = self.get('/api/payments/dashboard-stats/', 2)  # payment rollups, refunds
+        completed = Payment.objects.filter(status=PaymentStatus.COMPLETED)
+        revenue = sum(payment.amount for payment in completed)
+        self.assertEqual(stats, {
+            'total_payments': Payment.objects.count(),
+            'successful_payments': completed.count(),
+            'failed_payments': Payment.objects.filter(status=PaymentStatus.FAILED).count(),
+            'pending_payments': Payment.objects.filter(status=PaymentStatus.PENDING).count(),
+            'total_revenue': revenue,
+            'average_payment': revenue / completed.count(),
+            'refund_count': 1,
+            'total_refunded': Decimal('50.00'),
+        })
+
+    def test_payment_methods(self):
+        stats = {row['payment_method']: row for row in self.get('/api/payments/methods-stats/', 1)}
+        self.assertEqual(len(stats), len(PaymentMethod.choices))
+        for method, name in PaymentMethod.choices:
+            payments = Payment.objects.filter(payment_method=method)
+            completed = payments.filter(status=PaymentStatus.COMPLETED)
+            self.assertEqual(stats[name]['count'], payments.count())
+            self.assertEqual(stats[name]['total_amount'], sum(payment.amount for payment in completed))
+            rate = completed.count() / payments.count() * 100 if payments else 0
+            self.assertEqual(stats[name]['success_rate'], round(rate, 2))
+
+    def test_bookings(self):
+        stats = self.get('/api/appointments/dashboard-stats/', 1)
+        today = timezone.localdate()
+        bookings = Booking.objects.all()
+        completed = bookings.filter(status=BookingStatus.COMPLETED)
+        self.assertEqual(stats, {
+            'total_bookings': bookings.count(),
+            'today_bookings': bookings.filter(booking_date=today).count(),
+            'pending_bookings': bookings.filter(status=BookingStatus.PENDING).count(),
+            'confirmed_bookings': 0,
+            'completed_bookings': completed.count(),
+            'cancelled_bookings': bookings.filter(status=BookingStatus.CANCELLED).count(),
+            'total_revenue': sum(booking.total_amount for booking in completed),
+            'this_month_revenue': sum(
+                booking.total_amount for booking in completed
+                if (booking.booking_date.year, booking.booking_date.month) == (today.year, today.month)
+            ),
+        })
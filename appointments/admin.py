@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Booking, BookingAddon, TimeSlot, BookingCancellation, 
-    BookingReschedule, RecurringBooking
+    BookingReschedule, RecurringBooking, SlotHold, SlotInventory
 )
 
 
@@ -117,3 +117,29 @@ class RecurringBookingAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related(
             'user', 'service', 'therapist__user'
         )
+
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ['user', 'therapist', 'service', 'booking_date', 'booking_time', 'end_time', 'expires_at']
+    list_filter = ['therapist', 'booking_date']
+    search_fields = ['user__email', 'therapist__user__first_name', 'therapist__user__last_name']
+    readonly_fields = ['created_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'service', 'therapist__user')
+
+
+@admin.register(SlotInventory)
+class SlotInventoryAdmin(admin.ModelAdmin):
+    list_display = ['therapist', 'date', 'start_time', 'end_time', 'state', 'booking']
+    list_filter = ['state', 'therapist']
+    date_hierarchy = 'date'
+    raw_id_fields = ['booking']
+
+    # Derived from bookings and schedules (appointments.inventory), edits would be overwritten
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,162 @@
+"""
+Availability engine.
+
+A therapist's day is a bitmap with one bit per minute (a Python int, bit 0 is
+00:00): working windows set bits, bookings and blocked time slots clear them.
+Loading a day costs one query per table whatever the number of therapists or
+candidate slots, and a candidate start is free when every minute of the
+service (plus its add-ons) is, so overlaps with longer bookings are caught,
+not just identical start times. Bookings are read by their starts_at/ends_at
+span, which includes add-ons and covers appointments running past midnight.
+Unexpired slot holds take time the same way as bookings.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from services.models import TherapistAvailability
+
+from .models import BLOCKING_STATUSES, Booking, SlotHold, TimeSlot
+
+MINUTES_PER_DAY = 24 * 60
+SLOT_STEP = 30  # minutes between candidate start times, counted from each window's start
+
+
+def schedule_group(therapist_id):
+    """CatalogVersion group bumped whenever the therapist's free time may have changed"""
+    return f'schedule:{therapist_id}'
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def span(start, end):
+    """Bitmap of the minutes in [start, end), clamped to the day"""
+    start, end = max(start, 0), min(end, MINUTES_PER_DAY)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def required_minutes(service, addons=()):
+    """How long a booking of service with the given add-ons takes"""
+    return service.duration + sum(addon.duration_minutes for addon in addons)
+
+
+@dataclass
+class DayAvailability:
+    date: object
+    therapist_id: int
+    windows: list  # [(start minute, end minute)] of the working windows
+    booked: int = 0
+    held: int = 0
+    blocked: int = 0
+    bookings: list = field(default_factory=list)  # [(start minute, end minute, booking id)]
+
+    @property
+    def busy(self):
+        return self.booked | self.held | self.blocked
+
+    @property
+    def free(self):
+        working = 0
+        for start, end in self.windows:
+            working |= span(start, end)
+        return working & ~self.busy
+
+    def is_free(self, start, minutes):
+        mask = span(start, start + minutes)
+        return start + minutes <= MINUTES_PER_DAY and self.free & mask == mask
+
+    def slots(self, minutes, step=SLOT_STEP):
+        """[(start, end)] times of every free slot that fits minutes"""
+        free = self.free
+        mask = (1 << minutes) - 1
+        found = []
+        for window_start, window_end in self.windows:
+            for start in range(window_start, window_end - minutes + 1, step):
+                if (free >> start) & mask == mask:
+                    found.append((to_time(start), to_time(start + minutes)))
+        return found
+
+
+def day_spans(starts_at, ends_at, end_date):
+    """(date, start minute, end minute) of each local day [starts_at, ends_at) covers, up to end_date"""
+    # A booking can run past midnight into the next day
+    date = timezone.localtime(starts_at).date()
+    while date <= end_date and timezone.make_aware(datetime.combine(date, time.min)) < ends_at:
+        day_start = timezone.make_aware(datetime.combine(date, time.min))
+        # Minutes from the day's midnight, clamped to the day
+        start = max((starts_at - day_start) // timedelta(minutes=1), 0)
+        end = min((ends_at - day_start) // timedelta(minutes=1), MINUTES_PER_DAY)
+        yield date, start, end
+        date += timedelta(days=1)
+
+
+def load_range(start_date, end_date, therapist_ids, exclude_booking=None, exclude_user=None):
+    """
+    {(therapist_id, date): DayAvailability} for every day from start_date to
+    end_date inclusive: the working windows, bookings, holds and blocked slots
+    of every therapist, one query each however long the range.
+    exclude_booking leaves one booking out, e.g. the one being rescheduled,
+    and exclude_user one client's own holds.
+    """
+    dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    days = {
+        (therapist_id, date): DayAvailability(date, therapist_id, [])
+        for therapist_id in therapist_ids for date in dates
+    }
+
+    weekly = {}
+    windows = TherapistAvailability.objects.filter(
+        therapist__in=therapist_ids, day_of_week__in={date.weekday() for date in dates}, is_active=True,
+    ).order_by('start_time').values_list('therapist_id', 'day_of_week', 'start_time', 'end_time')
+    for therapist_id, weekday, start, end in windows:
+        weekly.setdefault((therapist_id, weekday), []).append((to_minutes(start), to_minutes(end)))
+    for (therapist_id, date), day in days.items():
+        day.windows = weekly.get((therapist_id, date.weekday()), [])
+
+    range_start = timezone.make_aware(datetime.combine(start_date, time.min))
+    range_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    bookings = Booking.objects.filter(
+        therapist__in=therapist_ids, status__in=BLOCKING_STATUSES, starts_at__lt=range_end, ends_at__gt=range_start,
+    ).order_by()
+    if exclude_booking is not None:
+        bookings = bookings.exclude(pk=exclude_booking)
+    for booking_id, therapist_id, starts_at, ends_at in bookings.values_list('pk', 'therapist_id', 'starts_at', 'ends_at'):
+        for date, start, end in day_spans(starts_at, ends_at, end_date):
+            day = days.get((therapist_id, date))
+            if day is not None:
+                day.booked |= span(start, end)
+                day.bookings.append((start, end, booking_id))
+
+    holds = SlotHold.objects.filter(
+        therapist__in=therapist_ids, expires_at__gt=timezone.now(), starts_at__lt=range_end, ends_at__gt=range_start,
+    ).order_by()
+    if exclude_user is not None:
+        holds = holds.exclude(user=exclude_user)
+    for therapist_id, starts_at, ends_at in holds.values_list('therapist_id', 'starts_at', 'ends_at'):
+        for date, start, end in day_spans(starts_at, ends_at, end_date):
+            day = days.get((therapist_id, date))
+            if day is not None:
+                day.held |= span(start, end)
+
+    blocked = TimeSlot.objects.filter(
+        therapist__in=therapist_ids, date__range=(start_date, end_date), is_blocked=True,
+    ).order_by().values_list('therapist_id', 'date', 'start_time', 'end_time')
+    for therapist_id, date, start_time, end_time in blocked:
+        days[therapist_id, date].blocked |= span(to_minutes(start_time), to_minutes(end_time) or MINUTES_PER_DAY)
+
+    return days
+
+
+def load_day(date, therapist_ids, exclude_booking=None):
+    """{therapist_id: DayAvailability} for one date, see load_range()"""
+    days = load_range(date, date, therapist_ids, exclude_booking=exclude_booking)
+    return {therapist_id: day for (therapist_id, _), day in days.items()}
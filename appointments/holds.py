@@ -0,0 +1,71 @@
+"""
+Slot holds.
+
+Picking a slot at checkout places a SlotHold. Under the therapist lock
+save_booking() uses, the client's previous hold is given up and the time is
+checked against the therapist's working hours, bookings, blocked slots and
+other clients' holds, so clients racing for a popular slot are told apart
+here, before checkout, rather than when the booking is saved. Until it
+expires (SLOT_HOLD_SECONDS) a hold takes its time in availability queries,
+the slot inventory and every booking conflict check, except its owner's:
+confirm() turns it into a Booking. Expired holds stop counting at once;
+`manage.py expire_slot_holds`, run every minute, deletes them so the
+inventory and cached calendars offer the time again.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from services.models import Therapist
+
+from .availability import load_day, required_minutes, to_minutes
+from .models import Booking, BookingAddon, SlotHold
+from .scheduling import SlotConflict, save_booking
+
+
+def place(user, service, therapist_id, booking_date, booking_time, addons=()):
+    """Hold the time a booking of service with addons needs, raising SlotConflict when it isn't free"""
+    minutes = required_minutes(service, addons)
+    with transaction.atomic():
+        Therapist.objects.select_for_update().filter(pk=therapist_id).first()
+        # One hold per client, picking another slot gives up the previous one
+        SlotHold.objects.filter(user=user).delete()
+        day = load_day(booking_date, [therapist_id])[therapist_id]
+        if not day.is_free(to_minutes(booking_time), minutes):
+            raise SlotConflict()
+        hold = SlotHold.objects.create(
+            user=user, service=service, therapist_id=therapist_id, booking_date=booking_date,
+            booking_time=booking_time,
+            end_time=(datetime.combine(booking_date, booking_time) + timedelta(minutes=minutes)).time(),
+            expires_at=timezone.now() + timedelta(seconds=settings.SLOT_HOLD_SECONDS),
+        )
+        hold.addons.set(addons)
+    return hold
+
+
+def confirm(hold, notes=''):
+    """
+    Book the held time as a pending Booking and drop the hold. An expired
+    hold still books it unless someone has taken it since (SlotConflict).
+    """
+    addons = list(hold.addons.all())
+    booking = Booking(
+        user_id=hold.user_id, service=hold.service, therapist_id=hold.therapist_id,
+        booking_date=hold.booking_date, booking_time=hold.booking_time, end_time=hold.end_time,
+        total_amount=hold.service.price + sum(addon.price for addon in addons), notes=notes,
+    )
+    with transaction.atomic():
+        save_booking(booking)
+        BookingAddon.objects.bulk_create(
+            BookingAddon(booking=booking, addon=addon, price=addon.price) for addon in addons
+        )
+        hold.delete()
+    return booking
+
+
+def expire():
+    """Delete the holds that have expired, returns how many"""
+    _, deleted = SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted.get(SlotHold._meta.label, 0)
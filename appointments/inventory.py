@@ -0,0 +1,117 @@
+"""
+Slot inventory.
+
+SlotInventory materialises the availability engine for the booking horizon
+(today and the next SLOT_INVENTORY_DAYS - 1 days): one row per SLOT_STEP cell
+of every working window, marked free, held, booked or blocked. Reading a day's free
+slots is then one range scan of the (therapist, date, start_time) key. Each
+cell also records free_until, the minute its start's free time runs out
+(within its window), so a slot of any length is offered exactly when
+DayAvailability.slots() would offer it.
+
+Rows are derived, never edited: build_slot_inventory recomputes the whole
+horizon (run it daily so the horizon moves forward), and the appointments
+signals recompute a therapist's affected days whenever a booking, slot hold,
+blocked slot or working window changes, in the same transaction as the
+change. A hold's cells stay held until expire_slot_holds deletes it.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from services.models import Therapist
+
+from .availability import SLOT_STEP, load_range, span, to_minutes, to_time
+from .models import SlotInventory, SlotState
+
+
+def horizon():
+    """(first, last) day kept in the inventory"""
+    today = timezone.localdate()
+    return today, today + timedelta(days=settings.SLOT_INVENTORY_DAYS - 1)
+
+
+def in_horizon(date):
+    first, last = horizon()
+    return first <= date <= last
+
+
+def cells(day):
+    """SlotInventory rows (unsaved) for one DayAvailability"""
+    free = day.free
+    rows = {}
+    for window_start, window_end in day.windows:
+        for start in range(window_start, window_end, SLOT_STEP):
+            # First minute from start that isn't free, or the window's end
+            taken = ~free >> start & ((1 << (window_end - start)) - 1)
+            free_until = start + (taken & -taken).bit_length() - 1 if taken else window_end
+            if start in rows and to_minutes(rows[start].free_until) >= free_until:
+                continue  # overlapping windows, keep the longer run
+            end = min(start + SLOT_STEP, window_end)
+            mask = span(start, end)
+            booking_id = next((pk for b_start, b_end, pk in day.bookings if b_start < end and b_end > start), None)
+            if booking_id is not None:
+                state = SlotState.BOOKED
+            elif day.held & mask:
+                state = SlotState.HELD
+            elif day.blocked & mask:
+                state = SlotState.BLOCKED
+            else:
+                state = SlotState.FREE
+            rows[start] = SlotInventory(
+                therapist_id=day.therapist_id, date=day.date, start_time=to_time(start), end_time=to_time(end),
+                free_until=to_time(free_until),
+                state=state, booking_id=booking_id,
+            )
+    return list(rows.values())
+
+
+def refresh(therapist_ids, dates):
+    """Recompute the inventory of the given therapists on the given days (those in the horizon)"""
+    first, last = horizon()
+    dates = sorted({date for date in dates if first <= date <= last})
+    if not dates or not therapist_ids:
+        return 0
+    days = load_range(dates[0], dates[-1], therapist_ids)
+    rows = [row for (_, date), day in days.items() if date in dates for row in cells(day)]
+    with transaction.atomic():
+        SlotInventory.objects.filter(therapist__in=therapist_ids, date__in=dates).delete()
+        SlotInventory.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def build(days=None, batch_size=20):
+    """
+    Rebuild the first days of the horizon (all of it by default), batch_size
+    therapists at a time, and drop past days
+    """
+    first, last = horizon()
+    if days:
+        last = min(last, first + timedelta(days=days - 1))
+    dates = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    SlotInventory.objects.filter(date__lt=first).delete()
+    therapist_ids = list(Therapist.objects.order_by('pk').values_list('pk', flat=True))
+    built = 0
+    for start in range(0, len(therapist_ids), batch_size):
+        built += refresh(therapist_ids[start:start + batch_size], dates)
+    return built
+
+
+def free_slots(therapist_id, date, minutes):
+    """
+    [(start, end)] times where minutes fit in the free time of one working
+    window, one indexed read. None when the day has no cells (outside the
+    horizon, a day off, or not built yet).
+    """
+    found = []
+    rows = (
+        SlotInventory.objects.filter(therapist_id=therapist_id, date=date)
+        .order_by('start_time').values_list('start_time', 'free_until')
+    )
+    for start_time, free_until in rows:
+        start = to_minutes(start_time)
+        if to_minutes(free_until) - start >= minutes:
+            found.append((start_time, to_time(start + minutes)))
+    return found if rows else None
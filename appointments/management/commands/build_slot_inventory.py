@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from appointments.inventory import build
+
+
+class Command(BaseCommand):
+    help = 'Recompute the slot inventory from today on and drop past days (run daily to move the horizon forward)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SLOT_INVENTORY_DAYS,
+            help=f'Days to build, at most SLOT_INVENTORY_DAYS ({settings.SLOT_INVENTORY_DAYS})',
+        )
+        parser.add_argument('--batch-size', type=int, default=20, help='Therapists per transaction')
+
+    def handle(self, *args, **options):
+        built = build(days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Built {built} inventory slots.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from appointments.recurrence import expand_all
+
+
+class Command(BaseCommand):
+    help = 'Create the bookings of active recurring series up to RECURRING_HORIZON_DAYS ahead (run daily)'
+
+    def handle(self, *args, **options):
+        created, skipped = expand_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} recurring bookings, skipped {skipped} conflicting dates.'
+        ))
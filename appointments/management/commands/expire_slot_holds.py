@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from appointments.holds import expire
+
+
+class Command(BaseCommand):
+    help = 'Delete expired slot holds so their time is offered again (run every minute)'
+
+    def handle(self, *args, **options):
+        expired = expire()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {expired} expired slot holds.'))
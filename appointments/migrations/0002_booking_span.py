@@ -0,0 +1,82 @@
+# Generated by Django 5.2.2 on 2026-10-17 09:12
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BLOCKING_STATUSES = ('pending', 'confirmed', 'in_progress')
+
+
+def fill_spans(apps, schema_editor):
+    Booking = apps.get_model('appointments', 'Booking')
+    bookings = list(Booking.objects.select_related('service'))
+    for booking in bookings:
+        start = datetime.combine(booking.booking_date, booking.booking_time)
+        if booking.end_time:
+            end = datetime.combine(booking.booking_date, booking.end_time)
+            if end <= start:
+                end += timedelta(days=1)
+        else:
+            end = start + timedelta(minutes=booking.service.duration)
+            booking.end_time = end.time()
+        booking.starts_at, booking.ends_at = timezone.make_aware(start), timezone.make_aware(end)
+    Booking.objects.bulk_update(bookings, ['end_time', 'starts_at', 'ends_at'], batch_size=500)
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    statuses = ', '.join(f"'{status}'" for status in BLOCKING_STATUSES)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        'ALTER TABLE appointments_booking ADD CONSTRAINT booking_no_overlap '
+        "EXCLUDE USING gist (therapist_id WITH =, tstzrange(starts_at, ends_at, '[)') WITH &&) "
+        f'WHERE (status IN ({statuses}))'
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE appointments_booking DROP CONSTRAINT IF EXISTS booking_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='starts_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_spans, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='starts_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='ends_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='booking',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['therapist', 'starts_at', 'ends_at'], name='booking_therapist_span_idx'),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
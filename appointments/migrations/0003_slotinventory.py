@@ -0,0 +1,33 @@
+# Generated by Django 5.2.2 on 2026-10-17 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_booking_span'),
+        ('services', '0004_service_average_rating_service_rating_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('state', models.CharField(choices=[('free', 'Free'), ('held', 'Held'), ('booked', 'Booked'), ('blocked', 'Blocked')], default='free', max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_slots', to='appointments.booking')),
+                ('therapist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_inventory', to='services.therapist')),
+            ],
+            options={
+                'verbose_name_plural': 'Slot inventory',
+                'ordering': ['date', 'start_time'],
+                'constraints': [models.UniqueConstraint(fields=('therapist', 'date', 'start_time'), name='slot_inventory_key')],
+            },
+        ),
+    ]
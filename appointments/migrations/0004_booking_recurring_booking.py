@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-17 03:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_slotinventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='recurring_booking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='appointments.recurringbooking'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-17 03:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_booking_recurring_booking'),
+        ('services', '0004_service_average_rating_service_rating_count_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField()),
+                ('booking_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('starts_at', models.DateTimeField(editable=False)),
+                ('ends_at', models.DateTimeField(editable=False)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('addons', models.ManyToManyField(blank=True, to='services.serviceaddon')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.service')),
+                ('therapist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='services.therapist')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['expires_at'],
+                'indexes': [models.Index(fields=['therapist', 'starts_at', 'ends_at'], name='slot_hold_therapist_span_idx')],
+            },
+        ),
+    ]
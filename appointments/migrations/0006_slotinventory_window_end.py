@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_slothold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slotinventory',
+            name='window_end',
+            field=models.TimeField(blank=True, null=True),
+        ),
+    ]
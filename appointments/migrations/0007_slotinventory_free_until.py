@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-17 09:12
+
+import datetime
+
+from django.db import migrations, models
+
+
+def clear_inventory(apps, schema_editor):
+    # Derived rows, available_time_slots reads the engine until
+    # build_slot_inventory runs again
+    apps.get_model('appointments', 'SlotInventory').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_slotinventory_window_end'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_inventory, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='slotinventory',
+            name='window_end',
+        ),
+        migrations.AddField(
+            model_name='slotinventory',
+            name='free_until',
+            field=models.TimeField(default=datetime.time(0, 0)),
+            preserve_default=False,
+        ),
+    ]
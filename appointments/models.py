@@ -2,12 +2,20 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from datetime import datetime, timedelta
+from calendar import monthrange
+from datetime import date, datetime, timedelta
 from services.models import Service, Therapist, ServiceAddon
 
 User = get_user_model()
 
 
+def booking_span(booking_date, start_time, end_time):
+    """(starts_at, ends_at) of an appointment in local time, an end at or before the start is the next day"""
+    starts_at = timezone.make_aware(datetime.combine(booking_date, start_time))
+    ends_on = booking_date if end_time > start_time else booking_date + timedelta(days=1)
+    return starts_at, timezone.make_aware(datetime.combine(ends_on, end_time))
+
+
 class BookingStatus(models.TextChoices):
     PENDING = 'pending', 'Pending'
     CONFIRMED = 'confirmed', 'Confirmed'
@@ -17,6 +25,10 @@ class BookingStatus(models.TextChoices):
     NO_SHOW = 'no_show', 'No Show'
 
 
+# Bookings in these states hold their therapist's time
+BLOCKING_STATUSES = [BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS]
+
+
 class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
@@ -24,29 +36,57 @@ class Booking(models.Model):
     booking_date = models.DateField()
     booking_time = models.TimeField()
     end_time = models.TimeField(blank=True, null=True)
+    # The appointment as an instant range, kept in step with the fields above
+    # by save(); conflicts are checked on it (see appointments.scheduling)
+    starts_at = models.DateTimeField(editable=False)
+    ends_at = models.DateTimeField(editable=False)
     status = models.CharField(max_length=20, choices=BookingStatus.choices, default=BookingStatus.PENDING)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     notes = models.TextField(blank=True, help_text="Special requests or notes")
     is_first_time = models.BooleanField(default=False)
     reminder_sent = models.BooleanField(default=False)
+    recurring_booking = models.ForeignKey(
+        'RecurringBooking', on_delete=models.SET_NULL, blank=True, null=True, related_name='occurrences'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = ['therapist', 'booking_date', 'booking_time']
         ordering = ['-booking_date', '-booking_time']
+        indexes = [
+            models.Index(fields=['therapist', 'starts_at', 'ends_at'], name='booking_therapist_span_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.service.name} - {self.booking_date} {self.booking_time}"
 
-    def save(self, *args, **kwargs):
+    def refresh_span(self):
+        """Derive end_time (when unset) and starts_at/ends_at from the date and times"""
         if not self.end_time:
             # Calculate end time based on service duration
             start_datetime = datetime.combine(self.booking_date, self.booking_time)
             end_datetime = start_datetime + timedelta(minutes=self.service.duration)
             self.end_time = end_datetime.time()
+        self.starts_at, self.ends_at = booking_span(self.booking_date, self.booking_time, self.end_time)
+
+    def save(self, *args, **kwargs):
+        self.refresh_span()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'starts_at', 'ends_at'}
         super().save(*args, **kwargs)
 
+    def move(self, booking_date, booking_time, therapist=None):
+        """Point the booking at a new start (and therapist), keeping its length"""
+        if self.end_time:
+            starts_at, ends_at = booking_span(self.booking_date, self.booking_time, self.end_time)
+            length = ends_at - starts_at
+        else:
+            length = timedelta(minutes=self.service.duration)
+        self.booking_date, self.booking_time = booking_date, booking_time
+        self.end_time = (datetime.combine(booking_date, booking_time) + length).time()
+        if therapist is not None:
+            self.therapist = therapist
+
     @property
     def duration_minutes(self):
         if self.end_time:
@@ -105,6 +145,78 @@ class TimeSlot(models.Model):
         return timezone.now() > timezone.make_aware(slot_datetime)
 
 
+class SlotHold(models.Model):
+    """
+    A client's short-lived claim on a therapist's time between picking a slot
+    and confirming the booking: until expires_at it takes the time like an
+    active booking (see appointments.holds)
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='slot_holds')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    therapist = models.ForeignKey(Therapist, on_delete=models.CASCADE, related_name='slot_holds')
+    addons = models.ManyToManyField(ServiceAddon, blank=True)
+    booking_date = models.DateField()
+    booking_time = models.TimeField()
+    end_time = models.TimeField()
+    starts_at = models.DateTimeField(editable=False)
+    ends_at = models.DateTimeField(editable=False)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['expires_at']
+        indexes = [
+            models.Index(fields=['therapist', 'starts_at', 'ends_at'], name='slot_hold_therapist_span_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hold by {self.user.email} - {self.booking_date} {self.booking_time} until {self.expires_at}"
+
+    def save(self, *args, **kwargs):
+        self.starts_at, self.ends_at = booking_span(self.booking_date, self.booking_time, self.end_time)
+        super().save(*args, **kwargs)
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class SlotState(models.TextChoices):
+    FREE = 'free', 'Free'
+    HELD = 'held', 'Held'
+    BOOKED = 'booked', 'Booked'
+    BLOCKED = 'blocked', 'Blocked'
+
+
+class SlotInventory(models.Model):
+    """
+    One SLOT_STEP-long cell of a therapist's working hours and what occupies
+    it, precomputed for the booking horizon (see appointments.inventory)
+    """
+    therapist = models.ForeignKey(Therapist, on_delete=models.CASCADE, related_name='slot_inventory')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    # Where the free time from start_time ends, at the latest the end of the
+    # cell's working window (start_time itself when the cell starts busy)
+    free_until = models.TimeField()
+    state = models.CharField(max_length=10, choices=SlotState.choices, default=SlotState.FREE)
+    booking = models.ForeignKey(
+        Booking, on_delete=models.SET_NULL, blank=True, null=True, related_name='inventory_slots'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        verbose_name_plural = 'Slot inventory'
+        constraints = [
+            models.UniqueConstraint(fields=['therapist', 'date', 'start_time'], name='slot_inventory_key'),
+        ]
+
+    def __str__(self):
+        return f"Therapist {self.therapist_id} {self.date} {self.start_time}: {self.state}"
+
+
 class BookingCancellation(models.Model):
     CANCELLATION_REASONS = [
         ('client_request', 'Client Request'),
@@ -165,11 +277,31 @@ class RecurringBooking(models.Model):
     def __str__(self):
         return f"Recurring: {self.user.email} - {self.service.name} ({self.frequency})"
 
+    def occurrence_dates(self, until=None):
+        """The series' dates from start_date on, up to end_date, until and total_sessions"""
+        last = min(filter(None, [self.end_date, until]), default=None)
+        number = 0
+        while self.total_sessions is None or number < self.total_sessions:
+            if self.frequency == 'monthly':
+                # Same day of the month, the month's last day when it is shorter
+                month = self.start_date.month - 1 + number
+                year, month = self.start_date.year + month // 12, month % 12 + 1
+                occurrence = date(year, month, min(self.start_date.day, monthrange(year, month)[1]))
+            else:
+                weeks = 2 if self.frequency == 'bi_weekly' else 1
+                occurrence = self.start_date + timedelta(weeks=weeks * number)
+            if last is not None and occurrence > last:
+                return
+            yield occurrence
+            number += 1
+
     @property
     def next_booking_date(self):
-        if not self.is_active or (self.end_date and timezone.now().date() > self.end_date):
+        if not self.is_active:
             return None
-        
-        # Logic to calculate next booking date based on frequency
-        # This would need more complex logic based on existing bookings
+        today = timezone.localdate()
+        # The series ends at end_date or total_sessions, at most a year of dates is looked at
+        for occurrence in self.occurrence_dates(until=today + timedelta(days=400)):
+            if occurrence >= today:
+                return occurrence
         return None
@@ -0,0 +1,93 @@
+"""
+Recurring booking expansion.
+
+A RecurringBooking is materialised as Booking rows (recurring_booking set)
+up to a rolling horizon of RECURRING_HORIZON_DAYS. Expanding a series takes
+the therapist lock save_booking() uses, reads the series' existing
+occurrences and the therapist's availability over the span (working windows,
+bookings, blocked slots and other clients' holds, one query each through
+load_range()), skips dates where the time isn't free, and inserts the rest
+with one bulk_create. Derived data (stats, rollups, slot inventory) catches
+up through core's post_bulk_create signal.
+`manage.py expand_recurring_bookings`, run daily, moves every active series'
+horizon forward.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.signals import post_bulk_create
+from services.models import Therapist
+
+from .availability import load_range, to_minutes
+from .models import Booking, BookingStatus, RecurringBooking
+
+logger = logging.getLogger(__name__)
+
+
+def expand(series, until=None):
+    """
+    Create the series' missing occurrences from today up to until (default:
+    the horizon). Returns (created bookings, dates skipped because the
+    therapist is off, blocked, booked or held then).
+    """
+    today = timezone.localdate()
+    until = until or today + timedelta(days=settings.RECURRING_HORIZON_DAYS)
+    service = series.service
+    length = timedelta(minutes=service.duration)
+
+    with transaction.atomic():
+        Therapist.objects.select_for_update().filter(pk=series.therapist_id).first()
+        existing = set(series.occurrences.values_list('booking_date', flat=True))
+        candidates = []
+        for occurrence in series.occurrence_dates(until=until):
+            if occurrence < today or occurrence in existing:
+                continue
+            booking = Booking(
+                user_id=series.user_id, service=service, therapist_id=series.therapist_id,
+                booking_date=occurrence, booking_time=series.booking_time,
+                end_time=(datetime.combine(occurrence, series.booking_time) + length).time(),
+                status=BookingStatus.CONFIRMED, total_amount=service.price, recurring_booking=series,
+            )
+            booking.refresh_span()
+            candidates.append(booking)
+        if not candidates:
+            return [], []
+
+        days = load_range(
+            candidates[0].booking_date, candidates[-1].booking_date, [series.therapist_id],
+            exclude_user=series.user_id,
+        )
+        start, minutes = to_minutes(series.booking_time), service.duration
+        created, skipped = [], []
+        for booking in candidates:
+            if days[series.therapist_id, booking.booking_date].is_free(start, minutes):
+                created.append(booking)
+            else:
+                skipped.append(booking.booking_date)
+
+        Booking.objects.bulk_create(created)
+        post_bulk_create.send(sender=Booking, instances=created)
+
+    if skipped:
+        logger.info('Recurring booking %s: skipped %s, the therapist is not free', series.pk, skipped)
+    return created, skipped
+
+
+def expand_all(until=None):
+    """Expand every active series, one transaction each; returns (created, skipped) counts"""
+    created = skipped = 0
+    series_list = (
+        RecurringBooking.objects.filter(is_active=True)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=timezone.localdate()))
+        .select_related('service').order_by('pk')
+    )
+    for series in series_list.iterator():
+        made, missed = expand(series, until=until)
+        created += len(made)
+        skipped += len(missed)
+    return created, skipped
@@ -0,0 +1,76 @@
+"""
+Booking conflicts.
+
+Two active bookings of a therapist may not overlap, and a booking may not
+take time another client holds (see appointments.holds). Every path that
+places a booking (creation, edits, reschedule approval, recurring expansion)
+saves it through save_booking(), which locks the therapist row so concurrent
+requests for the same therapist queue up, then looks for an overlapping
+active booking or hold via the (therapist, starts_at, ends_at) indexes. On
+PostgreSQL the booking_no_overlap exclusion constraint backs this up, so
+writes that bypass save_booking() can't double-book either.
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from services.models import Therapist
+
+from .models import BLOCKING_STATUSES, Booking, SlotHold
+
+EXCLUSION_CONSTRAINT = 'booking_no_overlap'
+
+
+class SlotConflict(Exception):
+    """The therapist already has an active booking or another client's hold overlapping the requested time"""
+    message = 'This time slot is already booked or held for the selected therapist.'
+
+    def __init__(self, conflicts=()):
+        self.conflicts = list(conflicts)
+        super().__init__(self.message)
+
+
+def overlapping(therapist_id, starts_at, ends_at, exclude=None):
+    """Active bookings of the therapist that overlap [starts_at, ends_at)"""
+    bookings = Booking.objects.filter(
+        therapist_id=therapist_id, status__in=BLOCKING_STATUSES, starts_at__lt=ends_at, ends_at__gt=starts_at,
+    )
+    if exclude is not None:
+        bookings = bookings.exclude(pk=exclude)
+    return bookings
+
+
+def holding(therapist_id, starts_at, ends_at, exclude_user=None):
+    """Unexpired holds on the therapist's time that overlap [starts_at, ends_at)"""
+    holds = SlotHold.objects.filter(
+        therapist_id=therapist_id, expires_at__gt=timezone.now(), starts_at__lt=ends_at, ends_at__gt=starts_at,
+    )
+    if exclude_user is not None:
+        holds = holds.exclude(user=exclude_user)
+    return holds
+
+
+def save_booking(booking, **kwargs):
+    """
+    Save booking, raising SlotConflict when it would overlap another active
+    booking or a hold of another user
+    """
+    with transaction.atomic():
+        if booking.status in BLOCKING_STATUSES:
+            # Serializes bookings per therapist (SQLite locks the whole database anyway)
+            Therapist.objects.select_for_update().filter(pk=booking.therapist_id).first()
+            booking.refresh_span()
+            conflicts = list(
+                overlapping(booking.therapist_id, booking.starts_at, booking.ends_at, exclude=booking.pk)[:5]
+            )
+            if conflicts:
+                raise SlotConflict(conflicts)
+            if holding(booking.therapist_id, booking.starts_at, booking.ends_at, exclude_user=booking.user_id).exists():
+                raise SlotConflict()
+        try:
+            with transaction.atomic():
+                booking.save(**kwargs)
+        except IntegrityError as exc:
+            if EXCLUSION_CONSTRAINT in str(exc):
+                raise SlotConflict() from exc
+            raise
+    return booking
@@ -1,12 +1,26 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
+from .availability import required_minutes
 from .models import (
     Booking, BookingAddon, TimeSlot, BookingCancellation, 
-    BookingReschedule, RecurringBooking
+    BookingReschedule, RecurringBooking, SlotHold
 )
+from .scheduling import SlotConflict, save_booking
 from services.serializers import ServiceSimpleSerializer, TherapistSimpleSerializer, ServiceAddonSerializer
 from accounts.serializers import UserSerializer
 
 
+def place_booking(booking):
+    """save_booking() with a conflict reported as a validation error"""
+    try:
+        return save_booking(booking)
+    except SlotConflict as exc:
+        raise serializers.ValidationError({'booking_time': [str(exc)]})
+
+
 class BookingAddonSerializer(serializers.ModelSerializer):
     addon = ServiceAddonSerializer(read_only=True)
     addon_id = serializers.IntegerField(write_only=True)
@@ -39,33 +53,24 @@ class BookingSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['end_time', 'created_at', 'updated_at']
 
-    def validate(self, data):
-        # Check if the time slot is available
-        booking_date = data.get('booking_date')
-        booking_time = data.get('booking_time')
-        therapist_id = data.get('therapist_id')
-        
-        if booking_date and booking_time and therapist_id:
-            # Check for existing bookings at the same time
-            existing_booking = Booking.objects.filter(
-                therapist_id=therapist_id,
-                booking_date=booking_date,
-                booking_time=booking_time
-            ).exclude(id=self.instance.id if self.instance else None)
-            
-            if existing_booking.exists():
-                raise serializers.ValidationError(
-                    "This time slot is already booked for the selected therapist."
-                )
-        
-        return data
-
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+        return place_booking(Booking(**validated_data))
+
+    def update(self, instance, validated_data):
+        if 'booking_date' in validated_data or 'booking_time' in validated_data:
+            instance.move(
+                validated_data.pop('booking_date', instance.booking_date),
+                validated_data.pop('booking_time', instance.booking_time),
+            )
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        return place_booking(instance)
 
 
 class CreateBookingSerializer(serializers.ModelSerializer):
+    service_id = serializers.IntegerField()
+    therapist_id = serializers.IntegerField()
     addon_ids = serializers.ListField(
         child=serializers.IntegerField(), write_only=True, required=False
     )
@@ -81,31 +86,62 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         addon_ids = validated_data.pop('addon_ids', [])
         validated_data['user'] = self.context['request'].user
         
-        # Calculate total amount
+        # Calculate total amount and length
         from services.models import Service, ServiceAddon
         service = Service.objects.get(id=validated_data['service_id'])
-        total_amount = service.price
-        
-        if addon_ids:
-            addons = ServiceAddon.objects.filter(id__in=addon_ids)
-            total_amount += sum(addon.price for addon in addons)
-        
-        validated_data['total_amount'] = total_amount
-        booking = Booking.objects.create(**validated_data)
-        
-        # Create booking addons
-        if addon_ids:
-            for addon_id in addon_ids:
-                addon = ServiceAddon.objects.get(id=addon_id)
-                BookingAddon.objects.create(
-                    booking=booking,
-                    addon=addon,
-                    price=addon.price
-                )
+        addons = list(ServiceAddon.objects.filter(id__in=addon_ids))
+        validated_data['total_amount'] = service.price + sum(addon.price for addon in addons)
+
+        booking = Booking(**validated_data)
+        booking.end_time = (
+            datetime.combine(booking.booking_date, booking.booking_time)
+            + timedelta(minutes=required_minutes(service, addons))
+        ).time()
+        with transaction.atomic():
+            place_booking(booking)
+            BookingAddon.objects.bulk_create(
+                BookingAddon(booking=booking, addon=addon, price=addon.price) for addon in addons
+            )
         
         return booking
 
 
+class SlotHoldSerializer(serializers.ModelSerializer):
+    service = ServiceSimpleSerializer(read_only=True)
+    therapist = TherapistSimpleSerializer(read_only=True)
+    addons = ServiceAddonSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = SlotHold
+        fields = [
+            'id', 'service', 'therapist', 'addons', 'booking_date', 'booking_time',
+            'end_time', 'expires_at', 'created_at'
+        ]
+
+
+class CreateSlotHoldSerializer(serializers.Serializer):
+    service_id = serializers.IntegerField()
+    therapist_id = serializers.IntegerField()
+    booking_date = serializers.DateField()
+    booking_time = serializers.TimeField()
+    addon_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        from services.models import Service, ServiceAddon, Therapist
+        starts_at = timezone.make_aware(datetime.combine(data['booking_date'], data['booking_time']))
+        if starts_at <= timezone.now():
+            raise serializers.ValidationError({'booking_time': ['This time has already passed.']})
+        data['service'] = Service.objects.filter(pk=data['service_id'], is_active=True).first()
+        if data['service'] is None:
+            raise serializers.ValidationError({'service_id': ['Service not found.']})
+        if not Therapist.objects.filter(pk=data['therapist_id'], services=data['service'], is_available=True).exists():
+            raise serializers.ValidationError({'therapist_id': ['The therapist does not offer this service.']})
+        data['addons'] = list(ServiceAddon.objects.filter(
+            pk__in=data.pop('addon_ids'), services=data['service'], is_active=True
+        ))
+        return data
+
+
 class TimeSlotSerializer(serializers.ModelSerializer):
     therapist = TherapistSimpleSerializer(read_only=True)
     therapist_id = serializers.IntegerField(write_only=True)
@@ -186,6 +222,23 @@ class AvailableTimeSlotsSerializer(serializers.Serializer):
     date = serializers.DateField()
     therapist_id = serializers.IntegerField()
     service_id = serializers.IntegerField()
+    addon_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+
+class AvailabilityCalendarSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    service_id = serializers.IntegerField()
+    therapist_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    addon_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        days = (data['end_date'] - data['start_date']).days + 1
+        if days < 1:
+            raise serializers.ValidationError('end_date must not be before start_date.')
+        if days > settings.CALENDAR_MAX_DAYS:
+            raise serializers.ValidationError(f'The range may span at most {settings.CALENDAR_MAX_DAYS} days.')
+        return data
 
 
 class BookingStatsSerializer(serializers.Serializer):
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from core.signals import post_bulk_create
+from core.versioning import bump_version
+from services.models import TherapistAvailability
+from .availability import schedule_group
+from .inventory import horizon, refresh
+from .models import Booking, SlotHold, TimeSlot
+
+# What a booking contributes to its therapist's free time
+SCHEDULE_FIELDS = ['therapist_id', 'status', 'starts_at', 'ends_at']
+
+
+def booking_days(schedule):
+    """(therapist_id, local dates the booking covers) of a SCHEDULE_FIELDS dict"""
+    first = timezone.localtime(schedule['starts_at']).date()
+    last = timezone.localtime(schedule['ends_at'] - timedelta(microseconds=1)).date()
+    return schedule['therapist_id'], [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def schedule_changed(*changes):
+    """Invalidate cached calendars and recompute the inventory for (therapist_id, dates) pairs"""
+    affected = {}
+    for therapist_id, dates in changes:
+        affected.setdefault(therapist_id, set()).update(dates)
+    for therapist_id, dates in affected.items():
+        bump_version(schedule_group(therapist_id))
+        refresh([therapist_id], dates)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_schedule(sender, instance, raw=False, **kwargs):
+    instance._schedule_before = None
+    if instance.pk and not instance._state.adding and not raw:
+        instance._schedule_before = sender.objects.filter(pk=instance.pk).values(*SCHEDULE_FIELDS).first()
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_schedule_before', None)
+    after = {name: getattr(instance, name) for name in SCHEDULE_FIELDS}
+    if before == after:
+        return  # notes, reminders etc. don't change availability
+    schedule_changed(booking_days(after), *([booking_days(before)] if before else []))
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    schedule_changed(booking_days({name: getattr(instance, name) for name in SCHEDULE_FIELDS}))
+
+
+@receiver(post_bulk_create, sender=Booking)
+def bookings_created(sender, instances, **kwargs):
+    schedule_changed(*(booking_days({name: getattr(booking, name) for name in SCHEDULE_FIELDS}) for booking in instances))
+
+
+@receiver(post_save, sender=SlotHold)
+@receiver(post_delete, sender=SlotHold)
+def slot_hold_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_changed(booking_days({name: getattr(instance, name) for name in ['therapist_id', 'starts_at', 'ends_at']}))
+
+
+@receiver(pre_save, sender=TimeSlot)
+def remember_time_slot_day(sender, instance, raw=False, **kwargs):
+    instance._day_before = None
+    if instance.pk and not raw:
+        instance._day_before = sender.objects.filter(pk=instance.pk).values_list('therapist_id', 'date').first()
+
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def time_slot_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_day_before', None)
+    schedule_changed((instance.therapist_id, [instance.date]), *([(before[0], [before[1]])] if before else []))
+
+
+@receiver(pre_save, sender=TherapistAvailability)
+def remember_working_day(sender, instance, raw=False, **kwargs):
+    instance._day_before = None
+    if instance.pk and not raw:
+        instance._day_before = sender.objects.filter(pk=instance.pk).values_list('therapist_id', 'day_of_week').first()
+
+
+@receiver(post_save, sender=TherapistAvailability)
+@receiver(post_delete, sender=TherapistAvailability)
+def working_hours_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    first, last = horizon()
+    horizon_days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+    def weekdays(therapist_id, weekday):
+        return therapist_id, [date for date in horizon_days if date.weekday() == weekday]
+
+    before = getattr(instance, '_day_before', None)
+    schedule_changed(weekdays(instance.therapist_id, instance.day_of_week), *([weekdays(*before)] if before else []))
@@ -0,0 +1,401 @@
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User, UserStats
+from analytics.models import DailyBookingRollup
+from services.models import Service, ServiceAddon, ServiceCategory, Therapist, TherapistAvailability
+
+from . import inventory
+from .availability import load_day
+from .models import Booking, BookingStatus, RecurringBooking, SlotHold, SlotInventory, SlotState, TimeSlot
+from .scheduling import SlotConflict, save_booking
+
+# A Monday
+DAY = date(2026, 3, 2)
+
+
+class AppointmentTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='client@example.com', password='secret')
+        category = ServiceCategory.objects.create(name='Massage')
+        cls.service = Service.objects.create(name='Swedish', category=category, description='-', price=80, duration=60)
+        cls.long_service = Service.objects.create(name='Hot stone', category=category, description='-', price=120, duration=90)
+        cls.therapist = Therapist.objects.create(
+            user=User.objects.create_user(email='therapist@example.com', password='secret')
+        )
+        TherapistAvailability.objects.create(
+            therapist=cls.therapist, day_of_week=DAY.weekday(), start_time=time(9), end_time=time(13),
+        )
+
+    def book(self, start, service=None, status=BookingStatus.CONFIRMED, **kwargs):
+        service = service or self.service
+        return Booking.objects.create(
+            user=self.user, service=service, therapist=self.therapist, booking_date=DAY,
+            booking_time=start, total_amount=service.price, status=status, **kwargs
+        )
+
+
+class AvailableTimeSlotsTests(AppointmentTestCase):
+    def slots(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/appointments/available-slots/', {
+            'date': DAY.isoformat(), 'therapist_id': self.therapist.pk, 'service_id': self.service.pk, **params,
+        })
+        self.assertEqual(response.status_code, 200, response.data)
+        return [slot['time'] for slot in response.data['available_slots']]
+
+    def test_overlapping_bookings_and_blocks_are_excluded(self):
+        # 09:30-11:00 covers the 09:00, 09:30, 10:00 and 10:30 starts of a 1 hour service
+        self.book(time(9, 30), self.long_service)
+        self.book(time(12), status=BookingStatus.CANCELLED)
+        TimeSlot.objects.create(therapist=self.therapist, date=DAY, start_time=time(11, 30), end_time=time(11, 45), is_blocked=True)
+        self.assertEqual(self.slots(), ['12:00'])
+
+    def test_addons_lengthen_the_slot(self):
+        addon = ServiceAddon.objects.create(name='Scrub', price=10, duration_minutes=30)
+        addon.services.add(self.service)
+        self.assertEqual(self.slots(), ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30', '12:00'])
+        self.assertEqual(self.slots(addon_ids=[addon.pk]), ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30'])
+
+    def test_query_count_does_not_depend_on_slots(self):
+        for hour in (9, 11):
+            self.book(time(hour))
+        # therapist, service, then windows, bookings, holds and blocked slots
+        with self.assertNumQueries(6):
+            self.slots()
+
+
+class BookingConflictTests(AppointmentTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, start, service=None):
+        return self.client.post('/api/appointments/', {
+            'service_id': (service or self.service).pk, 'therapist_id': self.therapist.pk,
+            'booking_date': DAY.isoformat(), 'booking_time': start,
+        }, format='json')
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.create('10:00', self.long_service).status_code, 201)
+        # 10:30 falls inside 10:00-11:30
+        response = self.create('10:30')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('booking_time', response.data)
+        self.assertEqual(self.create('11:30').status_code, 201)
+
+    def test_addons_extend_the_booking(self):
+        addon = ServiceAddon.objects.create(name='Scrub', price=10, duration_minutes=30)
+        response = self.client.post('/api/appointments/', {
+            'service_id': self.service.pk, 'therapist_id': self.therapist.pk,
+            'booking_date': DAY.isoformat(), 'booking_time': '09:00', 'addon_ids': [addon.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        booking = Booking.objects.get()
+        self.assertEqual((booking.end_time, booking.total_amount), (time(10, 30), 90))
+        self.assertEqual(self.create('10:00').status_code, 400)
+
+    def test_cancelled_time_can_be_booked_again(self):
+        self.book(time(10), status=BookingStatus.CANCELLED)
+        self.assertEqual(self.create('10:00').status_code, 201)
+
+    def test_reschedule_approval_checks_the_new_time(self):
+        booking = self.book(time(9))
+        self.book(time(12))
+        reschedule = self.client.post(f'/api/appointments/{booking.pk}/reschedule/', {
+            'original_booking_id': booking.pk, 'new_date': DAY.isoformat(), 'new_time': '11:00',
+        }, format='json')
+        self.assertEqual(reschedule.status_code, 201, reschedule.data)
+        taken = self.client.post(f'/api/appointments/{booking.pk}/reschedule/', {
+            'original_booking_id': booking.pk, 'new_date': DAY.isoformat(), 'new_time': '11:30',
+        }, format='json')
+        self.assertEqual(taken.status_code, 409)
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user(email='admin@example.com', password='secret', is_staff=True))
+        # Someone else takes 11:00 before the approval
+        self.book(time(10, 30), status=BookingStatus.PENDING)
+        url = f"/api/appointments/reschedules/{reschedule.data['id']}/approve/"
+        self.assertEqual(admin.post(url).status_code, 409)
+
+        Booking.objects.filter(booking_time=time(10, 30)).update(status=BookingStatus.CANCELLED)
+        self.assertEqual(admin.post(url).status_code, 200)
+        booking.refresh_from_db()
+        self.assertEqual((booking.booking_time, booking.end_time), (time(11), time(12)))
+
+
+class AvailabilityCalendarTests(AppointmentTestCase):
+    def setUp(self):
+        cache.clear()
+        self.service.therapists.add(self.therapist)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def calendar(self, **params):
+        response = self.client.get('/api/appointments/availability/calendar/', {
+            'start_date': DAY.isoformat(), 'end_date': (DAY + timedelta(days=6)).isoformat(),
+            'service_id': self.service.pk, **params,
+        })
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_week_of_two_therapists(self):
+        other = Therapist.objects.create(user=User.objects.create_user(email='other@example.com', password='secret'))
+        self.service.therapists.add(other)
+        TherapistAvailability.objects.create(
+            therapist=other, day_of_week=(DAY + timedelta(days=1)).weekday(), start_time=time(14), end_time=time(15),
+        )
+        self.book(time(9), self.long_service)
+
+        days = self.calendar()['days']
+        self.assertEqual(list(days), [DAY.isoformat(), (DAY + timedelta(days=1)).isoformat()])
+        self.assertEqual(days[DAY.isoformat()], {str(self.therapist.pk): ['10:30', '11:00', '11:30', '12:00']})
+        self.assertEqual(days[(DAY + timedelta(days=1)).isoformat()], {str(other.pk): ['14:00']})
+        self.assertEqual(list(self.calendar(therapist_ids=[other.pk])['days']), [(DAY + timedelta(days=1)).isoformat()])
+
+    def test_cached_until_the_schedule_changes(self):
+        self.calendar()
+        # service, therapists; versions and slots come from the cache
+        with self.assertNumQueries(2):
+            self.calendar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(time(11))
+        self.assertEqual(self.calendar()['days'][DAY.isoformat()][str(self.therapist.pk)], ['09:00', '09:30', '10:00', '12:00'])
+
+    def test_range_is_capped(self):
+        response = self.client.get('/api/appointments/availability/calendar/', {
+            'start_date': DAY.isoformat(), 'end_date': (DAY + timedelta(days=60)).isoformat(),
+            'service_id': self.service.pk,
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class SlotInventoryTests(AppointmentTestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        self.day = today + timedelta(days=7 - today.weekday())  # next Monday
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def states(self):
+        return list(
+            SlotInventory.objects.filter(therapist=self.therapist, date=self.day)
+            .values_list('start_time', 'state')
+        )
+
+    def test_build_and_incremental_updates(self):
+        SlotInventory.objects.all().delete()
+        call_command('build_slot_inventory', days=14, stdout=StringIO())
+        self.assertEqual(len(self.states()), 8)  # 09:00-13:00 in 30 minute cells
+        self.assertEqual(SlotInventory.objects.filter(date__gt=timezone.localdate() + timedelta(days=13)).count(), 0)
+
+        booking = Booking.objects.create(
+            user=self.user, service=self.long_service, therapist=self.therapist, booking_date=self.day,
+            booking_time=time(10), total_amount=120,
+        )
+        booked = [start for start, state in self.states() if state == SlotState.BOOKED]
+        self.assertEqual(booked, [time(10), time(10, 30), time(11)])
+
+        booking.status = BookingStatus.CANCELLED
+        booking.save()
+        self.assertEqual({state for _, state in self.states()}, {SlotState.FREE})
+
+    def test_available_slots_read_the_inventory(self):
+        Booking.objects.create(
+            user=self.user, service=self.service, therapist=self.therapist, booking_date=self.day,
+            booking_time=time(10), total_amount=80,
+        )
+        TimeSlot.objects.create(
+            therapist=self.therapist, date=self.day, start_time=time(12), end_time=time(12, 30), is_blocked=True,
+        )
+        with self.assertNumQueries(3):  # therapist, service, inventory
+            response = self.client.get('/api/appointments/available-slots/', {
+                'date': self.day.isoformat(), 'therapist_id': self.therapist.pk, 'service_id': self.service.pk,
+            })
+        self.assertEqual([slot['time'] for slot in response.data['available_slots']], ['09:00', '11:00'])
+
+    def test_fully_booked_day_is_not_recomputed(self):
+        TimeSlot.objects.create(
+            therapist=self.therapist, date=self.day, start_time=time(9), end_time=time(13), is_blocked=True,
+        )
+        params = {'date': self.day.isoformat(), 'therapist_id': self.therapist.pk, 'service_id': self.service.pk}
+        with self.assertNumQueries(3):  # the inventory answers, the engine isn't consulted
+            response = self.client.get('/api/appointments/available-slots/', params)
+        self.assertEqual(response.data['available_slots'], [])
+
+        # Without inventory rows the engine does
+        TimeSlot.objects.all().delete()
+        SlotInventory.objects.all().delete()
+        response = self.client.get('/api/appointments/available-slots/', params)
+        self.assertEqual(len(response.data['available_slots']), 7)
+
+    def test_free_slots_agree_with_the_engine(self):
+        # 13:00 starts a second window right where the first ends
+        for start, end in ((time(13), time(14, 30)), (time(15), time(16))):
+            TherapistAvailability.objects.create(
+                therapist=self.therapist, day_of_week=self.day.weekday(), start_time=start, end_time=end,
+            )
+        Booking.objects.create(
+            user=self.user, service=self.service, therapist=self.therapist, booking_date=self.day,
+            booking_time=time(10), total_amount=80,
+        )
+        TimeSlot.objects.create(
+            therapist=self.therapist, date=self.day, start_time=time(11, 30), end_time=time(12), is_blocked=True,
+        )
+        day = load_day(self.day, [self.therapist.pk])[self.therapist.pk]
+        for minutes in (30, 45, 60, 90, 120):
+            with self.subTest(minutes=minutes):
+                self.assertEqual(inventory.free_slots(self.therapist.pk, self.day, minutes), day.slots(minutes))
+        self.assertIn((time(12), time(13)), day.slots(60))
+        self.assertNotIn((time(12, 30), time(13, 30)), day.slots(60))
+
+    def test_free_slots_are_minute_precise(self):
+        # A window ending off the half hour, and a block that starts mid-cell
+        TherapistAvailability.objects.create(
+            therapist=self.therapist, day_of_week=self.day.weekday(), start_time=time(15), end_time=time(16, 45),
+        )
+        TimeSlot.objects.create(
+            therapist=self.therapist, date=self.day, start_time=time(10, 20), end_time=time(10, 40), is_blocked=True,
+        )
+        day = load_day(self.day, [self.therapist.pk])[self.therapist.pk]
+        for minutes in (15, 20, 45, 50, 75, 105):
+            with self.subTest(minutes=minutes):
+                self.assertEqual(inventory.free_slots(self.therapist.pk, self.day, minutes), day.slots(minutes))
+        self.assertIn((time(9, 30), time(10, 15)), day.slots(45))
+        self.assertIn((time(16), time(16, 45)), day.slots(45))
+
+
+class RecurringBookingTests(AppointmentTestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        self.start = today + timedelta(days=7 - today.weekday())  # next Monday
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_series(self, **fields):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/appointments/recurring/', {
+                'service_id': self.service.pk, 'therapist_id': self.therapist.pk, 'frequency': 'weekly',
+                'start_date': self.start.isoformat(), 'booking_time': '10:00', **fields,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data, len(queries)
+
+    def test_series_is_one_bulk_insert(self):
+        short, short_queries = self.create_series(total_sessions=4)
+        self.assertEqual(short['occurrences_created'], 4)
+        Booking.objects.all().delete()
+        long, long_queries = self.create_series(total_sessions=52)
+        self.assertEqual(long['occurrences_created'], 52)
+        self.assertEqual(short_queries, long_queries)
+
+        occurrences = Booking.objects.filter(recurring_booking=long['id']).order_by('booking_date')
+        self.assertEqual(occurrences.last().booking_date, self.start + timedelta(weeks=51))
+        self.assertEqual(UserStats.objects.get(user=self.user).booking_count, 52)
+        self.assertEqual(DailyBookingRollup.objects.filter(booking_count=1).count(), 52)
+        self.assertEqual(long['next_booking_date'], self.start)
+
+    def test_conflicting_dates_are_skipped(self):
+        self.book_on(self.start + timedelta(weeks=1), time(10, 30))
+        data, _ = self.create_series(total_sessions=3)
+        self.assertEqual(data['occurrences_created'], 2)
+        self.assertEqual(data['skipped_dates'], [self.start + timedelta(weeks=1)])
+
+        # Running the expansion again adds nothing
+        call_command('expand_recurring_bookings', stdout=StringIO())
+        self.assertEqual(Booking.objects.filter(recurring_booking=data['id']).count(), 2)
+
+    def test_days_off_and_blocked_slots_are_skipped(self):
+        TimeSlot.objects.create(
+            therapist=self.therapist, date=self.start + timedelta(weeks=2), start_time=time(10, 30),
+            end_time=time(11), is_blocked=True,
+        )
+        data, _ = self.create_series(total_sessions=3)
+        self.assertEqual(data['skipped_dates'], [self.start + timedelta(weeks=2)])
+
+        # 12:30 runs past the end of the working window, 13:00
+        Booking.objects.all().delete()
+        data, _ = self.create_series(total_sessions=2, booking_time='12:30')
+        self.assertEqual(data['occurrences_created'], 0)
+        self.assertEqual(data['skipped_dates'], [self.start, self.start + timedelta(weeks=1)])
+
+    def test_monthly_dates_stay_in_their_month(self):
+        series = RecurringBooking(frequency='monthly', start_date=date(2026, 1, 31), total_sessions=3)
+        self.assertEqual(list(series.occurrence_dates()), [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)])
+
+    def book_on(self, day, start):
+        return Booking.objects.create(
+            user=self.user, service=self.service, therapist=self.therapist, booking_date=day,
+            booking_time=start, total_amount=self.service.price, status=BookingStatus.CONFIRMED,
+        )
+
+
+class SlotHoldTests(AppointmentTestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        self.day = today + timedelta(days=7 - today.weekday())  # next Monday
+        self.service.therapists.add(self.therapist)
+        self.other = User.objects.create_user(email='other@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def hold(self, start, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.user)
+        return client.post('/api/appointments/holds/', {
+            'service_id': self.service.pk, 'therapist_id': self.therapist.pk,
+            'booking_date': self.day.isoformat(), 'booking_time': start,
+        }, format='json')
+
+    def test_held_time_is_taken_until_confirmed(self):
+        hold = self.hold('10:00')
+        self.assertEqual(hold.status_code, 201, hold.data)
+        # Overlapping holds and other clients' bookings are turned away up front
+        self.assertEqual(self.hold('10:30', user=self.other).status_code, 409)
+        with self.assertRaises(SlotConflict):
+            save_booking(Booking(
+                user=self.other, service=self.service, therapist=self.therapist, booking_date=self.day,
+                booking_time=time(10), total_amount=80,
+            ))
+        held = [start for start, state in SlotInventory.objects.filter(date=self.day).values_list('start_time', 'state')
+                if state == SlotState.HELD]
+        self.assertEqual(held, [time(10), time(10, 30)])
+        self.assertNotIn((time(10), time(11)), load_day(self.day, [self.therapist.pk])[self.therapist.pk].slots(60))
+
+        response = self.client.post(f"/api/appointments/holds/{hold.data['id']}/confirm/", {'notes': 'Quiet room'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        booking = Booking.objects.get()
+        self.assertEqual((booking.user, booking.booking_time, booking.end_time), (self.user, time(10), time(11)))
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_a_new_hold_replaces_the_previous_one(self):
+        self.assertEqual(self.hold('10:00').status_code, 201)
+        self.assertEqual(self.hold('12:00').status_code, 201)
+        self.assertEqual(list(SlotHold.objects.values_list('booking_time', flat=True)), [time(12)])
+        self.assertEqual(self.hold('10:00', user=self.other).status_code, 201)
+
+    def test_expired_holds_are_swept(self):
+        hold = self.hold('10:00')
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        # Expired holds no longer take the time, even before the sweep
+        self.assertEqual(self.hold('10:00', user=self.other).status_code, 201)
+        self.assertEqual(self.client.post(f"/api/appointments/holds/{hold.data['id']}/confirm/").status_code, 409)
+
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('expire_slot_holds', stdout=out)
+        self.assertIn('Deleted 2', out.getvalue())
+        self.assertEqual(
+            set(SlotInventory.objects.filter(date=self.day).values_list('state', flat=True)), {SlotState.FREE}
+        )
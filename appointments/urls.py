@@ -17,12 +17,19 @@ urlpatterns = [
     path('time-slots/', views.TimeSlotListView.as_view(), name='timeslot-list'),
     path('time-slots/<int:pk>/', views.TimeSlotDetailView.as_view(), name='timeslot-detail'),
     path('available-slots/', views.available_time_slots, name='available-slots'),
+    path('availability/calendar/', views.availability_calendar, name='availability-calendar'),
+    
+    # Slot holds
+    path('holds/', views.SlotHoldListView.as_view(), name='slot-hold-list'),
+    path('holds/<int:pk>/', views.SlotHoldDetailView.as_view(), name='slot-hold-detail'),
+    path('holds/<int:hold_id>/confirm/', views.confirm_hold, name='confirm-hold'),
     
     # Cancellations
     path('cancellations/', views.BookingCancellationListView.as_view(), name='cancellation-list'),
     
     # Reschedules
     path('reschedules/', views.BookingRescheduleListView.as_view(), name='reschedule-list'),
+    path('reschedules/<int:reschedule_id>/approve/', views.approve_reschedule, name='approve-reschedule'),
     
     # Recurring Bookings
     path('recurring/', views.RecurringBookingListView.as_view(), name='recurring-booking-list'),
@@ -30,6 +37,7 @@ urlpatterns = [
     # Statistics and Reports
     path('stats/', views.user_booking_stats, name='user-stats'),
     path('dashboard-stats/', views.booking_dashboard_stats, name='dashboard-stats'),
+    path('therapist-revenue/', views.therapist_revenue, name='therapist-revenue'),
     
     # Therapist Schedule
     path('therapist/<int:therapist_id>/schedule/', views.therapist_schedule, name='therapist-schedule'),
@@ -1,22 +1,36 @@
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Count
+from django.db.models import Q, Count
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
-from datetime import datetime, timedelta, time
+import hashlib
+from copy import copy
+from datetime import datetime, time
+from accounts.stats import for_user
+from analytics.models import DailyBookingRollup
+from core.stats import aggregate, cached, grouped, total
+from core.versioning import get_versions
 from .models import (
     Booking, BookingAddon, TimeSlot, BookingCancellation, 
-    BookingReschedule, RecurringBooking, BookingStatus
+    BookingReschedule, RecurringBooking, BookingStatus, SlotHold
 )
 from .serializers import (
     BookingSerializer, CreateBookingSerializer, TimeSlotSerializer,
     BookingCancellationSerializer, BookingRescheduleSerializer,
-    RecurringBookingSerializer, AvailableTimeSlotsSerializer,
-    BookingStatsSerializer
+    RecurringBookingSerializer, AvailableTimeSlotsSerializer, AvailabilityCalendarSerializer,
+    BookingStatsSerializer, SlotHoldSerializer, CreateSlotHoldSerializer
 )
-from services.models import Therapist, Service
+from services.models import Therapist, Service, ServiceAddon
+from . import holds
+from .availability import load_day, load_range, required_minutes, schedule_group
+from .inventory import free_slots, in_horizon
+from .recurrence import expand
+from .scheduling import SlotConflict, overlapping, save_booking
 
 
 class BookingListView(generics.ListCreateAPIView):
@@ -118,6 +132,74 @@ class RecurringBookingListView(generics.ListCreateAPIView):
     def get_serializer_class(self):
         return RecurringBookingSerializer
 
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            series = serializer.save()
+            created, skipped = expand(series)
+        return Response({
+            **serializer.data,
+            'occurrences_created': len(created),
+            # Dates left out because the therapist is already booked then
+            'skipped_dates': skipped,
+        }, status=status.HTTP_201_CREATED)
+
+
+class SlotHoldListView(generics.ListCreateAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            SlotHold.objects.filter(user=self.request.user, expires_at__gt=timezone.now())
+            .select_related('service', 'therapist__user').prefetch_related('addons')
+        )
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return CreateSlotHoldSerializer
+        return SlotHoldSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            hold = holds.place(
+                request.user, data['service'], data['therapist_id'],
+                data['booking_date'], data['booking_time'], data['addons'],
+            )
+        except SlotConflict as exc:
+            return Response({'error': str(exc)}, status=409)
+        return Response(SlotHoldSerializer(hold, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
+class SlotHoldDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Look at or give up one of the user's holds
+    """
+    serializer_class = SlotHoldSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return SlotHold.objects.filter(user=self.request.user)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def confirm_hold(request, hold_id):
+    """
+    Book the held time, 409 when the hold has expired and the time was taken since
+    """
+    hold = SlotHold.objects.select_related('service').filter(pk=hold_id, user=request.user).first()
+    if hold is None:
+        return Response({'error': 'Hold not found'}, status=404)
+    try:
+        booking = holds.confirm(hold, notes=request.data.get('notes', ''))
+    except SlotConflict as exc:
+        return Response({'error': str(exc)}, status=409)
+    return Response(BookingSerializer(booking, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
 
 @api_view(['GET'])
 def available_time_slots(request):
@@ -138,57 +220,76 @@ def available_time_slots(request):
     except (Therapist.DoesNotExist, Service.DoesNotExist):
         return Response({'error': 'Therapist or Service not found'}, status=404)
     
-    # Get therapist availability for the day
-    day_of_week = date.weekday()
-    availability = therapist.availability.filter(
-        day_of_week=day_of_week,
-        is_active=True
+    addons = ServiceAddon.objects.filter(
+        pk__in=serializer.validated_data['addon_ids'], services=service, is_active=True
     )
-    
-    if not availability.exists():
-        return Response({'available_slots': []})
-    
-    # Generate time slots based on availability
-    available_slots = []
-    for avail in availability:
-        current_time = avail.start_time
-        end_time = avail.end_time
-        
-        while current_time < end_time:
-            # Check if slot duration fits
-            slot_end = (datetime.combine(date, current_time) + 
-                       timedelta(minutes=service.duration)).time()
-            
-            if slot_end <= end_time:
-                # Check if slot is not already booked
-                existing_booking = Booking.objects.filter(
-                    therapist=therapist,
-                    booking_date=date,
-                    booking_time=current_time,
-                    status__in=[BookingStatus.PENDING, BookingStatus.CONFIRMED]
-                ).exists()
-                
-                # Check if slot is not blocked
-                blocked_slot = TimeSlot.objects.filter(
-                    therapist=therapist,
-                    date=date,
-                    start_time=current_time,
-                    is_blocked=True
-                ).exists()
-                
-                if not existing_booking and not blocked_slot:
-                    available_slots.append({
-                        'time': current_time.strftime('%H:%M'),
-                        'end_time': slot_end.strftime('%H:%M')
-                    })
-            
-            # Move to next 30-minute slot
-            current_time = (datetime.combine(date, current_time) + 
-                           timedelta(minutes=30)).time()
-    
+    minutes = required_minutes(service, addons)
+
+    slots = free_slots(therapist.pk, date, minutes) if in_horizon(date) else None
+    if slots is None:
+        # Beyond the inventory horizon, a day off, or the inventory isn't built yet
+        slots = load_day(date, [therapist.pk])[therapist.pk].slots(minutes)
+    available_slots = [
+        {'time': start.strftime('%H:%M'), 'end_time': end.strftime('%H:%M')}
+        for start, end in slots
+    ]
+
     return Response({'available_slots': available_slots})
 
 
+@api_view(['GET'])
+def availability_calendar(request):
+    """
+    Free start times of a service per day and therapist over a date range.
+    Cached until a booking, blocked slot or working hours change for one of
+    the therapists (or the service catalog changes).
+    """
+    serializer = AvailabilityCalendarSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = serializer.validated_data
+
+    service = Service.objects.filter(pk=params['service_id'], is_active=True).first()
+    if service is None:
+        return Response({'error': 'Service not found'}, status=404)
+    addons = ServiceAddon.objects.filter(pk__in=params['addon_ids'], services=service, is_active=True)
+    minutes = required_minutes(service, addons)
+
+    therapists = Therapist.objects.filter(services=service, is_available=True).select_related('user').order_by('pk')
+    if params['therapist_ids']:
+        therapists = therapists.filter(pk__in=params['therapist_ids'])
+    therapists = list(therapists)
+    therapist_ids = [therapist.pk for therapist in therapists]
+
+    versions = get_versions(['services', *(schedule_group(pk) for pk in therapist_ids)])
+    key = 'availability-calendar:' + hashlib.sha1('|'.join([
+        str(service.pk), str(minutes), params['start_date'].isoformat(), params['end_date'].isoformat(),
+        *(f'{group}:{version}' for group, (version, _) in sorted(versions.items())),
+    ]).encode()).hexdigest()
+
+    calendar = cache.get(key)
+    if calendar is None:
+        days = load_range(params['start_date'], params['end_date'], therapist_ids)
+        calendar = {}
+        for (therapist_id, date), day in sorted(days.items(), key=lambda item: (item[0][1], item[0][0])):
+            starts = [start.strftime('%H:%M') for start, _ in day.slots(minutes)]
+            if starts:
+                calendar.setdefault(date.isoformat(), {})[str(therapist_id)] = starts
+        cache.set(key, calendar, settings.CALENDAR_CACHE_TIMEOUT)
+
+    return Response({
+        'service_id': service.pk,
+        'duration_minutes': minutes,
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+        'therapists': [
+            {'id': therapist.pk, 'name': therapist.user.get_full_name()} for therapist in therapists
+        ],
+        # {date: {therapist id: [start times]}}, days without a free slot are left out
+        'days': calendar,
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def cancel_booking(request, booking_id):
@@ -244,31 +345,72 @@ def reschedule_booking(request, booking_id):
     
     serializer = BookingRescheduleSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
+        # Turn down requests for time that is already taken, approval checks again under lock
+        new_therapist_id = serializer.validated_data.get('new_therapist_id') or booking.therapist_id
+        candidate = copy(booking)
+        candidate.move(serializer.validated_data['new_date'], serializer.validated_data['new_time'])
+        candidate.refresh_span()
+        if overlapping(new_therapist_id, candidate.starts_at, candidate.ends_at, exclude=booking.pk).exists():
+            return Response({'error': SlotConflict.message}, status=409)
         serializer.save(original_booking=booking)
         return Response(serializer.data, status=201)
     
     return Response(serializer.errors, status=400)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def approve_reschedule(request, reschedule_id):
+    """
+    Approve a reschedule request and move its booking, unless the new time
+    has been taken since the request was made
+    """
+    with transaction.atomic():
+        reschedule = (
+            BookingReschedule.objects.select_for_update()
+            .select_related('original_booking__service', 'new_therapist')
+            .filter(pk=reschedule_id).first()
+        )
+        if reschedule is None:
+            return Response({'error': 'Reschedule request not found'}, status=404)
+        if reschedule.processed_at:
+            return Response({'error': 'Reschedule request was already processed'}, status=400)
+
+        booking = reschedule.original_booking
+        if booking.status in [BookingStatus.CANCELLED, BookingStatus.COMPLETED]:
+            return Response({'error': 'Cannot reschedule cancelled or completed booking'}, status=400)
+
+        booking.move(reschedule.new_date, reschedule.new_time, therapist=reschedule.new_therapist)
+        try:
+            save_booking(booking)
+        except SlotConflict as exc:
+            return Response({'error': str(exc)}, status=409)
+
+        reschedule.is_approved = True
+        reschedule.approved_by = request.user
+        reschedule.processed_at = timezone.now()
+        reschedule.save(update_fields=['is_approved', 'approved_by', 'processed_at'])
+
+    return Response(BookingRescheduleSerializer(reschedule, context={'request': request}).data)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_booking_stats(request):
     """
     Get booking statistics for the current user
     """
-    user_bookings = Booking.objects.filter(user=request.user)
-    
+    user_stats = for_user(request.user)
+
     stats = {
-        'total_bookings': user_bookings.count(),
-        'pending_bookings': user_bookings.filter(status=BookingStatus.PENDING).count(),
-        'confirmed_bookings': user_bookings.filter(status=BookingStatus.CONFIRMED).count(),
-        'completed_bookings': user_bookings.filter(status=BookingStatus.COMPLETED).count(),
-        'cancelled_bookings': user_bookings.filter(status=BookingStatus.CANCELLED).count(),
-        'total_spent': user_bookings.filter(
-            status=BookingStatus.COMPLETED
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
+        'total_bookings': user_stats.booking_count,
+        'pending_bookings': user_stats.pending_bookings,
+        'confirmed_bookings': user_stats.confirmed_bookings,
+        'completed_bookings': user_stats.completed_bookings,
+        'cancelled_bookings': user_stats.cancelled_bookings,
+        'total_spent': user_stats.completed_booking_amount,
     }
-    
+
     return Response(stats)
 
 
@@ -313,22 +455,52 @@ def booking_dashboard_stats(request):
     Get overall booking statistics (admin view)
     """
     today = timezone.now().date()
-    
-    stats = {
-        'total_bookings': Booking.objects.count(),
-        'today_bookings': Booking.objects.filter(booking_date=today).count(),
-        'pending_bookings': Booking.objects.filter(status=BookingStatus.PENDING).count(),
-        'confirmed_bookings': Booking.objects.filter(status=BookingStatus.CONFIRMED).count(),
-        'completed_bookings': Booking.objects.filter(status=BookingStatus.COMPLETED).count(),
-        'cancelled_bookings': Booking.objects.filter(status=BookingStatus.CANCELLED).count(),
-        'total_revenue': Booking.objects.filter(
-            status=BookingStatus.COMPLETED
-        ).aggregate(total=Sum('total_amount'))['total'] or 0,
-        'this_month_revenue': Booking.objects.filter(
-            status=BookingStatus.COMPLETED,
-            booking_date__month=today.month,
-            booking_date__year=today.year
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-    }
-    
+
+    stats = cached(f'bookings:dashboard:{today.isoformat()}', lambda: aggregate(DailyBookingRollup.objects.all(), {
+        'total_bookings': total('booking_count'),
+        'today_bookings': total('booking_count', date=today),
+        'pending_bookings': total('booking_count', status=BookingStatus.PENDING),
+        'confirmed_bookings': total('booking_count', status=BookingStatus.CONFIRMED),
+        'completed_bookings': total('booking_count', status=BookingStatus.COMPLETED),
+        'cancelled_bookings': total('booking_count', status=BookingStatus.CANCELLED),
+        'total_revenue': total('total_amount', status=BookingStatus.COMPLETED),
+        'this_month_revenue': total(
+            'total_amount', status=BookingStatus.COMPLETED,
+            date__month=today.month, date__year=today.year
+        ),
+    }))
+
     return Response(stats)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def therapist_revenue(request):
+    """
+    Completed bookings and revenue per therapist between start and end
+    (YYYY-MM-DD, both optional and inclusive), read from the daily rollups
+    """
+    rollups = DailyBookingRollup.objects.filter(status=BookingStatus.COMPLETED)
+    try:
+        for param, lookup in (('start', 'date__gte'), ('end', 'date__lte')):
+            value = request.query_params.get(param)
+            if value:
+                rollups = rollups.filter(**{lookup: datetime.strptime(value, '%Y-%m-%d').date()})
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+
+    by_therapist = grouped(rollups, 'therapist_id', {
+        'bookings': total('booking_count'),
+        'revenue': total('total_amount'),
+    })
+    therapists = Therapist.objects.filter(pk__in=by_therapist).select_related('user')
+    results = [
+        {
+            'therapist_id': therapist.pk,
+            'therapist': therapist.user.get_full_name(),
+            **by_therapist[therapist.pk],
+        }
+        for therapist in therapists
+    ]
+    results.sort(key=lambda row: row['revenue'], reverse=True)
+    return Response(results)
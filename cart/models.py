@@ -43,8 +43,9 @@ class CartItem(models.Model):
 
     @property
     def unit_price(self):
+        # Same sum as variant.price, without loading the variant's own product
         if self.variant:
-            return self.variant.price
+            return self.product.price + self.variant.price_adjustment
         return self.product.price
 
     @property
@@ -53,7 +54,7 @@ class CartItem(models.Model):
 
     def save(self, *args, **kwargs):
         # Ensure quantity doesn't exceed available stock
-        available_stock = self.variant.stock if self.variant else self.product.stock
+        available_stock = self.variant.stock_quantity if self.variant else self.product.stock_quantity
         if self.quantity > available_stock:
             self.quantity = available_stock
         super().save(*args, **kwargs)
@@ -109,8 +110,9 @@ class CartSessionItem(models.Model):
 
     @property
     def unit_price(self):
+        # Same sum as variant.price, without loading the variant's own product
         if self.variant:
-            return self.variant.price
+            return self.product.price + self.variant.price_adjustment
         return self.product.price
 
     @property
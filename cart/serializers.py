@@ -34,16 +34,16 @@ class CartItemSerializer(serializers.ModelSerializer):
         if variant_id:
             try:
                 variant = ProductVariant.objects.get(id=variant_id, product=product)
-                if quantity > variant.stock:
+                if quantity > variant.stock_quantity:
                     raise serializers.ValidationError(
-                        f"Only {variant.stock} items available for this variant"
+                        f"Only {variant.stock_quantity} items available for this variant"
                     )
             except ProductVariant.DoesNotExist:
                 raise serializers.ValidationError("Product variant not found")
         else:
-            if quantity > product.stock:
+            if quantity > product.stock_quantity:
                 raise serializers.ValidationError(
-                    f"Only {product.stock} items available"
+                    f"Only {product.stock_quantity} items available"
                 )
 
         return data
@@ -84,16 +84,16 @@ class AddToCartSerializer(serializers.Serializer):
         if variant_id:
             try:
                 variant = ProductVariant.objects.get(id=variant_id, product=product)
-                if quantity > variant.stock:
+                if quantity > variant.stock_quantity:
                     raise serializers.ValidationError(
-                        f"Only {variant.stock} items available for this variant"
+                        f"Only {variant.stock_quantity} items available for this variant"
                     )
             except ProductVariant.DoesNotExist:
                 raise serializers.ValidationError("Product variant not found")
         else:
-            if quantity > product.stock:
+            if quantity > product.stock_quantity:
                 raise serializers.ValidationError(
-                    f"Only {product.stock} items available"
+                    f"Only {product.stock_quantity} items available"
                 )
 
         return data
@@ -105,8 +105,8 @@ class UpdateCartItemSerializer(serializers.Serializer):
     def validate_quantity(self, value):
         cart_item = self.instance
         if cart_item:
-            available_stock = (cart_item.variant.stock if cart_item.variant 
-                              else cart_item.product.stock)
+            available_stock = (cart_item.variant.stock_quantity if cart_item.variant 
+                              else cart_item.product.stock_quantity)
             if value > available_stock:
                 raise serializers.ValidationError(
                     f"Only {available_stock} items available"
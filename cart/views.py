@@ -3,6 +3,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch
 from .models import Cart, CartItem, SavedItem, CartSession, CartSessionItem
 from .serializers import (
     CartSerializer, CartItemSerializer, AddToCartSerializer,
@@ -12,12 +13,21 @@ from .serializers import (
 from products.models import Product, ProductVariant
 
 
+def cart_items_queryset():
+    """Cart items with the product data ProductSimpleSerializer renders"""
+    return CartItem.objects.select_related('variant').prefetch_related(
+        Prefetch('product', queryset=Product.objects.for_simple())
+    )
+
+
 class CartView(generics.RetrieveAPIView):
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
+        cart, created = Cart.objects.prefetch_related(
+            Prefetch('items', queryset=cart_items_queryset())
+        ).get_or_create(user=self.request.user)
         return cart
 
 
@@ -27,7 +37,7 @@ class CartItemListView(generics.ListAPIView):
 
     def get_queryset(self):
         cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart.items.all()
+        return cart_items_queryset().filter(cart=cart)
 
 
 class CartItemDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -141,7 +151,9 @@ class SavedItemListView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return SavedItem.objects.filter(user=self.request.user)
+        return SavedItem.objects.filter(user=self.request.user).select_related('variant').prefetch_related(
+            Prefetch('product', queryset=Product.objects.for_simple())
+        )
 
 
 class SavedItemDetailView(generics.RetrieveDestroyAPIView):
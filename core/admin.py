@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'queue', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'queue', 'task']
+    readonly_fields = ['created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error']
+    date_hierarchy = 'created_at'
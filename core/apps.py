@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from .jobs import autodiscover
+        from .signals import connect_catalog_signals
+        connect_catalog_signals()
+        autodiscover()
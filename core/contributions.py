@@ -0,0 +1,30 @@
+"""
+Contribution deltas.
+
+Stored counters (rating totals, analytics rollups, per-user stats) are kept
+current by what each source row contributes to them: {key: {counter: value}},
+the key naming the row of counters. A save applies the difference between
+a row's contribution before and after it, a delete its contribution against {}.
+"""
+
+
+def merge(contributions):
+    """Sum an iterable of contributions into one"""
+    merged = {}
+    for contribution in contributions:
+        for key, values in contribution.items():
+            bucket = merged.setdefault(key, {})
+            for name, value in values.items():
+                bucket[name] = bucket.get(name, 0) + value
+    return merged
+
+
+def difference(before, after):
+    """after - before, leaving out keys whose counters don't change"""
+    deltas = {}
+    for sign, contribution in ((-1, before), (1, after)):
+        for key, values in contribution.items():
+            bucket = deltas.setdefault(key, {})
+            for name, value in values.items():
+                bucket[name] = bucket.get(name, 0) + sign * value
+    return {key: values for key, values in deltas.items() if any(values.values())}
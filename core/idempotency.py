@@ -0,0 +1,157 @@
+"""
+Idempotency-Key support for unsafe endpoints.
+
+A client that may retry a POST sends a unique Idempotency-Key header. The
+first request with a key claims it by inserting an IdempotencyKey row (the
+unique index on (scope, key) makes the claim atomic), runs the view and
+stores the response. Retries get the stored response back with an
+Idempotent-Replayed header, without running the view again. A duplicate
+that arrives while the original is still running waits for it to finish
+instead of racing it. Reusing a key for a different request is a 422.
+
+Server errors aren't stored (the claim is dropped so the client can retry),
+and a claim left behind by a crashed request lapses after IDEMPOTENCY_LEASE.
+Stored responses are replayed for IDEMPOTENCY_KEY_TTL, after which
+purge_idempotency_keys deletes them.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+
+def _scope(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return 'anon'
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _claim(scope, key, fingerprint):
+    """The claimed row, or the existing row when another request holds the key"""
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope, key=key, fingerprint=fingerprint, locked_at=now,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return record, True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is None:
+        # Dropped between our insert and read (a failed original), try once more
+        return _claim(scope, key, fingerprint)
+    if record.expires_at <= now:
+        IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+        return _claim(scope, key, fingerprint)
+    if record.state == IdempotencyKey.IN_PROGRESS and record.fingerprint == fingerprint:
+        # Take over a claim whose request died without finishing or dropping it
+        lapsed = now - timedelta(seconds=settings.IDEMPOTENCY_LEASE)
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, state=IdempotencyKey.IN_PROGRESS, locked_at__lte=lapsed
+        ).update(locked_at=now)
+        if taken:
+            record.locked_at = now
+            return record, True
+    return record, False
+
+
+def _wait(record):
+    """
+    Poll an in-progress key until its request finishes. Returns the completed
+    row, None if the request failed and dropped its claim, or the still
+    in-progress row when IDEMPOTENCY_WAIT runs out.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None or record.state == IdempotencyKey.COMPLETED:
+            return record
+    return record
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Function view decorator, goes below @api_view/@permission_classes so it
+    sees the authenticated DRF request. Requests without the header run as usual.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        scope = _scope(request)
+        fingerprint = _fingerprint(request)
+        record, claimed = _claim(scope, key, fingerprint)
+        if not claimed and record.fingerprint != fingerprint:
+            return Response(
+                {'error': f'{HEADER} was already used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if not claimed and record.state == IdempotencyKey.IN_PROGRESS:
+            record = _wait(record)
+            if record is None:
+                # The original failed, this request gets to run it
+                record, claimed = _claim(scope, key, fingerprint)
+            if record.state == IdempotencyKey.IN_PROGRESS and not claimed:
+                response = Response(
+                    {'error': f'A request with this {HEADER} is still in progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response['Retry-After'] = '1'
+                return response
+        if not claimed:
+            return _replay(record)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+        if response.status_code >= 500 or not hasattr(response, 'data'):
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            return response
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            state=IdempotencyKey.COMPLETED,
+            response_status=response.status_code,
+            response_body=response.data,
+        )
+        return response
+
+    return wrapper
@@ -0,0 +1,146 @@
+"""
+Database-backed job queue.
+
+Slow work (gateway calls, batch processing) is handed to background workers
+instead of running inside a request. enqueue() inserts a Job row, in the
+caller's transaction, so a job exists exactly when the data it works on was
+committed. `manage.py run_workers` claims due jobs with SELECT ... FOR
+UPDATE SKIP LOCKED, so any number of worker processes can share the table
+without handing out a job twice and no broker is needed.
+
+Tasks are plain functions registered with @task in an app's tasks.py (found
+at startup by autodiscover()). Payloads must be JSON. A task that raises is
+retried with exponential backoff until max_attempts, then marked failed and
+its on_failure hook called. Jobs whose worker died mid-run are requeued after
+JOB_LEASE seconds, so tasks must be safe to run more than once.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+RETRY_DELAY = 10  # seconds, doubled after every failed attempt
+
+_registry = {}
+
+
+class TaskSpec:
+    def __init__(self, name, func, queue, max_attempts, on_failure):
+        self.name = name
+        self.func = func
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.on_failure = on_failure
+
+    def delay(self, delay=0, **payload):
+        """Queue a run of this task with keyword arguments, delay in seconds"""
+        return enqueue(self.name, payload, delay=delay)
+
+    def __call__(self, **payload):
+        return self.func(**payload)
+
+
+def task(name, queue=DEFAULT_QUEUE, max_attempts=3, on_failure=None):
+    """
+    Register a task. on_failure(error, **payload) runs once the last attempt
+    has failed, to record the outcome the task itself never got to.
+    """
+    def register(func):
+        spec = TaskSpec(name, func, queue, max_attempts, on_failure)
+        _registry[name] = spec
+        return spec
+    return register
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, delay=0):
+    spec = _registry[name]
+    return Job.objects.create(
+        queue=spec.queue,
+        task=name,
+        payload=payload or {},
+        max_attempts=spec.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def requeue_stale(now=None):
+    """Put back jobs running for longer than JOB_LEASE, their worker crashed or was killed"""
+    now = now or timezone.now()
+    lapsed = now - timedelta(seconds=settings.JOB_LEASE)
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lte=lapsed).update(
+        status=Job.QUEUED, locked_by='', locked_at=None, run_at=now
+    )
+
+
+def claim(worker, queues=None, batch_size=10):
+    """Mark up to batch_size due jobs as running for this worker and return them"""
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        if queues:
+            due = due.filter(queue__in=queues)
+        jobs = list(due.select_for_update(skip_locked=True).order_by('run_at', 'pk')[:batch_size])
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.RUNNING, locked_by=worker, locked_at=now
+            )
+    return jobs
+
+
+def run(job):
+    """Run a claimed job and record the outcome"""
+    spec = _registry.get(job.task)
+    attempts = job.attempts + 1
+    try:
+        if spec is None:
+            raise LookupError(f'Unknown task {job.task!r}')
+        spec.func(**job.payload)
+    except Exception as exc:
+        error = traceback.format_exc()
+        if spec is not None and attempts < job.max_attempts:
+            backoff = timedelta(seconds=RETRY_DELAY * 2 ** (attempts - 1))
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, attempts=attempts, last_error=error,
+                locked_by='', locked_at=None, run_at=timezone.now() + backoff,
+            )
+            logger.warning('Job %s (%s) failed, attempt %d of %d', job.pk, job.task, attempts, job.max_attempts)
+            return False
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, attempts=attempts, last_error=error, finished_at=timezone.now()
+        )
+        logger.error('Job %s (%s) failed for good: %s', job.pk, job.task, exc)
+        if spec is not None and spec.on_failure is not None:
+            try:
+                spec.on_failure(exc, **job.payload)
+            except Exception:
+                logger.exception('on_failure hook of job %s (%s) failed', job.pk, job.task)
+        return False
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE, attempts=attempts, last_error='', finished_at=timezone.now()
+    )
+    return True
+
+
+def run_pending(worker='inline', queues=None, batch_size=10):
+    """Run due jobs until none are left, returns how many ran (tests and --once)"""
+    ran = 0
+    while True:
+        jobs = claim(worker, queues, batch_size)
+        if not jobs:
+            return ran
+        for job in jobs:
+            run(job)
+            ran += 1
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses past their TTL (run daily or so)'
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys.'))
@@ -0,0 +1,66 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers (core.jobs) until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Worker threads in this process')
+        parser.add_argument('--queues', default='', help='Comma separated queues to serve (default: all)')
+        parser.add_argument('--batch-size', type=int, default=5, help='Jobs claimed per round trip')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Run every due job and exit')
+
+    def handle(self, *args, **options):
+        queues = [name for name in options['queues'].split(',') if name]
+        batch_size = options['batch_size']
+        name = f'{socket.gethostname()}:{os.getpid()}'
+
+        jobs.requeue_stale()
+        if options['once']:
+            ran = jobs.run_pending(name, queues, batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs.'))
+            return
+
+        stopping = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # Finish the jobs in hand, then exit
+            signal.signal(sig, lambda *_: stopping.set())
+
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f'{name}:{i}', queues, batch_size, options['poll_interval'], stopping),
+                daemon=True,
+            )
+            for i in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f'{len(threads)} workers serving {", ".join(queues) or "all queues"}')
+        while not stopping.wait(timeout=60):
+            jobs.requeue_stale()
+            close_old_connections()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
+
+    def work(self, name, queues, batch_size, poll_interval, stopping):
+        try:
+            while not stopping.is_set():
+                close_old_connections()
+                claimed = jobs.claim(name, queues, batch_size)
+                for job in claimed:
+                    jobs.run(job)
+                if not claimed:
+                    stopping.wait(poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,128 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .versioning import get_versions
+
+RESPONSE_STATS_PREFIX = 'response-cache:stats'
+cached_views = set()
+
+
+class CatalogVersionMixin:
+    """
+    Conditional GETs for views whose output only changes with the catalog.
+
+    Set catalog_groups to the CatalogVersion groups the response depends on.
+    The ETag hashes those versions with the absolute URL and the negotiated
+    media type, so a matching If-None-Match (or an If-Modified-Since not
+    older than the newest group change) gets a 304 before any queryset or
+    serializer work happens.
+    """
+    catalog_groups = ()
+
+    def catalog_validators(self, request):
+        versions = get_versions(self.catalog_groups)
+        parts = [request.build_absolute_uri(), request.accepted_media_type or '']
+        parts.extend(f'{group}:{versions[group][0]}' for group in sorted(versions))
+        etag = quote_etag(hashlib.sha1('|'.join(parts).encode()).hexdigest())
+        last_modified = max(updated_at for _, updated_at in versions.values()).timestamp()
+        return etag, int(last_modified)
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.catalog_validators(request)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is None:
+            response = super().get(request, *args, **kwargs)
+        else:
+            response = not_modified
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
+
+
+def record_cache_result(view_name, result):
+    key = f'{RESPONSE_STATS_PREFIX}:{view_name}:{result}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def response_cache_stats():
+    """{view name: {'hits': n, 'misses': n}} for every view using CachedResponseMixin"""
+    keys = {
+        (name, result): f'{RESPONSE_STATS_PREFIX}:{name}:{result}'
+        for name in cached_views for result in ('hits', 'misses')
+    }
+    counts = cache.get_many(list(keys.values()))
+    stats = {}
+    for (name, result), key in sorted(keys.items()):
+        stats.setdefault(name, {})[result] = counts.get(key, 0)
+    return stats
+
+
+class CachedResponseMixin:
+    """
+    Server-side cache of rendered GET responses for catalog reads.
+
+    The key covers the absolute URL with its query parameters sorted (page
+    included), the negotiated media type and the versions of catalog_groups,
+    so signal-driven version bumps invalidate exactly the affected views.
+    Only anonymous requests are cached unless cache_authenticated says the
+    output does not depend on the user, and only JSON output (the browsable
+    API page shows who is logged in). Permissions are checked before the
+    lookup. Responses vary on Accept and Authorization and carry
+    X-Cache: HIT/MISS.
+    """
+    catalog_groups = ()
+    cache_authenticated = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cached_views.add(cls.__name__)
+
+    def response_cache_key(self, request):
+        query = sorted(
+            (name, sorted(values)) for name, values in request.query_params.lists()
+        )
+        versions = get_versions(self.catalog_groups)
+        parts = [
+            request.get_host(), request.path, repr(query), request.accepted_media_type or '',
+            *(f'{group}:{versions[group][0]}' for group in sorted(versions)),
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return f'response-cache:{type(self).__name__}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not self.cache_authenticated:
+            return super().get(request, *args, **kwargs)
+        if request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+
+        view_name = type(self).__name__
+        key = self.response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            record_cache_result(view_name, 'hits')
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            patch_vary_headers(response, ['Accept', 'Authorization'])
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record_cache_result(view_name, 'misses')
+        response = super().get(request, *args, **kwargs)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            def store(rendered):
+                cache.set(key, (rendered.content, rendered['Content-Type']), settings.RESPONSE_CACHE_TIMEOUT)
+            response.add_post_render_callback(store)
+        return response
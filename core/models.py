@@ -0,0 +1,132 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest
+
+from .contributions import difference
+
+
+class CatalogVersion(models.Model):
+    """Change counter for a group of catalog models, bumped on every save/delete in the group"""
+    group = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['group']
+
+    def __str__(self):
+        return f"{self.group} v{self.version}"
+
+
+class RatedModel(models.Model):
+    """
+    Stored review totals, kept current by review signals so catalog pages
+    (and ordering by rating) never aggregate over the review table. Used by
+    products.Product and services.Service/Therapist.
+    """
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def average_expression():
+        return Case(
+            When(rating_count__gt=0, then=Cast('rating_sum', FloatField()) / F('rating_count')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+
+    @classmethod
+    def apply_rating_delta(cls, pk, rating_delta, count_delta):
+        """Shift the stored totals of one row in place with F-expressions"""
+        if pk is None or not (rating_delta or count_delta):
+            return
+        with transaction.atomic():
+            rows = cls.objects.filter(pk=pk)
+            rows.update(
+                rating_sum=Greatest(F('rating_sum') + rating_delta, Value(0)),
+                rating_count=Greatest(F('rating_count') + count_delta, Value(0)),
+            )
+            rows.update(average_rating=cls.average_expression())
+
+    @classmethod
+    def apply_rating_changes(cls, before, after):
+        """
+        Apply the difference between two {pk: {'rating_sum': .., 'rating_count': ..}}
+        contributions, e.g. a review's state before and after an edit, one
+        UPDATE per row.
+        """
+        for pk, delta in difference(before, after).items():
+            cls.apply_rating_delta(pk, delta.get('rating_sum', 0), delta.get('rating_count', 0))
+
+    @classmethod
+    def rebuild_ratings(cls, reviews, target_field):
+        """Recompute every row's totals from a review queryset in bulk UPDATEs"""
+        per_row = reviews.filter(**{target_field: OuterRef('pk')}).order_by().values(target_field)
+        cls.objects.update(
+            rating_sum=Coalesce(Subquery(per_row.annotate(total=Sum('rating')).values('total')), 0),
+            rating_count=Coalesce(Subquery(per_row.annotate(total=Count('pk')).values('total')), 0),
+        )
+        cls.objects.update(average_rating=cls.average_expression())
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header"""
+    IN_PROGRESS = 'in_progress'
+    COMPLETED = 'completed'
+    STATE_CHOICES = [(IN_PROGRESS, 'In progress'), (COMPLETED, 'Completed')]
+
+    # Keys are per client: "user:<id>" (or "anon" on endpoints open to anonymous users)
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    # sha256 of method, path and body; a key reused for a different request is rejected
+    fingerprint = models.CharField(max_length=64)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=IN_PROGRESS)
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Refreshed when a request claims the key, a crashed request's claim lapses after IDEMPOTENCY_LEASE
+    locked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_scope_key_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.state})"
+
+
+class Job(models.Model):
+    """A unit of background work, run by manage.py run_workers (see core.jobs)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_at'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,87 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page numbers by default; ?pagination=cursor switches to keyset paging on
+    (-created_at, -id). Keyset pages skip the COUNT(*) and OFFSET scan, so
+    every page costs the same no matter how deep the client scrolls. The
+    cursor is opaque and only moves forward, results are always newest first
+    and the response carries has_next instead of a total.
+
+    Any other ordering (?ordering=, or search results ranked by relevance) is
+    refused with a 400 in cursor mode rather than silently replaced, page
+    numbers still serve those.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    unsupported_ordering_message = (
+        'Cursor pagination only lists newest first; drop the ordering or search, or use page numbers.'
+    )
+    # Orderings (as applied by the filter backends) the (-created_at, -id) keyset reproduces
+    keyset_orderings = {(), ('-created_at',), ('-created_at', '-id')}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = request.query_params.get(self.mode_query_param) == self.cursor_mode
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        if tuple(queryset.query.order_by) not in self.keyset_orderings:
+            raise ValidationError({self.mode_query_param: [self.unsupported_ordering_message]})
+        queryset = queryset.order_by('-created_at', '-id')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created_at, pk = cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        # One extra row tells us whether there is a next page without counting
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        return self.page_rows
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            created_at, pk = decoded.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj):
+        raw = f'{obj.created_at.isoformat()}|{obj.pk}'
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page_rows[-1]))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'has_next': self.has_next,
+            'results': data,
+        })
@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal
+
+from .versioning import CATALOG_GROUPS, bump_version
+
+# bulk_create() skips post_save. Code that bulk-creates rows other data is
+# derived from (rollups, counters, caches) sends this with the created
+# instances, pks set, so those receivers can catch up in one go.
+post_bulk_create = Signal()  # sender=model, instances=[...]
+
+
+def _bumper(group):
+    def receiver(sender, **kwargs):
+        # m2m_changed fires pre_ and post_ actions, only the latter changes anything
+        if kwargs.get('action', 'post_').startswith('post_'):
+            bump_version(group)
+    return receiver
+
+
+def connect_catalog_signals():
+    for group, labels in CATALOG_GROUPS.items():
+        receiver = _bumper(group)
+        for label in labels:
+            model = apps.get_model(label)
+            uid = f'catalog-version:{group}:{label}'
+            post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+            post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+            for field in model._meta.local_many_to_many:
+                m2m_changed.connect(
+                    receiver, sender=field.remote_field.through, weak=False,
+                    dispatch_uid=f'{uid}:{field.name}',
+                )
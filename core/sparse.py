@@ -0,0 +1,176 @@
+"""
+Sparse fieldsets.
+
+?fields=a,b limits a response to those fields and ?expand=rel nests a
+relation that would otherwise be sent as its primary key(s). Without either
+parameter responses are unchanged. The same field selection drives the
+queryset: relations nobody asked for are not joined or prefetched and, when
+every field's source is known, unused columns are deferred with only().
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _param_set(request, name):
+    values = set()
+    for value in request.query_params.getlist(name):
+        values.update(part.strip() for part in value.split(',') if part.strip())
+    return values
+
+
+def sparse_requested(request):
+    return request is not None and (FIELDS_PARAM in request.query_params or EXPAND_PARAM in request.query_params)
+
+
+class SparseFieldsetMixin:
+    """
+    ModelSerializer mixin, only the serializer built by the view (the one
+    holding the request context) reacts to the parameters.
+
+    Meta.expandable_fields: nested relations that render as ids unless expanded.
+    Meta.field_dependencies: {field: [model attributes]} for fields whose
+    source is a method or property, so sparse_queryset() knows what they read.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if not sparse_requested(request):
+            return
+
+        requested = _param_set(request, FIELDS_PARAM)
+        if requested:
+            for name in list(self.fields):
+                if name not in requested:
+                    self.fields.pop(name)
+
+        expand = _param_set(request, EXPAND_PARAM)
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name in self.fields and name not in expand:
+                field = self.fields[name]
+                options = {'read_only': True, 'many': isinstance(field, serializers.ListSerializer)}
+                if field.source != name:
+                    options['source'] = field.source
+                self.fields[name] = serializers.PrimaryKeyRelatedField(**options)
+
+
+def _model_attributes(serializer):
+    """
+    Model attributes the serializer reads, the relations among them it only
+    renders as ids, and whether the attribute list is complete.
+    """
+    model = serializer.Meta.model
+    dependencies = getattr(serializer.Meta, 'field_dependencies', {})
+    accessors = {rel.get_accessor_name(): rel for rel in model._meta.related_objects}
+    attributes = set()
+    ids_only = set()
+    complete = True
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in dependencies:
+            attributes.update(dependencies[name])
+            continue
+        if field.source == '*':
+            complete = False
+            continue
+        root = field.source.split('.')[0]
+        if root.startswith('get_') and root.endswith('_display'):
+            root = root[len('get_'):-len('_display')]
+        try:
+            model._meta.get_field(root)
+        except FieldDoesNotExist:
+            if root not in accessors:
+                complete = False
+                continue
+        attributes.add(root)
+        if isinstance(field, (serializers.PrimaryKeyRelatedField, serializers.ManyRelatedField)):
+            ids_only.add(root)
+    # Something else may still need the related objects
+    ids_only -= {
+        root for name, field in serializer.fields.items()
+        if not field.write_only and field.source != '*'
+        and not isinstance(field, (serializers.PrimaryKeyRelatedField, serializers.ManyRelatedField))
+        for root in [field.source.split('.')[0]]
+    }
+    for name in dependencies:
+        if name in serializer.fields:
+            ids_only -= set(dependencies[name])
+    return attributes, ids_only, complete
+
+
+def _select_paths(tree, prefix=''):
+    for name, subtree in tree.items():
+        path = f'{prefix}{name}'
+        yield path
+        yield from _select_paths(subtree, f'{path}__')
+
+
+def _lookup_root(lookup):
+    path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+    return path.split('__')[0]
+
+
+def _is_foreign_key(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return field.concrete and field.is_relation and not field.many_to_many
+
+
+def sparse_queryset(queryset, serializer):
+    """Trim queryset's joins, prefetches and columns to what serializer renders"""
+    attributes, ids_only, complete = _model_attributes(serializer)
+    joined = attributes - ids_only
+
+    select_related = queryset.query.select_related
+    if isinstance(select_related, dict):
+        # Foreign keys rendered as ids read the local column, no join needed
+        paths = [path for path in _select_paths(select_related) if path.split('__')[0] in joined]
+        queryset = queryset.select_related(None)
+        if paths:
+            queryset = queryset.select_related(*paths)
+
+    lookups = []
+    for lookup in queryset._prefetch_related_lookups:
+        root = _lookup_root(lookup)
+        if root in joined:
+            lookups.append(lookup)
+        elif root in ids_only and root not in lookups and not _is_foreign_key(queryset.model, root):
+            # Rendering ids needs the related rows, not their nested prefetches
+            lookups.append(root)
+    queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+    if complete:
+        model = queryset.model
+        columns = []
+        for name in attributes:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many:
+                columns.append(name)
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+class SparseFieldsetViewMixin:
+    """
+    Applies sparse_queryset() to GET requests that ask for a sparse fieldset.
+    Hooks filter_queryset() so views with their own get_queryset() are covered.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != 'GET' or not sparse_requested(self.request):
+            return queryset
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsetMixin):
+            return queryset
+        return sparse_queryset(queryset, serializer)
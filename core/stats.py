@@ -0,0 +1,53 @@
+"""
+Dashboard statistics.
+
+Every counter of a dashboard is a conditional aggregate (COUNT/SUM/AVG with
+a FILTER clause) over the same table, so a whole panel is one query per
+table however many numbers it shows. Breakdowns add a GROUP BY. Results can
+sit behind a short-lived cache (STATS_CACHE_TIMEOUT, 0 disables it): dashboard
+numbers may lag by that much, the tables aren't scanned on every refresh.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+
+
+def count(**conditions):
+    return Count('pk', filter=Q(**conditions) if conditions else None)
+
+
+def total(field, **conditions):
+    return Sum(field, filter=Q(**conditions) if conditions else None)
+
+
+def average(field, **conditions):
+    return Avg(field, filter=Q(**conditions) if conditions else None)
+
+
+def _zero_nulls(row, names):
+    # SUM/AVG over no rows is NULL, dashboards show 0
+    return {name: 0 if row[name] is None else row[name] for name in names}
+
+
+def aggregate(queryset, metrics):
+    """{name: aggregate} -> {name: value} in one query"""
+    return _zero_nulls(queryset.aggregate(**metrics), metrics)
+
+
+def grouped(queryset, field, metrics):
+    """{value of field: {name: value}} in one GROUP BY query"""
+    rows = queryset.order_by().values(field).annotate(**metrics)
+    return {row[field]: _zero_nulls(row, metrics) for row in rows}
+
+
+def cached(key, compute, timeout=None):
+    """compute() behind the stats cache"""
+    timeout = settings.STATS_CACHE_TIMEOUT if timeout is None else timeout
+    if not timeout:
+        return compute()
+    key = f'stats:{key}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute()
+        cache.set(key, stats, timeout)
+    return stats
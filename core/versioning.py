@@ -0,0 +1,71 @@
+"""
+Catalog versions.
+
+Every model in a group bumps that group's CatalogVersion row when it is saved
+or deleted (see core.signals). Readers combine the versions of the groups a
+response depends on into cache validators and cache keys, so nothing has to
+know which URLs a given change affects.
+
+Versions are also kept in the cache for VERSION_CACHE_TIMEOUT seconds so hot
+reads skip the database. A bump drops the cached entry; with a per-process
+cache other workers see the new version once their copy expires.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CatalogVersion
+
+CATALOG_GROUPS = {
+    'products': [
+        'products.MainCategory', 'products.SubCategory', 'products.Category',
+        'products.Product', 'products.ProductImage', 'products.ProductVariant',
+        'products.ProductReview',
+    ],
+    'services': [
+        'services.ServiceCategory', 'services.Service', 'services.Therapist',
+        'services.ServicePackage', 'services.PackageService', 'services.ServiceAddon',
+        'services.ServiceReview',
+    ],
+    'memberships': [
+        'accounts.MembershipPlan',
+    ],
+}
+
+VERSION_CACHE_TIMEOUT = 30
+
+
+def _cache_key(group):
+    return f'catalog-version:{group}'
+
+
+def bump_version(group):
+    updated = CatalogVersion.objects.filter(group=group).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(group=group)
+    # After commit, so a concurrent reader can't re-cache the old row meanwhile
+    transaction.on_commit(lambda: cache.delete(_cache_key(group)))
+
+
+def get_versions(groups):
+    """{group: (version, updated_at)} for the given groups, at most one query"""
+    cached = cache.get_many([_cache_key(group) for group in groups])
+    versions = {group: cached[_cache_key(group)] for group in groups if _cache_key(group) in cached}
+    stale = [group for group in groups if group not in versions]
+    if not stale:
+        return versions
+
+    loaded = {
+        row['group']: (row['version'], row['updated_at'])
+        for row in CatalogVersion.objects.filter(group__in=stale).values('group', 'version', 'updated_at')
+    }
+    for group in stale:
+        if group not in loaded:
+            version, _ = CatalogVersion.objects.get_or_create(group=group)
+            loaded[group] = (version.version, version.updated_at)
+    cache.set_many({_cache_key(group): value for group, value in loaded.items()}, VERSION_CACHE_TIMEOUT)
+    versions.update(loaded)
+    return versions
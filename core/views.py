@@ -0,0 +1,16 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .mixins import response_cache_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Response cache hit/miss counters per view"""
+    stats = response_cache_stats()
+    for counts in stats.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 3) if total else None
+    return Response(stats)
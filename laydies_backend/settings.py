@@ -2,6 +2,7 @@ from pathlib import Path
 from decouple import config
 from datetime import timedelta
 import dj_database_url
+from corsheaders.defaults import default_headers
 import os
 
 # -------------------------------------------------
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 
     # Cloudinary
     # Local apps
+    'core',
     'accounts',
     'products',
     'services',
@@ -55,6 +57,8 @@ INSTALLED_APPS = [
     'cart',
     'payments',
     'appointments',
+    'search',
+    'analytics',
     'pyuploadcare.dj',
 ]
 
@@ -115,6 +119,93 @@ DATABASES = {
     )
 }
 # -------------------------------------------------
+# CACHE
+# -------------------------------------------------
+# locmem (default, per process), file or redis. Use a shared backend when
+# running several workers so signal-driven invalidation reaches all of them.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_LOCATION', default='redis://localhost:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'laydies-den',
+        }
+    }
+
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+# Admin dashboard numbers may lag by this many seconds, 0 computes them on every request
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=30, cast=int)
+
+# -------------------------------------------------
+# INVENTORY
+# -------------------------------------------------
+# Seconds checkout holds stock for an unpaid order before
+# release_expired_reservations puts it back on sale
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=900, cast=int)
+
+# -------------------------------------------------
+# IDEMPOTENCY
+# -------------------------------------------------
+# How long a stored response is replayed for an Idempotency-Key, how long a
+# duplicate waits for the original request to finish, and after how many
+# seconds an unfinished claim (crashed worker) may be taken over
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24, cast=int)
+IDEMPOTENCY_WAIT = config('IDEMPOTENCY_WAIT', default=10, cast=float)
+IDEMPOTENCY_LEASE = config('IDEMPOTENCY_LEASE', default=60, cast=int)
+
+# -------------------------------------------------
+# BACKGROUND JOBS
+# -------------------------------------------------
+# Jobs run by `manage.py run_workers`; a job still running after JOB_LEASE
+# seconds is assumed lost with its worker and queued again
+JOB_LEASE = config('JOB_LEASE', default=300, cast=int)
+
+# -------------------------------------------------
+# M-PESA (Daraja)
+# -------------------------------------------------
+# Leave MPESA_BASE_URL empty to simulate STK pushes locally, point it at
+# `manage.py fake_mpesa_gateway` to exercise the real client end to end
+MPESA_BASE_URL = config('MPESA_BASE_URL', default='')
+MPESA_CONSUMER_KEY = config('MPESA_CONSUMER_KEY', default='')
+MPESA_CONSUMER_SECRET = config('MPESA_CONSUMER_SECRET', default='')
+MPESA_SHORTCODE = config('MPESA_SHORTCODE', default='174379')
+MPESA_PASSKEY = config('MPESA_PASSKEY', default='')
+MPESA_CALLBACK_URL = config('MPESA_CALLBACK_URL', default='')
+# Secret added to the callback URL of every STK push, callbacks without it
+# are refused (all of them while it is unset)
+MPESA_CALLBACK_TOKEN = config('MPESA_CALLBACK_TOKEN', default='')
+MPESA_TIMEOUT = config('MPESA_TIMEOUT', default=15, cast=float)
+
+# -------------------------------------------------
+# APPOINTMENTS
+# -------------------------------------------------
+# Availability calendars are cached per therapist schedule version, so a
+# booking or schedule change is seen at once; the timeout only bounds memory.
+# CALENDAR_MAX_DAYS caps the range of one calendar request.
+CALENDAR_CACHE_TIMEOUT = config('CALENDAR_CACHE_TIMEOUT', default=600, cast=int)
+CALENDAR_MAX_DAYS = config('CALENDAR_MAX_DAYS', default=31, cast=int)
+# Days (from today) kept in the precomputed slot inventory, see build_slot_inventory
+SLOT_INVENTORY_DAYS = config('SLOT_INVENTORY_DAYS', default=60, cast=int)
+# Recurring series are turned into bookings this many days ahead, see expand_recurring_bookings
+RECURRING_HORIZON_DAYS = config('RECURRING_HORIZON_DAYS', default=365, cast=int)
+# How long a slot picked at checkout is held for the client, see expire_slot_holds
+SLOT_HOLD_SECONDS = config('SLOT_HOLD_SECONDS', default=300, cast=int)
+
 # -------------------------------------------------
 # PASSWORD VALIDATION
 # -------------------------------------------------
@@ -199,6 +290,8 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 CSRF_TRUSTED_ORIGINS = [
     "https://isaacparkire.github.io",
     "https://denbackend.onrender.com",
@@ -15,6 +15,7 @@ urlpatterns = [
     path('api/orders/', include('orders.urls')),
     path('api/payments/', include('payments.urls')),
     path('api/appointments/', include('appointments.urls')),
+    path('api/core/', include('core.urls')),
 ]
 
 # Serve media files in development
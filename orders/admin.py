@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Order, OrderItem, ServiceOrder, OrderTracking, 
-    OrderRefund, Coupon
+    OrderRefund, Coupon, StockReservation
 )
 
 
@@ -142,3 +142,14 @@ class CouponAdmin(admin.ModelAdmin):
     readonly_fields = ['used_count', 'is_valid', 'created_at']
     list_editable = ['is_active']
     date_hierarchy = 'valid_from'
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['order', 'product', 'variant', 'quantity', 'status', 'expires_at']
+    list_filter = ['status', 'expires_at']
+    search_fields = ['order__order_number', 'product__name', 'product__sku']
+    readonly_fields = ['order', 'product', 'variant', 'quantity', 'status', 'expires_at', 'created_at', 'updated_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('order', 'product', 'variant')
@@ -0,0 +1,184 @@
+"""
+Stock reservations for checkout.
+
+Reserving takes stock off Product/ProductVariant.stock_quantity straight
+away. The stock rows of a checkout are locked with SELECT ... FOR UPDATE,
+checked in memory and decremented with one UPDATE per table, so the cost of
+a reservation doesn't grow with the cart. Only the rows being bought are
+locked: checkouts of different products never wait on each other, and rows
+are always locked in (table, primary key) order so two checkouts sharing
+products lock them in the same order and can't deadlock.
+
+Every reservation is held for STOCK_RESERVATION_TTL seconds. Payment commits
+the order's holds, cancelling releases them, and release_expired() (run by
+the release_expired_reservations command) puts back the stock of holds that
+were never paid for.
+
+Stock moves with QuerySet.update(), which sends no signals, so every change
+bumps the products catalog version itself once its transaction commits
+(after the commit, so checkouts don't queue on the version row).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from core.versioning import bump_version
+from products.models import Product, ProductVariant
+
+from .models import ReservationStatus, StockReservation
+
+logger = logging.getLogger(__name__)
+
+# Lock order: all products before any variant, each table by primary key
+_STOCK_MODELS = [('product', Product), ('variant', ProductVariant)]
+
+
+class InsufficientStock(Exception):
+    """Raised with the lines that could not be reserved, nothing is reserved"""
+
+    def __init__(self, shortfalls):
+        self.shortfalls = shortfalls
+        super().__init__(f'Insufficient stock for {len(shortfalls)} item(s)')
+
+
+def _targets(lines):
+    """Sum (product_id, variant_id, quantity) lines per stock row, grouped by model"""
+    totals = {kind: {} for kind, _ in _STOCK_MODELS}
+    for product_id, variant_id, quantity in lines:
+        kind, pk = ('variant', variant_id) if variant_id else ('product', product_id)
+        totals[kind][pk] = totals[kind].get(pk, 0) + quantity
+    return totals
+
+
+def _adjust(model, quantities, sign):
+    """One UPDATE moving stock_quantity of every row in quantities by sign * quantity"""
+    delta = Case(
+        *[When(pk=pk, then=Value(sign * quantity)) for pk, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+    model.objects.filter(pk__in=list(quantities)).update(stock_quantity=F('stock_quantity') + delta)
+    transaction.on_commit(lambda: bump_version('products'))
+
+
+def _take(targets):
+    """Decrement stock for every target, returns the targets that were short (then nothing is taken)"""
+    shortfalls = []
+    locked = []
+    for kind, model in _STOCK_MODELS:
+        quantities = targets[kind]
+        if not quantities:
+            continue
+        stock = dict(
+            model.objects.filter(pk__in=list(quantities)).select_for_update()
+            .order_by('pk').values_list('pk', 'stock_quantity')
+        )
+        for pk, quantity in sorted(quantities.items()):
+            if stock.get(pk, 0) < quantity:
+                shortfalls.append({kind: pk, 'requested': quantity, 'available': stock.get(pk, 0)})
+        locked.append((model, quantities))
+    if shortfalls:
+        return shortfalls
+    for model, quantities in locked:
+        _adjust(model, quantities, -1)
+    return []
+
+
+def _put_back(reservations):
+    targets = _targets((r.product_id, r.variant_id, r.quantity) for r in reservations)
+    for kind, model in _STOCK_MODELS:
+        if targets[kind]:
+            _adjust(model, targets[kind], 1)
+
+
+def reserve(order, lines, ttl=None):
+    """
+    Hold stock for an order's (product_id, variant_id, quantity) lines. Either
+    every line is reserved or InsufficientStock is raised and none is.
+    """
+    lines = [line for line in lines if line[2] > 0]
+    ttl = settings.STOCK_RESERVATION_TTL if ttl is None else ttl
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    with transaction.atomic():
+        shortfalls = _take(_targets(lines))
+        if shortfalls:
+            raise InsufficientStock(shortfalls)
+        return StockReservation.objects.bulk_create([
+            StockReservation(
+                order=order, product_id=product_id, variant_id=variant_id,
+                quantity=quantity, expires_at=expires_at,
+            )
+            for product_id, variant_id, quantity in lines
+        ])
+
+
+def release(reservations):
+    """Return the stock of the held reservations in a queryset, returns how many were released"""
+    with transaction.atomic():
+        # skip_locked: a hold another worker is committing or releasing is theirs to finish
+        held = list(
+            reservations.filter(status=ReservationStatus.HELD)
+            .select_for_update(skip_locked=True)
+            .order_by('pk')
+        )
+        if not held:
+            return 0
+        StockReservation.objects.filter(pk__in=[r.pk for r in held]).update(
+            status=ReservationStatus.RELEASED, updated_at=timezone.now()
+        )
+        _put_back(held)
+    return len(held)
+
+
+def release_order(order):
+    return release(StockReservation.objects.filter(order=order))
+
+
+def commit_order(order):
+    """
+    Make a paid order's holds permanent. Holds the sweeper already released are
+    taken again if the stock is still there; returns the lines that weren't.
+    """
+    with transaction.atomic():
+        StockReservation.objects.filter(order=order, status=ReservationStatus.HELD).update(
+            status=ReservationStatus.COMMITTED, updated_at=timezone.now()
+        )
+        released = list(
+            StockReservation.objects.filter(order=order, status=ReservationStatus.RELEASED)
+            .select_for_update()
+            .order_by('pk')
+        )
+        if not released:
+            return []
+        shortfalls = _take(_targets((r.product_id, r.variant_id, r.quantity) for r in released))
+        if not shortfalls:
+            StockReservation.objects.filter(pk__in=[r.pk for r in released]).update(
+                status=ReservationStatus.COMMITTED, updated_at=timezone.now()
+            )
+            return []
+    # Paid for stock that has since been sold: none of it was taken, staff sort it out
+    logger.warning(
+        'Order %s was paid after its stock holds expired and %d item(s) are no longer available',
+        order.pk, len(shortfalls),
+    )
+    return shortfalls
+
+
+def release_expired(now=None, batch_size=500):
+    """Release every held reservation past its expiry, returns how many were released"""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        batch = StockReservation.objects.filter(
+            pk__in=list(
+                StockReservation.objects.filter(status=ReservationStatus.HELD, expires_at__lte=now)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+        )
+        count = release(batch)
+        released += count
+        if count < batch_size:
+            return released
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from orders.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Put back the stock of checkout reservations whose hold has expired (run every minute or so)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired stock reservations.'))
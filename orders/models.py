@@ -17,6 +17,15 @@ class OrderStatus(models.TextChoices):
     REFUNDED = 'refunded', 'Refunded'
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        """Prefetch what OrderSerializer renders (user, items and their products)"""
+        items = OrderItem.objects.select_related('variant').prefetch_related(
+            models.Prefetch('product', queryset=Product.objects.for_simple())
+        )
+        return self.select_related('user').prefetch_related(models.Prefetch('items', queryset=items))
+
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     order_number = models.CharField(max_length=50, unique=True)
@@ -64,8 +73,14 @@ class Order(models.Model):
     shipped_at = models.DateTimeField(blank=True, null=True)
     delivered_at = models.DateTimeField(blank=True, null=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number} - {self.user.email}"
@@ -112,6 +127,33 @@ class OrderItem(models.Model):
         super().save(*args, **kwargs)
 
 
+class ReservationStatus(models.TextChoices):
+    HELD = 'held', 'Held'
+    COMMITTED = 'committed', 'Committed'
+    RELEASED = 'released', 'Released'
+
+
+class StockReservation(models.Model):
+    """Stock taken off a product or variant for an order until it is paid for or the hold expires"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, blank=True, null=True)
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=20, choices=ReservationStatus.choices, default=ReservationStatus.HELD)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        target = f"{self.product_id}/{self.variant_id}" if self.variant_id else f"{self.product_id}"
+        return f"{self.get_status_display()}: {self.quantity} x {target} for order {self.order_id}"
+
+
 class ServiceOrder(models.Model):
     """Orders specifically for services/appointments"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='service_orders')
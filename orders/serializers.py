@@ -6,6 +6,7 @@ from .models import (
 from products.serializers import ProductSimpleSerializer, ProductVariantSerializer
 from services.serializers import ServiceSimpleSerializer
 from accounts.serializers import UserSerializer
+from core.sparse import SparseFieldsetMixin
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -22,7 +23,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     items = OrderItemSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -44,6 +45,14 @@ class OrderSerializer(serializers.ModelSerializer):
             'items', 'full_shipping_address', 'total_items',
             'created_at', 'updated_at', 'shipped_at', 'delivered_at'
         ]
+        expandable_fields = ['user', 'items']
+        field_dependencies = {
+            'full_shipping_address': [
+                'shipping_address_line_1', 'shipping_address_line_2', 'shipping_city',
+                'shipping_state', 'shipping_postal_code', 'shipping_country',
+            ],
+            'total_items': ['items'],
+        }
 
 
 class CreateOrderSerializer(serializers.ModelSerializer):
@@ -1,3 +1,268 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from cart.models import Cart, CartItem
+from core.models import IdempotencyKey
+from products.models import Category, Product, ProductVariant
+
+from . import inventory
+from .models import Order, OrderItem, ReservationStatus, StockReservation
+
+SHIPPING = {
+    'shipping_first_name': 'Jane', 'shipping_last_name': 'Doe', 'shipping_email': 'jane@example.com',
+    'shipping_phone': '0700000000', 'shipping_address_line_1': '1 Road', 'shipping_city': 'Nairobi',
+    'shipping_state': 'Nairobi', 'shipping_postal_code': '00100',
+}
+BILLING = {
+    'first_name': 'Jane', 'last_name': 'Doe', 'email': 'jane@example.com', 'phone': '0700000000',
+    'address_line_1': '1 Road', 'city': 'Nairobi', 'state': 'Nairobi', 'postal_code': '00100',
+}
+
+
+class CreateOrderFromCartTests(TestCase):
+    """Checkout cost must not grow with the number of cart lines"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Skin', slug='skin')
+        cls.products = [
+            Product.objects.create(
+                name=f'Product {i}', slug=f'product-{i}', sku=f'SKU{i}', description='-',
+                short_description='-', price=Decimal('100.00'), category=category, stock_quantity=10,
+            )
+            for i in range(30)
+        ]
+        cls.variants = [
+            ProductVariant.objects.create(
+                product=product, name='Size', value='M', price_adjustment=Decimal('5.00'), stock_quantity=10,
+            )
+            for product in cls.products[:15]
+        ]
+
+    def checkout(self, email, line_count):
+        user = User.objects.create_user(email=email, password='secret')
+        cart = Cart.objects.create(user=user)
+        for i in range(line_count):
+            variant = self.variants[i] if i < len(self.variants) and i % 2 else None
+            CartItem.objects.create(cart=cart, product=self.products[i], variant=variant, quantity=2)
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                '/api/orders/from-cart/', {'shipping': SHIPPING, 'billing': BILLING}, format='json'
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response, len(queries)
+
+    def test_query_count_is_constant_in_cart_size(self):
+        # The day's first order also creates its sales rollup row
+        self.checkout('first@example.com', 1)
+        _, small = self.checkout('small@example.com', 2)
+        _, large = self.checkout('large@example.com', 30)
+        self.assertEqual(small, large)
+
+    def test_order_matches_cart(self):
+        response, _ = self.checkout('buyer@example.com', 4)
+        order = Order.objects.get(pk=response.data['id'])
+        # Lines 1 and 3 use a variant (+5.00), every line is 2 units
+        self.assertEqual(order.subtotal, Decimal('820.00'))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 4)
+        self.assertEqual(StockReservation.objects.filter(order=order).count(), 4)
+        self.assertFalse(CartItem.objects.filter(cart__user=order.user).exists())
+        self.products[0].refresh_from_db()
+        self.variants[1].refresh_from_db()
+        self.assertEqual(self.products[0].stock_quantity, 8)
+        self.assertEqual(self.variants[1].stock_quantity, 8)
+
+    def test_insufficient_stock_creates_nothing(self):
+        user = User.objects.create_user(email='short@example.com', password='secret')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=1)
+        CartItem.objects.filter(cart=cart).update(quantity=11)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/orders/from-cart/', {'shipping': SHIPPING, 'billing': BILLING}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.filter(user=user).exists())
+        self.assertTrue(CartItem.objects.filter(cart=cart).exists())
+
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password='secret', is_staff=True)
+        category = Category.objects.create(name='Skin', slug='skin')
+        cls.product = Product.objects.create(
+            name='Serum', slug='serum', sku='SER', description='-', price=Decimal('100.00'), category=category,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_orders(self, count, status='pending'):
+        for _ in range(count):
+            order = Order.objects.create(user=self.admin, subtotal=200, total_amount=200, status=status)
+            OrderItem.objects.create(
+                order=order, product=self.product, quantity=2, unit_price=Decimal('100.00'), total_price=Decimal('200.00'),
+            )
+
+    def export(self, **params):
+        response = self.client.get('/api/orders/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_and_ndjson(self):
+        self.add_orders(2)
+        lines = self.export().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('order_number,'))
+        self.assertIn('SER x2 @ 100.00', lines[1])
+
+        rows = [json.loads(line) for line in self.export(output='ndjson').splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['items'][0]['sku'], 'SER')
+        self.assertEqual(rows[0]['total_items'], 2)
+
+    def test_filters(self):
+        self.add_orders(1)
+        self.add_orders(2, status='delivered')
+        self.assertEqual(len(self.export(status='delivered,cancelled', output='ndjson').splitlines()), 2)
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        self.assertEqual(len(self.export(start=tomorrow, output='ndjson').splitlines()), 0)
+        self.assertEqual(self.client.get('/api/orders/export/', {'start': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export/', {'output': 'xml'}).status_code, 400)
+
+    def test_queries_do_not_grow_with_orders(self):
+        self.add_orders(3)
+        with self.assertNumQueries(2):  # orders with their users, items with products and variants
+            self.export()
+        self.add_orders(10)
+        with self.assertNumQueries(2):
+            self.export()
+
+    def test_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(email='shopper@example.com', password='secret'))
+        self.assertEqual(client.get('/api/orders/export/').status_code, 403)
+
+
+class StockReservationTests(TestCase):
+    """Stock changes made with update() still invalidate cached catalog reads"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='shopper@example.com', password='secret')
+        cls.product = Product.objects.create(
+            name='Serum', slug='serum', sku='SER', description='-', price=Decimal('100.00'), stock_quantity=3,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.order = Order.objects.create(user=self.user, subtotal=200, total_amount=200)
+        self.url = f'/api/products/{self.product.slug}/'
+        self.etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'MISS')
+
+    def assertStock(self, quantity):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, quantity)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock_quantity'], quantity)
+        self.etag = response['ETag']
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'MISS')
+
+    def reserve(self, quantity=3):
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.reserve(self.order, [(self.product.pk, None, quantity)])
+        self.assertStock(3 - quantity)
+
+    def test_reserve_then_release(self):
+        self.reserve()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(inventory.release_order(self.order), 1)
+        self.assertStock(3)
+
+    def test_reserve_then_commit(self):
+        self.reserve(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(inventory.commit_order(self.order), [])
+        self.assertEqual(self.order.stock_reservations.get().status, ReservationStatus.COMMITTED)
+        # Committing a live hold moves no stock, the cached reads stay valid
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag).status_code, 304)
+
+    def test_expired_holds_are_swept_and_retaken_on_payment(self):
+        self.reserve()
+        with self.captureOnCommitCallbacks(execute=True):
+            released = inventory.release_expired(now=timezone.now() + timedelta(days=1))
+        self.assertEqual(released, 1)
+        self.assertStock(3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(inventory.commit_order(self.order), [])
+        self.assertStock(0)
+
+
+class IdempotentCheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='shopper@example.com', password='secret')
+        cls.product = Product.objects.create(
+            name='Serum', slug='serum', sku='SER', description='-', price=Decimal('100.00'), stock_quantity=10,
+        )
+
+    def setUp(self):
+        CartItem.objects.create(cart=Cart.objects.create(user=self.user), product=self.product, quantity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, key='attempt-1', notes=''):
+        return self.client.post(
+            '/api/orders/from-cart/', {'shipping': SHIPPING, 'billing': BILLING, 'notes': notes},
+            format='json', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.checkout()
+        self.assertEqual(first.status_code, 201, first.data)
+        retry = self.checkout()
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['order_number'], first.data['order_number'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        self.checkout()
+        response = self.checkout(notes='leave at the door')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_duplicate_waits_for_the_original(self):
+        first = self.checkout()
+        # Pretend the original is still running and finishes while the duplicate polls
+        IdempotencyKey.objects.update(state=IdempotencyKey.IN_PROGRESS)
+        def finish(seconds):
+            IdempotencyKey.objects.update(state=IdempotencyKey.COMPLETED)
+
+        with mock.patch('core.idempotency.time.sleep', side_effect=finish) as sleep:
+            response = self.checkout()
+        sleep.assert_called_once()
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.data['order_number'], first.data['order_number'])
+
+        IdempotencyKey.objects.update(state=IdempotencyKey.IN_PROGRESS)
+        with override_settings(IDEMPOTENCY_WAIT=0):
+            self.assertEqual(self.checkout().status_code, 409)
+        self.assertEqual(Order.objects.count(), 1)
@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.OrderListView.as_view(), name='order-list'),
     path('<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('all/', views.AllOrdersView.as_view(), name='all-orders'),
+    path('export/', views.export_orders, name='export-orders'),
     
     # Order Actions
     path('<int:order_id>/cancel/', views.cancel_order, name='cancel-order'),
@@ -2,10 +2,20 @@ from django.shortcuts import render
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Avg, Count
+from django.db.models import Q, Count, Prefetch
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.utils import timezone
+from accounts.stats import for_user
+from analytics.models import DailySalesRollup
+from core.idempotency import idempotent
+from core.pagination import KeysetPagination
+from core.sparse import SparseFieldsetViewMixin
+from core.stats import aggregate, cached, total
+from core.streaming import EXPORT_CHUNK_SIZE, export_output, filter_date_range, streaming_export
+from .inventory import InsufficientStock, release_order, reserve
 from .models import (
     Order, OrderItem, ServiceOrder, OrderTracking, 
     OrderRefund, Coupon, OrderStatus
@@ -17,8 +27,9 @@ from .serializers import (
 )
 
 
-class OrderListView(generics.ListCreateAPIView):
+class OrderListView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_status', 'created_at']
     search_fields = ['order_number', 'shipping_email', 'billing_email']
@@ -26,7 +37,7 @@ class OrderListView(generics.ListCreateAPIView):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.with_details().filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -34,18 +45,19 @@ class OrderListView(generics.ListCreateAPIView):
         return OrderSerializer
 
 
-class OrderDetailView(generics.RetrieveUpdateAPIView):
+class OrderDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OrderWithTrackingSerializer
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.with_details().filter(user=self.request.user).prefetch_related('tracking')
 
 
-class AllOrdersView(generics.ListAPIView):
+class AllOrdersView(SparseFieldsetViewMixin, generics.ListAPIView):
     """Admin view to see all orders"""
-    queryset = Order.objects.all()
+    queryset = Order.objects.with_details()
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_status', 'created_at', 'user']
     search_fields = [
@@ -125,15 +137,17 @@ def cancel_order(request, order_id):
             status=400
         )
     
-    order.status = OrderStatus.CANCELLED
-    order.save()
-    
-    # Create tracking entry
-    OrderTracking.objects.create(
-        order=order,
-        status=OrderStatus.CANCELLED,
-        description='Order cancelled by customer'
-    )
+    with transaction.atomic():
+        order.status = OrderStatus.CANCELLED
+        order.save()
+        release_order(order)
+
+        # Create tracking entry
+        OrderTracking.objects.create(
+            order=order,
+            status=OrderStatus.CANCELLED,
+            description='Order cancelled by customer'
+        )
     
     serializer = OrderSerializer(order)
     return Response(serializer.data)
@@ -166,64 +180,75 @@ def apply_coupon(request):
 @permission_classes([IsAuthenticated])
 def user_order_stats(request):
     """Get order statistics for the current user"""
-    user_orders = Order.objects.filter(user=request.user)
-    
+    user_stats = for_user(request.user)
+
     stats = {
-        'total_orders': user_orders.count(),
-        'pending_orders': user_orders.filter(status=OrderStatus.PENDING).count(),
-        'completed_orders': user_orders.filter(status=OrderStatus.DELIVERED).count(),
-        'total_spent': user_orders.filter(
-            status=OrderStatus.DELIVERED
-        ).aggregate(total=Sum('total_amount'))['total'] or 0,
-        'average_order_value': user_orders.aggregate(
-            avg=Avg('total_amount')
-        )['avg'] or 0
+        'total_orders': user_stats.order_count,
+        'pending_orders': user_stats.pending_orders,
+        'completed_orders': user_stats.delivered_orders,
+        'total_spent': user_stats.delivered_amount,
+        'average_order_value': (
+            user_stats.order_amount / user_stats.order_count if user_stats.order_count else 0
+        ),
     }
-    
+
     return Response(stats)
 
 
 @api_view(['GET'])
 def order_dashboard_stats(request):
     """Get overall order statistics (admin view)"""
-    all_orders = Order.objects.all()
-    
-    stats = {
-        'total_orders': all_orders.count(),
-        'pending_orders': all_orders.filter(status=OrderStatus.PENDING).count(),
-        'processing_orders': all_orders.filter(status=OrderStatus.PROCESSING).count(),
-        'shipped_orders': all_orders.filter(status=OrderStatus.SHIPPED).count(),
-        'delivered_orders': all_orders.filter(status=OrderStatus.DELIVERED).count(),
-        'cancelled_orders': all_orders.filter(status=OrderStatus.CANCELLED).count(),
-        'total_revenue': all_orders.filter(
-            status=OrderStatus.DELIVERED
-        ).aggregate(total=Sum('total_amount'))['total'] or 0,
-        'average_order_value': all_orders.aggregate(
-            avg=Avg('total_amount')
-        )['avg'] or 0
-    }
-    
+    def compute():
+        today = timezone.localdate()
+        stats = aggregate(DailySalesRollup.objects.all(), {
+            'total_orders': total('order_count'),
+            'pending_orders': total('order_count', status=OrderStatus.PENDING),
+            'processing_orders': total('order_count', status=OrderStatus.PROCESSING),
+            'shipped_orders': total('order_count', status=OrderStatus.SHIPPED),
+            'delivered_orders': total('order_count', status=OrderStatus.DELIVERED),
+            'cancelled_orders': total('order_count', status=OrderStatus.CANCELLED),
+            'total_revenue': total('total_amount', status=OrderStatus.DELIVERED),
+            'this_month_revenue': total(
+                'total_amount', status=OrderStatus.DELIVERED, date__gte=today.replace(day=1)
+            ),
+            'order_value': total('total_amount'),
+        })
+        order_value = stats.pop('order_value')
+        stats['average_order_value'] = order_value / stats['total_orders'] if stats['total_orders'] else 0
+        return stats
+
+    stats = cached('orders:dashboard', compute)
+
     return Response(stats)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_order_from_cart(request):
-    """Create an order from the user's cart"""
-    from cart.models import Cart
-    
+    """
+    Create an order from the user's cart. The cart is read once and everything
+    else is bulk writes, so the query count doesn't depend on the cart size.
+    """
+    from cart.models import Cart, CartItem
+
     try:
         cart = Cart.objects.get(user=request.user)
     except Cart.DoesNotExist:
         return Response({'error': 'Cart not found'}, status=400)
-    
-    if cart.is_empty:
+
+    cart_items = list(
+        CartItem.objects.filter(cart=cart).select_related('product', 'variant').order_by('pk')
+    )
+    if not cart_items:
         return Response({'error': 'Cart is empty'}, status=400)
-    
+
+    subtotal = sum(item.subtotal for item in cart_items)
+
     # Get shipping and billing information from request
     shipping_data = request.data.get('shipping', {})
     billing_data = request.data.get('billing', shipping_data)  # Use shipping if billing not provided
-    
+
     # Create order
     order_data = {
         **shipping_data,
@@ -239,34 +264,47 @@ def create_order_from_cart(request):
         'billing_country': billing_data.get('country', shipping_data.get('country', 'Kenya')),
         'notes': request.data.get('notes', ''),
         'payment_method': request.data.get('payment_method', ''),
-        'subtotal': cart.total_price,
-        'total_amount': cart.total_price,
+        'subtotal': subtotal,
+        'total_amount': subtotal,
         'user': request.user
     }
-    
-    order = Order.objects.create(**order_data)
-    
-    # Create order items from cart items
-    for cart_item in cart.items.all():
-        OrderItem.objects.create(
-            order=order,
-            product=cart_item.product,
-            variant=cart_item.variant,
-            quantity=cart_item.quantity,
-            unit_price=cart_item.unit_price,
-            total_price=cart_item.subtotal
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(**order_data)
+
+            # Prices are set here, bulk_create skips OrderItem.save()
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=cart_item.product,
+                    variant=cart_item.variant,
+                    quantity=cart_item.quantity,
+                    unit_price=cart_item.unit_price,
+                    total_price=cart_item.subtotal
+                )
+                for cart_item in cart_items
+            ])
+
+            # Hold the stock until the order is paid for or the hold expires
+            reserve(order, [(item.product_id, item.variant_id, item.quantity) for item in cart_items])
+
+            # Clear the cart
+            CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+
+            # Create initial tracking entry
+            OrderTracking.objects.create(
+                order=order,
+                status=OrderStatus.PENDING,
+                description='Order created successfully'
+            )
+    except InsufficientStock as exc:
+        return Response(
+            {'error': 'Some items are no longer in stock', 'items': exc.shortfalls},
+            status=status.HTTP_409_CONFLICT
         )
-    
-    # Clear the cart
-    cart.items.all().delete()
-    
-    # Create initial tracking entry
-    OrderTracking.objects.create(
-        order=order,
-        status=OrderStatus.PENDING,
-        description='Order created successfully'
-    )
-    
+
+    order = Order.objects.with_details().prefetch_related('tracking').get(pk=order.pk)
     serializer = OrderWithTrackingSerializer(order)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -275,9 +313,74 @@ def create_order_from_cart(request):
 def track_order(request, order_number):
     """Track an order by order number (public endpoint)"""
     try:
-        order = Order.objects.get(order_number=order_number)
+        order = Order.objects.with_details().prefetch_related('tracking').get(order_number=order_number)
     except Order.DoesNotExist:
         return Response({'error': 'Order not found'}, status=404)
     
     serializer = OrderWithTrackingSerializer(order)
     return Response(serializer.data)
+
+
+ORDER_EXPORT_COLUMNS = [
+    'order_number', 'created_at', 'customer_email', 'status', 'payment_status', 'payment_method',
+    'subtotal', 'tax_amount', 'shipping_amount', 'discount_amount', 'total_amount',
+    'total_items', 'items', 'shipping_city', 'shipping_country',
+]
+
+
+def order_export_row(order, output):
+    items = [
+        {
+            'sku': item.product.sku,
+            'product': item.product.name,
+            'variant': f"{item.variant.name}: {item.variant.value}" if item.variant else None,
+            'quantity': item.quantity,
+            'unit_price': item.unit_price,
+            'total_price': item.total_price,
+        }
+        for item in order.items.all()
+    ]
+    return {
+        'order_number': order.order_number,
+        'created_at': order.created_at.isoformat(),
+        'customer_email': order.user.email,
+        'status': order.status,
+        'payment_status': order.payment_status,
+        'payment_method': order.payment_method,
+        'subtotal': order.subtotal,
+        'tax_amount': order.tax_amount,
+        'shipping_amount': order.shipping_amount,
+        'discount_amount': order.discount_amount,
+        'total_amount': order.total_amount,
+        'total_items': sum(item['quantity'] for item in items),
+        # CSV cells can't nest, so items collapse to "SKU x2 @ 100.00; ..."
+        'items': '; '.join(
+            f"{item['sku']} x{item['quantity']} @ {item['unit_price']}" for item in items
+        ) if output == 'csv' else items,
+        'shipping_city': order.shipping_city,
+        'shipping_country': order.shipping_country,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_orders(request):
+    """Stream orders as CSV or NDJSON (?output=), filtered by ?start=, ?end=, ?status=, ?payment_status="""
+    output = export_output(request)
+    orders = filter_date_range(Order.objects.all(), request)
+    for param in ('status', 'payment_status'):
+        values = [value for value in request.query_params.get(param, '').split(',') if value]
+        if values:
+            orders = orders.filter(**{f'{param}__in': values})
+
+    items = OrderItem.objects.select_related('product', 'variant').only(
+        'order_id', 'quantity', 'unit_price', 'total_price',
+        'product__sku', 'product__name', 'variant__name', 'variant__value',
+    )
+    orders = (
+        orders.select_related('user')
+        .prefetch_related(Prefetch('items', queryset=items))
+        .order_by('created_at', 'id')
+    )
+    rows = (order_export_row(order, output) for order in orders.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    return streaming_export(rows, output, 'orders', ORDER_EXPORT_COLUMNS)
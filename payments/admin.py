@@ -110,11 +110,12 @@ class CardPaymentAdmin(admin.ModelAdmin):
 @admin.register(PaymentWebhook)
 class PaymentWebhookAdmin(admin.ModelAdmin):
     list_display = [
-        'webhook_id', 'payment_method', 'event_type', 'processed', 'created_at'
+        'webhook_id', 'payment_method', 'event_type', 'processed', 'attempts',
+        'next_attempt_at', 'created_at'
     ]
     list_filter = ['payment_method', 'event_type', 'processed', 'created_at']
-    search_fields = ['webhook_id', 'event_type']
-    readonly_fields = ['webhook_id', 'created_at']
+    search_fields = ['webhook_id', 'event_key', 'event_type']
+    readonly_fields = ['webhook_id', 'event_key', 'last_error', 'processed_at', 'created_at']
     list_editable = ['processed']
 
 
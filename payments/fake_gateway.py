@@ -0,0 +1,130 @@
+"""
+A local stand-in for the Daraja API.
+
+Serves the OAuth and STK push endpoints payments.gateway calls and, like the
+real thing, later POSTs the payment result to the request's CallBackURL.
+Run it with `manage.py fake_mpesa_gateway` and set MPESA_BASE_URL to its
+address, or start it in-process from tests:
+
+    with FakeGateway() as fake:
+        with override_settings(MPESA_BASE_URL=fake.url):
+            ...
+        fake.requests  # every STK push body received
+"""
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.startswith('/oauth/v1/generate'):
+            self._reply(200, {'access_token': uuid.uuid4().hex, 'expires_in': '3599'})
+        else:
+            self._reply(404, {'errorMessage': 'Not found'})
+
+    def do_POST(self):
+        fake = self.server.fake
+        if self.path != '/mpesa/stkpush/v1/processrequest':
+            self._reply(404, {'errorMessage': 'Not found'})
+            return
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._reply(401, {'errorMessage': 'Invalid Access Token'})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        fake.requests.append(body)
+        if fake.fail_next:
+            fake.fail_next -= 1
+            self._reply(503, {'errorMessage': 'Service unavailable'})
+            return
+
+        merchant_request_id = f'MR-{uuid.uuid4().hex[:10]}'
+        checkout_request_id = f'ws_CO_{uuid.uuid4().hex[:16]}'
+        self._reply(200, {
+            'MerchantRequestID': merchant_request_id,
+            'CheckoutRequestID': checkout_request_id,
+            'ResponseCode': '0',
+            'ResponseDescription': 'Success. Request accepted for processing',
+            'CustomerMessage': 'Success. Request accepted for processing',
+        })
+        if fake.callback_delay is not None and body.get('CallBackURL'):
+            timer = threading.Timer(
+                fake.callback_delay, fake.send_callback,
+                args=(body['CallBackURL'], merchant_request_id, checkout_request_id, body.get('Amount')),
+            )
+            timer.daemon = True
+            timer.start()
+
+
+class FakeGateway:
+    """
+    result_code: ResultCode of the callbacks (0 is a successful payment).
+    callback_delay: seconds before the callback is sent, None sends none.
+    fail_next: how many STK pushes to answer with a 503 first.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, result_code=0, callback_delay=None, verbose=False):
+        self.result_code = result_code
+        self.callback_delay = callback_delay
+        self.fail_next = 0
+        self.requests = []
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.fake = self
+        self.server.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def send_callback(self, callback_url, merchant_request_id, checkout_request_id, amount):
+        result = {
+            'MerchantRequestID': merchant_request_id,
+            'CheckoutRequestID': checkout_request_id,
+            'ResultCode': self.result_code,
+            'ResultDesc': 'The service request is processed successfully.' if self.result_code == 0
+            else 'Request cancelled by user',
+        }
+        if self.result_code == 0:
+            result['CallbackMetadata'] = {'Item': [
+                {'Name': 'Amount', 'Value': amount},
+                {'Name': 'MpesaReceiptNumber', 'Value': f'FAKE{uuid.uuid4().hex[:6].upper()}'},
+            ]}
+        try:
+            requests.post(callback_url, json={'Body': {'stkCallback': result}}, timeout=10)
+        except requests.RequestException:
+            pass
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,106 @@
+"""
+M-Pesa Daraja client.
+
+Only called from background jobs (payments.tasks), never inside a request:
+a Daraja round trip takes seconds. With MPESA_BASE_URL unset the push is
+simulated, which keeps local development and tests offline; the fake
+gateway (payments.fake_gateway) speaks the same protocol for end-to-end runs.
+"""
+import base64
+import math
+from datetime import datetime
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+TOKEN_CACHE_KEY = 'payments:mpesa:token'
+
+
+class GatewayError(Exception):
+    """Transient failure (network, 5xx), worth retrying"""
+
+
+class GatewayRejected(Exception):
+    """The gateway refused the request, retrying won't help"""
+
+
+def is_simulated():
+    return not settings.MPESA_BASE_URL
+
+
+def stk_amount(amount):
+    # Daraja takes whole shillings, round up rather than undercharge
+    return math.ceil(amount)
+
+
+def callback_url():
+    """MPESA_CALLBACK_URL carrying the token mpesa_webhook checks"""
+    separator = '&' if '?' in settings.MPESA_CALLBACK_URL else '?'
+    return settings.MPESA_CALLBACK_URL + separator + urlencode({'token': settings.MPESA_CALLBACK_TOKEN})
+
+
+def _url(path):
+    return settings.MPESA_BASE_URL.rstrip('/') + path
+
+
+def _request(method, path, **kwargs):
+    try:
+        response = requests.request(method, _url(path), timeout=settings.MPESA_TIMEOUT, **kwargs)
+    except requests.RequestException as exc:
+        raise GatewayError(str(exc)) from exc
+    if response.status_code >= 500:
+        raise GatewayError(f'M-Pesa returned {response.status_code}')
+    try:
+        body = response.json()
+    except ValueError:
+        raise GatewayError(f'M-Pesa returned a non-JSON {response.status_code} response')
+    if response.status_code >= 400:
+        raise GatewayRejected(body.get('errorMessage') or f'M-Pesa returned {response.status_code}')
+    return body
+
+
+def access_token():
+    token = cache.get(TOKEN_CACHE_KEY)
+    if token:
+        return token
+    body = _request(
+        'GET', '/oauth/v1/generate?grant_type=client_credentials',
+        auth=(settings.MPESA_CONSUMER_KEY, settings.MPESA_CONSUMER_SECRET),
+    )
+    token = body['access_token']
+    # Refresh a minute before Daraja expires it
+    cache.set(TOKEN_CACHE_KEY, token, max(int(body.get('expires_in', 3599)) - 60, 60))
+    return token
+
+
+def stk_push(phone_number, amount, reference, description):
+    """Send an STK push, returns (merchant_request_id, checkout_request_id)"""
+    if is_simulated():
+        return f'MR{reference[:8]}', f'CR{reference[:8]}'
+
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    password = base64.b64encode(
+        f'{settings.MPESA_SHORTCODE}{settings.MPESA_PASSKEY}{timestamp}'.encode()
+    ).decode()
+    body = _request(
+        'POST', '/mpesa/stkpush/v1/processrequest',
+        headers={'Authorization': f'Bearer {access_token()}'},
+        json={
+            'BusinessShortCode': settings.MPESA_SHORTCODE,
+            'Password': password,
+            'Timestamp': timestamp,
+            'TransactionType': 'CustomerPayBillOnline',
+            'Amount': stk_amount(amount),
+            'PartyA': phone_number,
+            'PartyB': settings.MPESA_SHORTCODE,
+            'PhoneNumber': phone_number,
+            'CallBackURL': callback_url(),
+            'AccountReference': reference[:12],
+            'TransactionDesc': description[:13],
+        },
+    )
+    if str(body.get('ResponseCode')) != '0':
+        raise GatewayRejected(body.get('ResponseDescription') or 'STK push rejected')
+    return body['MerchantRequestID'], body['CheckoutRequestID']
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from payments.fake_gateway import FakeGateway
+
+
+class Command(BaseCommand):
+    help = 'Serve a fake M-Pesa Daraja API for local development (set MPESA_BASE_URL to its address)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--result-code', type=int, default=0, help='ResultCode sent in callbacks, 0 is success')
+        parser.add_argument('--callback-delay', type=float, default=3.0, help='Seconds before the callback is sent')
+        parser.add_argument('--no-callback', action='store_true')
+
+    def handle(self, *args, **options):
+        fake = FakeGateway(
+            host=options['host'],
+            port=options['port'],
+            result_code=options['result_code'],
+            callback_delay=None if options['no_callback'] else options['callback_delay'],
+            verbose=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fake M-Pesa gateway listening on {fake.url}'))
+        try:
+            fake.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fake.server.server_close()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from payments.webhooks import BATCH_SIZE, process_pending
+
+
+class Command(BaseCommand):
+    help = 'Apply stored payment webhooks that are due, without waiting for a worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_processed = total_failed = 0
+        while True:
+            processed, failed, _ = process_pending(batch_size)
+            total_processed += processed
+            total_failed += failed
+            if processed + failed < batch_size:
+                break
+        self.stdout.write(self.style.SUCCESS(f'Processed {total_processed} webhooks, {total_failed} failed.'))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-17 02:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_order_created_id_idx_and_more'),
+        ('payments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-created_at', '-id'], name='payment_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='payment_user_created_id_idx'),
+        ),
+    ]
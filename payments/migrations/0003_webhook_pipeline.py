@@ -0,0 +1,53 @@
+# Generated by Django 5.2.2 on 2026-10-17 02:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_payment_created_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='event_key',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mpesapayment',
+            name='checkout_request_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='mpesapayment',
+            name='mpesa_receipt_number',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='paymentwebhook',
+            index=models.Index(fields=['processed', 'next_attempt_at'], name='webhook_pending_idx'),
+        ),
+    ]
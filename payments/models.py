@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
 User = get_user_model()
@@ -54,6 +55,10 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='payment_created_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='payment_user_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Payment {self.payment_id} - {self.amount} {self.currency}"
@@ -103,8 +108,8 @@ class MpesaPayment(models.Model):
     payment = models.OneToOneField(Payment, on_delete=models.CASCADE, related_name='mpesa_details')
     phone_number = models.CharField(max_length=15)
     merchant_request_id = models.CharField(max_length=100, blank=True)
-    checkout_request_id = models.CharField(max_length=100, blank=True)
-    mpesa_receipt_number = models.CharField(max_length=100, blank=True)
+    checkout_request_id = models.CharField(max_length=100, blank=True, db_index=True)
+    mpesa_receipt_number = models.CharField(max_length=100, blank=True, db_index=True)
     transaction_date = models.DateTimeField(blank=True, null=True)
     
     def __str__(self):
@@ -130,9 +135,20 @@ class PaymentWebhook(models.Model):
     webhook_id = models.CharField(max_length=100, unique=True)
     event_type = models.CharField(max_length=50)
     data = models.JSONField()
+    # Provider's identity of the event, gateway retries of a delivery share it
+    event_key = models.CharField(max_length=255, unique=True, blank=True, null=True)
     processed = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['processed', 'next_attempt_at'], name='webhook_pending_idx'),
+        ]
+
     def __str__(self):
         return f"Webhook {self.webhook_id} - {self.event_type}"
 
@@ -0,0 +1,16 @@
+"""
+Payment status for client polling.
+
+Clients poll /payments/<payment_id>/status/ every few seconds while an STK
+push is outstanding. The status is changed by run_workers, in another process,
+so every poll reads the row itself: a unique-index lookup on payment_id that
+loads only the fields the response needs.
+"""
+from .models import Payment
+
+FIELDS = ['payment_id', 'user_id', 'status', 'failure_reason', 'gateway_reference', 'completed_at', 'updated_at']
+
+
+def get_status(payment_id):
+    """The payment's status fields, or None if there is no such payment"""
+    return Payment.objects.filter(payment_id=payment_id).values(*FIELDS).first()
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.utils import timezone
+
+from core.jobs import task
+
+from . import gateway, webhooks
+from .models import Payment, PaymentStatus
+
+
+def _fail(payment_id, reason):
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(pk=payment_id)
+        if payment.status != PaymentStatus.PENDING:
+            return
+        payment.status = PaymentStatus.FAILED
+        payment.failure_reason = reason
+        payment.save()
+
+
+def _push_failed(error, payment_id):
+    _fail(payment_id, f'Could not reach M-Pesa: {error}')
+
+
+@task('payments.mpesa_stk_push', queue='payments', max_attempts=4, on_failure=_push_failed)
+def mpesa_stk_push(payment_id):
+    """Send the STK push of a pending M-Pesa payment (GatewayError is retried)"""
+    payment = Payment.objects.select_related('mpesa_details').get(pk=payment_id)
+    mpesa_payment = payment.mpesa_details
+    if payment.status != PaymentStatus.PENDING or mpesa_payment.checkout_request_id:
+        # Already pushed by an earlier run of this job, or settled meanwhile
+        return
+
+    try:
+        merchant_request_id, checkout_request_id = gateway.stk_push(
+            mpesa_payment.phone_number, payment.amount, payment.payment_id, payment.description
+        )
+    except gateway.GatewayRejected as exc:
+        _fail(payment.pk, str(exc))
+        return
+
+    mpesa_payment.merchant_request_id = merchant_request_id
+    mpesa_payment.checkout_request_id = checkout_request_id
+    mpesa_payment.save(update_fields=['merchant_request_id', 'checkout_request_id'])
+    payment.gateway_reference = checkout_request_id
+    payment.save(update_fields=['gateway_reference', 'updated_at'])
+
+
+@task('payments.process_webhooks', queue='payments', max_attempts=1)
+def process_webhooks():
+    """Apply stored webhooks until none are due, then schedule the earliest retry"""
+    while True:
+        processed, failed, retry_at = webhooks.process_pending()
+        if retry_at is not None:
+            process_webhooks.delay(delay=max((retry_at - timezone.now()).total_seconds(), 0))
+        if processed + failed < webhooks.BATCH_SIZE:
+            return
@@ -0,0 +1,203 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from core.jobs import run_pending
+from core.models import Job
+from orders.models import Order
+
+from .fake_gateway import FakeGateway
+from .models import MpesaPayment, Payment, PaymentStatus, PaymentWebhook
+
+
+class MpesaStkPushTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='payer@example.com', password='secret')
+        self.order = Order.objects.create(user=self.user, subtotal=250, total_amount=250)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def initiate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/payments/initiate/mpesa/', {
+                'phone_number': '254700000000', 'amount': '250.00', 'order_id': self.order.pk,
+            }, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        return response
+
+    def run_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return run_pending()
+
+    def test_push_runs_on_worker(self):
+        with FakeGateway() as fake, override_settings(
+            MPESA_BASE_URL=fake.url, MPESA_CALLBACK_URL='http://testserver/cb', MPESA_CALLBACK_TOKEN='s3cret',
+        ):
+            response = self.initiate()
+            # Nothing has been sent yet, the request only queued the job
+            self.assertEqual(fake.requests, [])
+            self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+            self.assertEqual(self.run_jobs(), 1)
+            self.assertEqual(len(fake.requests), 1)
+            self.assertEqual(fake.requests[0]['Amount'], 250)
+            self.assertEqual(fake.requests[0]['CallBackURL'], 'http://testserver/cb?token=s3cret')
+
+        mpesa_payment = MpesaPayment.objects.get()
+        self.assertTrue(mpesa_payment.checkout_request_id.startswith('ws_CO_'))
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+        status = self.client.get(response.data['status_url']).data
+        self.assertEqual(status['status'], PaymentStatus.PENDING)
+        self.assertEqual(status['gateway_reference'], mpesa_payment.checkout_request_id)
+
+    def test_gateway_outage_is_retried(self):
+        with FakeGateway() as fake, override_settings(MPESA_BASE_URL=fake.url):
+            fake.fail_next = 1
+            self.initiate()
+            self.run_jobs()
+            job = Job.objects.get()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertIn('503', job.last_error)
+
+            Job.objects.update(run_at=timezone.now())
+            self.run_jobs()
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(len(fake.requests), 2)
+        self.assertNotEqual(MpesaPayment.objects.get().checkout_request_id, '')
+
+    def test_payment_fails_after_last_attempt(self):
+        with FakeGateway() as fake, override_settings(MPESA_BASE_URL=fake.url):
+            fake.fail_next = 10
+            response = self.initiate()
+            for _ in range(Job.objects.get().max_attempts):
+                Job.objects.filter(status=Job.QUEUED).update(run_at=timezone.now())
+                self.run_jobs()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+        self.assertEqual(Payment.objects.get().status, PaymentStatus.FAILED)
+        self.assertEqual(self.client.get(response.data['status_url']).data['status'], PaymentStatus.FAILED)
+
+    def test_status_sees_changes_made_elsewhere(self):
+        response = self.initiate()
+        self.assertEqual(self.client.get(response.data['status_url']).data['status'], PaymentStatus.PENDING)
+        # As the worker process would, with no signal reaching this process
+        Payment.objects.update(status=PaymentStatus.COMPLETED, completed_at=timezone.now())
+        status = self.client.get(response.data['status_url']).data
+        self.assertEqual(status['status'], PaymentStatus.COMPLETED)
+        self.assertIsNotNone(status['completed_at'])
+
+    def test_status_is_private(self):
+        response = self.initiate()
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(email='other@example.com', password='secret'))
+        self.assertEqual(other.get(response.data['status_url']).status_code, 404)
+
+
+@override_settings(MPESA_CALLBACK_TOKEN='s3cret')
+class MpesaWebhookTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='payer@example.com', password='secret')
+        self.payment = Payment.objects.create(user=user, amount=250, payment_method='mpesa')
+        MpesaPayment.objects.create(payment=self.payment, phone_number='254700000000', checkout_request_id='ws_CO_1')
+        self.client = APIClient()
+
+    def callback(self, checkout_request_id='ws_CO_1', result_code=0, amount=250):
+        return {'Body': {'stkCallback': {
+            'MerchantRequestID': 'MR-1',
+            'CheckoutRequestID': checkout_request_id,
+            'ResultCode': result_code,
+            'ResultDesc': 'The service request is processed successfully.',
+            'CallbackMetadata': {'Item': [
+                {'Name': 'Amount', 'Value': amount},
+                {'Name': 'MpesaReceiptNumber', 'Value': 'RCP123'},
+            ]},
+        }}}
+
+    def post(self, body, token='s3cret'):
+        response = self.client.post(f'/api/payments/webhooks/mpesa/?token={token}', body, format='json')
+        self.assertEqual(response.data, {'ResultCode': 0, 'ResultDesc': 'Accepted'})
+        return response
+
+    def test_callbacks_without_the_token_are_refused(self):
+        for url in ['/api/payments/webhooks/mpesa/', '/api/payments/webhooks/mpesa/?token=guess']:
+            response = self.client.post(url, self.callback(), format='json')
+            self.assertEqual(response.status_code, 403)
+        with override_settings(MPESA_CALLBACK_TOKEN=''):
+            response = self.client.post('/api/payments/webhooks/mpesa/?token=', self.callback(), format='json')
+            self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentWebhook.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_amount_must_match(self):
+        self.post(self.callback(amount=1))
+        run_pending()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentStatus.FAILED)
+        self.assertIn('does not match', self.payment.failure_reason)
+
+    def test_ack_then_apply(self):
+        self.post(self.callback())
+        # Acked without touching the payment
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentStatus.PENDING)
+
+        run_pending()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentStatus.COMPLETED)
+        self.assertEqual(self.payment.gateway_transaction_id, 'RCP123')
+        self.assertEqual(MpesaPayment.objects.get().mpesa_receipt_number, 'RCP123')
+
+    def test_retried_delivery_is_stored_once(self):
+        self.post(self.callback())
+        self.post(self.callback())
+        self.assertEqual(PaymentWebhook.objects.count(), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_unknown_checkout_is_retried(self):
+        self.post(self.callback('ws_CO_unknown'))
+        run_pending()
+        webhook = PaymentWebhook.objects.get()
+        self.assertFalse(webhook.processed)
+        self.assertEqual(webhook.attempts, 1)
+        self.assertIn('WebhookNotReady', webhook.last_error)
+        # A retry job is waiting for the backoff to pass
+        self.assertTrue(Job.objects.filter(status=Job.QUEUED, run_at__gt=timezone.now()).exists())
+
+        MpesaPayment.objects.update(checkout_request_id='ws_CO_unknown')
+        PaymentWebhook.objects.update(next_attempt_at=timezone.now())
+        Job.objects.update(run_at=timezone.now())
+        run_pending()
+        webhook.refresh_from_db()
+        self.assertTrue(webhook.processed)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentStatus.COMPLETED)
+
+
+class PaymentExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='secret', is_staff=True)
+        order = Order.objects.create(user=self.admin, subtotal=250, total_amount=250)
+        Payment.objects.create(user=self.admin, order=order, amount=250, payment_method='mpesa')
+        Payment.objects.create(user=self.admin, amount=100, payment_method='card', status=PaymentStatus.COMPLETED)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get('/api/payments/export/', params)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_csv_and_filters(self):
+        lines = self.export()
+        self.assertTrue(lines[0].startswith('payment_id,'))
+        self.assertEqual(len(lines), 3)
+        self.assertIn(Order.objects.get().order_number, lines[1])
+
+        rows = [json.loads(line) for line in self.export(output='ndjson', payment_method='card')]
+        self.assertEqual([(row['amount'], row['status']) for row in rows], [('100.00', PaymentStatus.COMPLETED)])
@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.PaymentListView.as_view(), name='payment-list'),
     path('<int:pk>/', views.PaymentDetailView.as_view(), name='payment-detail'),
     path('all/', views.AllPaymentsView.as_view(), name='all-payments'),
+    path('export/', views.export_payments, name='export-payments'),
     
     # Payment Methods
     path('mpesa/', views.MpesaPaymentListView.as_view(), name='mpesa-payments'),
@@ -20,6 +21,7 @@ urlpatterns = [
     # Refunds
     path('refunds/', views.PaymentRefundListView.as_view(), name='refund-list'),
     path('<str:payment_id>/refund/', views.request_refund, name='request-refund'),
+    path('<str:payment_id>/status/', views.payment_status, name='payment-status'),
     
     # Statistics
     path('stats/', views.payment_stats, name='payment-stats'),
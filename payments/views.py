@@ -1,14 +1,26 @@
 from rest_framework import generics, filters, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Count, Avg
+from django.db.models import Q, Sum, Count
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from accounts.stats import for_user
+from analytics.models import DailyPaymentRollup
+from core.idempotency import idempotent
+from core.pagination import KeysetPagination
+from core.stats import aggregate, cached, count, grouped, total
+from core.streaming import EXPORT_CHUNK_SIZE, export_output, filter_date_range, streaming_export
+from orders.inventory import commit_order
 from .models import (
     Payment, PaymentRefund, MpesaPayment, CardPayment,
-    PaymentWebhook, PaymentAttempt, PaymentStatus, PaymentMethod
+    PaymentAttempt, PaymentStatus, PaymentMethod
 )
+from .status import get_status
+from .tasks import mpesa_stk_push, process_webhooks
+from .webhooks import ingest, is_mpesa_callback, mpesa_event_key
 from .serializers import (
     PaymentSerializer, CreatePaymentSerializer, MpesaPaymentSerializer,
     InitiateMpesaPaymentSerializer, CardPaymentSerializer, InitiateCardPaymentSerializer,
@@ -19,6 +31,7 @@ from .serializers import (
 
 class PaymentListView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_method', 'currency']
     search_fields = ['payment_id', 'gateway_transaction_id', 'description']
@@ -46,6 +59,7 @@ class AllPaymentsView(generics.ListAPIView):
     """Admin view to see all payments"""
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_method', 'currency', 'user']
     search_fields = [
@@ -94,6 +108,7 @@ class CardPaymentListView(generics.ListAPIView):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def initiate_mpesa_payment(request):
     """Initiate M-Pesa STK Push payment"""
     serializer = InitiateMpesaPaymentSerializer(data=request.data)
@@ -130,44 +145,42 @@ def initiate_mpesa_payment(request):
             except ServiceOrder.DoesNotExist:
                 return Response({'error': 'Service order not found'}, status=400)
 
-        payment = Payment.objects.create(**payment_data)
-        
-        # Create M-Pesa specific record
-        mpesa_payment = MpesaPayment.objects.create(
-            payment=payment,
-            phone_number=phone_number
-        )
+        with transaction.atomic():
+            payment = Payment.objects.create(**payment_data)
 
-        # Here you would integrate with M-Pesa API
-        # For now, we'll simulate the process
-        try:
-            # Simulate M-Pesa STK Push
-            # In production, call actual M-Pesa API here
-            mpesa_payment.merchant_request_id = f"MR{payment.payment_id[:8]}"
-            mpesa_payment.checkout_request_id = f"CR{payment.payment_id[:8]}"
-            mpesa_payment.save()
-            
-            payment.gateway_reference = mpesa_payment.checkout_request_id
-            payment.save()
+            # Create M-Pesa specific record
+            MpesaPayment.objects.create(
+                payment=payment,
+                phone_number=phone_number
+            )
 
-            return Response({
-                'payment_id': payment.payment_id,
-                'checkout_request_id': mpesa_payment.checkout_request_id,
-                'message': 'STK Push sent to your phone. Please enter your M-Pesa PIN to complete payment.'
-            }, status=201)
+            # The STK push itself runs on a worker (payments.tasks), the
+            # Daraja round trip would otherwise hold this request for seconds
+            mpesa_stk_push.delay(payment_id=payment.pk)
 
-        except Exception as e:
-            payment.status = PaymentStatus.FAILED
-            payment.failure_reason = str(e)
-            payment.save()
-            
-            return Response({'error': 'Failed to initiate M-Pesa payment'}, status=400)
+        return Response({
+            'payment_id': payment.payment_id,
+            'status': payment.status,
+            'status_url': reverse('payments:payment-status', args=[payment.payment_id]),
+            'message': 'STK Push is on its way to your phone. Please enter your M-Pesa PIN to complete payment.'
+        }, status=status.HTTP_202_ACCEPTED)
 
     return Response(serializer.errors, status=400)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def payment_status(request, payment_id):
+    """Current status of a payment, cheap enough to poll"""
+    payment = get_status(payment_id)
+    if payment is None or (payment['user_id'] != request.user.pk and not request.user.is_staff):
+        return Response({'error': 'Payment not found'}, status=404)
+    return Response({name: value for name, value in payment.items() if name != 'user_id'})
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def initiate_card_payment(request):
     """Initiate card payment"""
     serializer = InitiateCardPaymentSerializer(data=request.data)
@@ -224,6 +237,8 @@ def initiate_card_payment(request):
                 payment.status = PaymentStatus.COMPLETED
                 payment.gateway_transaction_id = f"TXN{payment.payment_id[:8]}"
                 payment.save()
+                if payment.order:
+                    commit_order(payment.order)
                 
                 return Response({
                     'payment_id': payment.payment_id,
@@ -295,124 +310,134 @@ def request_refund(request, payment_id):
 @permission_classes([IsAuthenticated])
 def payment_stats(request):
     """Get payment statistics for current user"""
-    user_payments = Payment.objects.filter(user=request.user)
-    
+    user_stats = for_user(request.user)
+
     stats = {
-        'total_payments': user_payments.count(),
-        'successful_payments': user_payments.filter(status=PaymentStatus.COMPLETED).count(),
-        'failed_payments': user_payments.filter(status=PaymentStatus.FAILED).count(),
-        'total_amount': user_payments.filter(status=PaymentStatus.COMPLETED).aggregate(
-            total=Sum('amount')
-        )['total'] or 0,
-        'total_refunds': PaymentRefund.objects.filter(
-            payment__user=request.user, status=PaymentStatus.COMPLETED
-        ).count(),
-        'refund_amount': PaymentRefund.objects.filter(
-            payment__user=request.user, status=PaymentStatus.COMPLETED
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        'total_payments': user_stats.payment_count,
+        'successful_payments': user_stats.successful_payments,
+        'failed_payments': user_stats.failed_payments,
+        'total_amount': user_stats.paid_amount,
+        'total_refunds': user_stats.refund_count,
+        'refund_amount': user_stats.refunded_amount,
     }
-    
+
     return Response(stats)
 
 
 @api_view(['GET'])
 def payment_dashboard_stats(request):
     """Get overall payment statistics (admin view)"""
-    all_payments = Payment.objects.all()
-    
-    stats = {
-        'total_payments': all_payments.count(),
-        'successful_payments': all_payments.filter(status=PaymentStatus.COMPLETED).count(),
-        'failed_payments': all_payments.filter(status=PaymentStatus.FAILED).count(),
-        'pending_payments': all_payments.filter(status=PaymentStatus.PENDING).count(),
-        'total_revenue': all_payments.filter(status=PaymentStatus.COMPLETED).aggregate(
-            total=Sum('amount')
-        )['total'] or 0,
-        'average_payment': all_payments.filter(status=PaymentStatus.COMPLETED).aggregate(
-            avg=Avg('amount')
-        )['avg'] or 0,
-        'refund_count': PaymentRefund.objects.filter(status=PaymentStatus.COMPLETED).count(),
-        'total_refunded': PaymentRefund.objects.filter(status=PaymentStatus.COMPLETED).aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-    }
-    
-    return Response(stats)
+    def compute():
+        stats = aggregate(DailyPaymentRollup.objects.all(), {
+            'total_payments': total('payment_count'),
+            'successful_payments': total('payment_count', status=PaymentStatus.COMPLETED),
+            'failed_payments': total('payment_count', status=PaymentStatus.FAILED),
+            'pending_payments': total('payment_count', status=PaymentStatus.PENDING),
+            'total_revenue': total('amount', status=PaymentStatus.COMPLETED),
+        })
+        successful = stats['successful_payments']
+        stats['average_payment'] = stats['total_revenue'] / successful if successful else 0
+        # Refunds aren't rolled up, there are few of them
+        stats.update(aggregate(PaymentRefund.objects.filter(status=PaymentStatus.COMPLETED), {
+            'refund_count': count(),
+            'total_refunded': total('amount'),
+        }))
+        return stats
+
+    return Response(cached('payments:dashboard', compute))
 
 
 @api_view(['GET'])
 def payment_methods_stats(request):
     """Get statistics by payment method"""
-    from django.db.models import F, Case, When, IntegerField
-    
-    method_stats = []
-    
-    for method, method_name in PaymentMethod.choices:
-        payments = Payment.objects.filter(payment_method=method)
-        successful_payments = payments.filter(status=PaymentStatus.COMPLETED)
-        
-        total_count = payments.count()
-        success_count = successful_payments.count()
-        success_rate = (success_count / total_count * 100) if total_count > 0 else 0
-        
-        method_stats.append({
-            'payment_method': method_name,
-            'count': total_count,
-            'total_amount': successful_payments.aggregate(total=Sum('amount'))['total'] or 0,
-            'success_rate': round(success_rate, 2)
+    def compute():
+        by_method = grouped(DailyPaymentRollup.objects.all(), 'payment_method', {
+            'count': total('payment_count'),
+            'success_count': total('payment_count', status=PaymentStatus.COMPLETED),
+            'total_amount': total('amount', status=PaymentStatus.COMPLETED),
         })
-    
-    return Response(method_stats)
+        method_stats = []
+        for method, method_name in PaymentMethod.choices:
+            row = by_method.get(method, {'count': 0, 'success_count': 0, 'total_amount': 0})
+            success_rate = (row['success_count'] / row['count'] * 100) if row['count'] > 0 else 0
+            method_stats.append({
+                'payment_method': method_name,
+                'count': row['count'],
+                'total_amount': row['total_amount'],
+                'success_rate': round(success_rate, 2)
+            })
+        return method_stats
+
+    return Response(cached('payments:methods', compute))
 
 
 @api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
 def mpesa_webhook(request):
-    """Handle M-Pesa webhook notifications"""
-    # This endpoint would handle M-Pesa callback
-    # For security, you should validate the request
-    
+    """
+    Handle M-Pesa webhook notifications. Only stores the callback and acks,
+    a worker applies it (payments.webhooks); retried deliveries are acked again.
+    Callbacks without the MPESA_CALLBACK_TOKEN of our callback URL are refused.
+    """
+    if not is_mpesa_callback(request):
+        return Response({'ResultCode': 1, 'ResultDesc': 'Rejected'}, status=status.HTTP_403_FORBIDDEN)
     data = request.data
-    
-    # Create webhook record
-    webhook = PaymentWebhook.objects.create(
-        payment_method=PaymentMethod.MPESA,
-        event_type=data.get('event_type', 'payment_notification'),
-        data=data
+    with transaction.atomic():
+        webhook = ingest(
+            PaymentMethod.MPESA,
+            data.get('event_type', 'payment_notification'),
+            data,
+            mpesa_event_key(data),
+        )
+        if webhook is not None:
+            process_webhooks.delay()
+    return Response({'ResultCode': 0, 'ResultDesc': 'Accepted'}, status=200)
+
+
+PAYMENT_EXPORT_COLUMNS = [
+    'payment_id', 'created_at', 'completed_at', 'customer_email', 'order_number',
+    'amount', 'currency', 'payment_method', 'status',
+    'gateway_transaction_id', 'gateway_reference', 'failure_reason',
+]
+
+
+def payment_export_row(payment):
+    return {
+        'payment_id': payment.payment_id,
+        'created_at': payment.created_at.isoformat(),
+        'completed_at': payment.completed_at.isoformat() if payment.completed_at else None,
+        'customer_email': payment.user.email,
+        'order_number': payment.order.order_number if payment.order else None,
+        'amount': payment.amount,
+        'currency': payment.currency,
+        'payment_method': payment.payment_method,
+        'status': payment.status,
+        'gateway_transaction_id': payment.gateway_transaction_id,
+        'gateway_reference': payment.gateway_reference,
+        'failure_reason': payment.failure_reason,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_payments(request):
+    """Stream payments as CSV or NDJSON (?output=), filtered by ?start=, ?end=, ?status=, ?payment_method="""
+    output = export_output(request)
+    payments = filter_date_range(Payment.objects.all(), request)
+    for param in ('status', 'payment_method'):
+        values = [value for value in request.query_params.get(param, '').split(',') if value]
+        if values:
+            payments = payments.filter(**{f'{param}__in': values})
+
+    payments = (
+        payments.select_related('user', 'order')
+        .only(*[
+            'payment_id', 'created_at', 'completed_at', 'amount', 'currency', 'payment_method', 'status',
+            'gateway_transaction_id', 'gateway_reference', 'failure_reason',
+            'user__email', 'order__order_number',
+        ])
+        .order_by('created_at', 'id')
     )
-    
-    # Process the webhook data
-    try:
-        # Extract relevant information from M-Pesa callback
-        checkout_request_id = data.get('CheckoutRequestID')
-        result_code = data.get('ResultCode')
-        
-        if checkout_request_id:
-            try:
-                mpesa_payment = MpesaPayment.objects.get(checkout_request_id=checkout_request_id)
-                payment = mpesa_payment.payment
-                
-                if result_code == 0:  # Success
-                    payment.status = PaymentStatus.COMPLETED
-                    payment.gateway_transaction_id = data.get('MpesaReceiptNumber')
-                    mpesa_payment.mpesa_receipt_number = data.get('MpesaReceiptNumber')
-                    
-                    from django.utils import timezone
-                    payment.completed_at = timezone.now()
-                else:
-                    payment.status = PaymentStatus.FAILED
-                    payment.failure_reason = data.get('ResultDesc', 'Payment failed')
-                
-                payment.gateway_response = data
-                payment.save()
-                mpesa_payment.save()
-                
-                webhook.processed = True
-                webhook.save()
-                
-            except MpesaPayment.DoesNotExist:
-                pass  # Payment not found, might be a different transaction
-        
-        return Response({'status': 'success'}, status=200)
-        
-    except Exception as e:
-        return Response({'status': 'error', 'message': str(e)}, status=400)
+    rows = (payment_export_row(payment) for payment in payments.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    return streaming_export(rows, output, 'payments', PAYMENT_EXPORT_COLUMNS)
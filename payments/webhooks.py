@@ -0,0 +1,174 @@
+"""
+Payment webhook pipeline.
+
+Gateways retry callbacks that aren't acknowledged quickly, so the endpoint
+only stores the raw payload and acks: one insert keyed on the provider's
+event key (a retried delivery hits the unique index and is acked without a
+second row) plus one job insert. Workers then apply webhooks in batches
+(process_pending), retrying failures with exponential backoff until
+MAX_ATTEMPTS, after which the row is left for staff with its last error.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.crypto import constant_time_compare
+from django.utils import timezone
+
+from orders.inventory import commit_order
+
+from .gateway import stk_amount
+from .models import MpesaPayment, PaymentMethod, PaymentStatus, PaymentWebhook
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 6
+RETRY_DELAY = 30  # seconds, doubled after every failed attempt
+
+
+class WebhookNotReady(Exception):
+    """The webhook refers to something we don't know about (yet), try again later"""
+
+
+def parse_mpesa_callback(data):
+    """
+    Normalise an STK callback, either Daraja's {"Body": {"stkCallback": ...}}
+    envelope or the flat form earlier integrations posted.
+    """
+    callback = (data.get('Body') or {}).get('stkCallback') or data
+    metadata = {
+        item.get('Name'): item.get('Value')
+        for item in (callback.get('CallbackMetadata') or {}).get('Item', [])
+    }
+    result_code = callback.get('ResultCode')
+    return {
+        'checkout_request_id': callback.get('CheckoutRequestID') or '',
+        'result_code': int(result_code) if result_code not in (None, '') else None,
+        'result_desc': callback.get('ResultDesc') or '',
+        'receipt_number': metadata.get('MpesaReceiptNumber') or callback.get('MpesaReceiptNumber') or '',
+        'amount': metadata.get('Amount', callback.get('Amount')),
+    }
+
+
+def is_mpesa_callback(request):
+    """Whether a callback carries the token gateway.callback_url() gave Daraja"""
+    token = request.query_params.get('token', '')
+    return bool(settings.MPESA_CALLBACK_TOKEN) and constant_time_compare(token, settings.MPESA_CALLBACK_TOKEN)
+
+
+def _paid_amount(result):
+    try:
+        return Decimal(str(result['amount']))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def mpesa_event_key(data):
+    # One STK push gets one final result, so its CheckoutRequestID names the event
+    checkout_request_id = parse_mpesa_callback(data)['checkout_request_id']
+    if checkout_request_id:
+        return f'mpesa:{checkout_request_id}'
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    return f'mpesa:sha256:{digest}'
+
+
+def ingest(payment_method, event_type, data, event_key):
+    """Store a webhook, returns it or None when the event was already received"""
+    try:
+        with transaction.atomic():
+            return PaymentWebhook.objects.create(
+                payment_method=payment_method, event_type=event_type, data=data, event_key=event_key,
+            )
+    except IntegrityError:
+        return None
+
+
+def apply_mpesa(webhook):
+    result = parse_mpesa_callback(webhook.data)
+    if not result['checkout_request_id']:
+        return
+    mpesa_payment = (
+        MpesaPayment.objects.select_related('payment__order').select_for_update(of=('self', 'payment'))
+        .filter(checkout_request_id=result['checkout_request_id']).first()
+    )
+    if mpesa_payment is None:
+        # The callback can beat the worker that records the CheckoutRequestID
+        raise WebhookNotReady(f"No M-Pesa payment with CheckoutRequestID {result['checkout_request_id']}")
+
+    payment = mpesa_payment.payment
+    if payment.status not in (PaymentStatus.PENDING, PaymentStatus.PROCESSING):
+        return  # settled already
+
+    paid = _paid_amount(result)
+    if result['result_code'] == 0 and paid != stk_amount(payment.amount):
+        logger.warning(
+            'M-Pesa callback for payment %s paid %s, expected %s', payment.payment_id, paid, payment.amount,
+        )
+        payment.status = PaymentStatus.FAILED
+        payment.failure_reason = f'Paid amount {paid} does not match {payment.amount}'
+    elif result['result_code'] == 0:
+        payment.status = PaymentStatus.COMPLETED
+        payment.gateway_transaction_id = result['receipt_number']
+        payment.completed_at = timezone.now()
+        mpesa_payment.mpesa_receipt_number = result['receipt_number']
+        mpesa_payment.transaction_date = payment.completed_at
+        mpesa_payment.save(update_fields=['mpesa_receipt_number', 'transaction_date'])
+    else:
+        payment.status = PaymentStatus.FAILED
+        payment.failure_reason = result['result_desc'] or 'Payment failed'
+    payment.gateway_response = webhook.data
+    payment.save()
+
+    if payment.status == PaymentStatus.COMPLETED and payment.order:
+        commit_order(payment.order)
+
+
+HANDLERS = {
+    PaymentMethod.MPESA: apply_mpesa,
+}
+
+
+def _handle(webhook):
+    handler = HANDLERS.get(webhook.payment_method)
+    if handler is not None:
+        handler(webhook)
+
+
+def process_pending(batch_size=BATCH_SIZE):
+    """Apply one batch of due webhooks, returns (processed, failed, rescheduled at or None)"""
+    now = timezone.now()
+    processed = failed = 0
+    retry_at = None
+    with transaction.atomic():
+        webhooks = list(
+            PaymentWebhook.objects.filter(processed=False, next_attempt_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+            .select_for_update(skip_locked=True)
+            .order_by('pk')[:batch_size]
+        )
+        for webhook in webhooks:
+            webhook.attempts += 1
+            try:
+                with transaction.atomic():
+                    _handle(webhook)
+            except Exception as exc:
+                failed += 1
+                webhook.last_error = f'{type(exc).__name__}: {exc}'
+                webhook.next_attempt_at = now + timedelta(seconds=RETRY_DELAY * 2 ** (webhook.attempts - 1))
+                if webhook.attempts < MAX_ATTEMPTS:
+                    retry_at = min(retry_at or webhook.next_attempt_at, webhook.next_attempt_at)
+                else:
+                    logger.error('Giving up on webhook %s: %s', webhook.webhook_id, webhook.last_error)
+                continue
+            processed += 1
+            webhook.processed = True
+            webhook.processed_at = timezone.now()
+            webhook.last_error = ''
+        PaymentWebhook.objects.bulk_update(
+            webhooks, ['attempts', 'processed', 'processed_at', 'last_error', 'next_attempt_at']
+        )
+    return processed, failed, retry_at
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'products'
\ No newline at end of file
+    name = 'products'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,290 @@
+"""
+Bulk catalog import/export.
+
+Rows are streamed from CSV or JSONL, converted with the model fields' own
+to_python(), and upserted in chunks with bulk_create(update_conflicts=True)
+on each model's natural key. Foreign keys are given as slugs/SKUs and
+resolved through in-memory maps, so a chunk costs one INSERT ... ON CONFLICT
+plus one lookup of the new SKUs. Images have no natural key: an import
+replaces the images of every product it mentions.
+
+Bulk writes skip model signals, so CatalogImporter.finish() does what they would
+have done: refresh stored images, reindex search and bump the catalog version.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from core.versioning import bump_version
+from search import engine as search_engine
+from search.models import SearchKind
+
+from .images import refresh_primary_images
+from .models import Category, MainCategory, Product, ProductImage, ProductVariant, SubCategory
+
+FORMATS = ['csv', 'jsonl']
+
+# Spreadsheet spellings Django's BooleanField.to_python doesn't know
+BOOLEAN_STRINGS = {'true': True, 'yes': True, 'y': True, 'false': False, 'no': False, 'n': False}
+
+
+@dataclass
+class CatalogKind:
+    model: type
+    columns: list
+    # Natural key for upserts, None means replace rows per replace_by parent
+    unique_fields: list = None
+    replace_by: str = None
+    # column -> lookup that exports it (foreign keys travel as slugs/SKUs)
+    export_lookups: dict = field(default_factory=dict)
+
+
+KINDS = {
+    'main_category': CatalogKind(
+        model=MainCategory,
+        columns=['slug', 'name', 'page', 'description', 'image', 'icon', 'is_active', 'order'],
+        unique_fields=['slug'],
+    ),
+    'sub_category': CatalogKind(
+        model=SubCategory,
+        columns=['main_category', 'slug', 'name', 'description', 'image', 'icon', 'is_active', 'order'],
+        unique_fields=['main_category', 'slug'],
+        export_lookups={'main_category': 'main_category__slug'},
+    ),
+    'product': CatalogKind(
+        model=Product,
+        columns=[
+            'sku', 'slug', 'name', 'short_description', 'description',
+            'main_category', 'sub_category', 'category',
+            'price', 'original_price', 'discount_percentage',
+            'stock_quantity', 'low_stock_threshold', 'weight', 'dimensions',
+            'is_active', 'is_featured', 'is_digital', 'is_exclusive',
+            'is_limited_edition', 'is_bestseller', 'is_new_arrival',
+            'meta_title', 'meta_description', 'image',
+        ],
+        unique_fields=['sku'],
+        export_lookups={
+            'main_category': 'main_category__slug',
+            'sub_category': 'sub_category__slug',
+            'category': 'category__slug',
+        },
+    ),
+    'variant': CatalogKind(
+        model=ProductVariant,
+        columns=['product', 'name', 'value', 'price_adjustment', 'stock_quantity', 'sku_suffix'],
+        unique_fields=['product', 'name', 'value'],
+        export_lookups={'product': 'product__sku'},
+    ),
+    'image': CatalogKind(
+        model=ProductImage,
+        columns=['product', 'image', 'alt_text', 'is_primary', 'order'],
+        replace_by='product',
+        export_lookups={'product': 'product__sku'},
+    ),
+}
+
+
+class RowError(Exception):
+    pass
+
+
+# ------------------------------
+# READING / WRITING
+# ------------------------------
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row dict) from a text stream. A JSONL line that
+    isn't a JSON object yields a RowError in place of the row, so it is
+    reported with the line's number like any other bad row.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, RowError(f'invalid JSON: {exc.msg}')
+            continue
+        if not isinstance(row, dict):
+            yield line_number, RowError('expected a JSON object')
+            continue
+        yield line_number, row
+
+
+def _json_default(value):
+    # Decimals (and anything else json can't encode) travel as strings
+    return str(value)
+
+
+class RowWriter:
+    def __init__(self, stream, fmt, columns):
+        self.stream = stream
+        self.fmt = fmt
+        self.columns = columns
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(stream, fieldnames=columns)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow({name: '' if row[name] is None else row[name] for name in self.columns})
+        else:
+            self.stream.write(json.dumps(row, default=_json_default) + '\n')
+
+
+def export_rows(kind, chunk_size=2000):
+    """Yield export rows of a kind, streamed from the database"""
+    spec = KINDS[kind]
+    lookups = [spec.export_lookups.get(column, column) for column in spec.columns]
+    queryset = spec.model.objects.order_by('pk').values_list(*lookups)
+    for values in queryset.iterator(chunk_size=chunk_size):
+        yield {column: str(value) if column == 'image' and value else value
+               for column, value in zip(spec.columns, values)}
+
+
+# ------------------------------
+# IMPORT
+# ------------------------------
+class CatalogImporter:
+    """Upserts rows of one kind in chunks, keeping slug/SKU maps in memory"""
+
+    def __init__(self, kind, chunk_size=1000):
+        self.kind = kind
+        self.spec = KINDS[kind]
+        self.chunk_size = chunk_size
+        self.written = 0
+        self.errors = []
+        self.touched_products = set()
+        # Columns absent from the input keep their stored values on update
+        self.present_columns = set()
+        self._fields = {column: self.spec.model._meta.get_field(column) for column in self.spec.columns}
+        self._main_categories = dict(MainCategory.objects.values_list('slug', 'id'))
+        self._sub_categories = {
+            (main_id, slug): pk for pk, main_id, slug in SubCategory.objects.values_list('id', 'main_category_id', 'slug')
+        }
+        self._categories = dict(Category.objects.values_list('slug', 'id'))
+        self._products = {}
+        if kind in ('variant', 'image'):
+            self._products = dict(Product.objects.values_list('sku', 'id'))
+
+    def run(self, rows):
+        chunk = []
+        for line_number, row in rows:
+            if isinstance(row, RowError):
+                self.errors.append((line_number, row))
+                continue
+            try:
+                chunk.append(self.build(row))
+            except (RowError, ValidationError, ValueError) as exc:
+                self.errors.append((line_number, exc))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self.write(chunk)
+                chunk = []
+        if chunk:
+            self.write(chunk)
+        return self.written
+
+    def _value(self, column, raw):
+        model_field = self._fields[column]
+        if raw is None or raw == '':
+            if model_field.null:
+                return None
+            if model_field.has_default():
+                return model_field.get_default()
+            return ''
+        if isinstance(raw, str):
+            raw = raw.strip()
+            if isinstance(model_field, models.BooleanField):
+                raw = BOOLEAN_STRINGS.get(raw.lower(), raw)
+        return model_field.to_python(raw)
+
+    def _relation(self, column, raw, row_values):
+        slug = (raw or '').strip() if isinstance(raw, str) else raw
+        if not slug:
+            return None
+        if column == 'main_category':
+            found = self._main_categories.get(slug)
+        elif column == 'sub_category':
+            found = self._sub_categories.get((row_values.get('main_category_id'), slug))
+        elif column == 'category':
+            found = self._categories.get(slug)
+        else:
+            found = self._products.get(slug)
+        if found is None:
+            raise RowError(f'unknown {column} {slug!r}')
+        return found
+
+    def build(self, row):
+        values = {}
+        self.present_columns.update(column for column in row if column in self._fields)
+        # main_category first so sub_category slugs can be resolved within it
+        for column in sorted(self.spec.columns, key=lambda name: name != 'main_category'):
+            if column not in row:
+                continue
+            model_field = self._fields[column]
+            if model_field.is_relation:
+                values[model_field.attname] = self._relation(column, row[column], values)
+                if not model_field.null and values[model_field.attname] is None:
+                    raise RowError(f'{column} is required')
+            else:
+                values[column] = self._value(column, row[column])
+        for column in self.spec.unique_fields or [self.spec.replace_by]:
+            if values.get(self._fields[column].attname) in (None, ''):
+                raise RowError(f'{column} is required')
+        return self.spec.model(**values)
+
+    def write(self, objects):
+        spec = self.spec
+        with transaction.atomic():
+            if spec.replace_by:
+                parents = {getattr(obj, self._fields[spec.replace_by].attname) for obj in objects}
+                new_parents = parents - self.touched_products
+                spec.model.objects.filter(**{f'{spec.replace_by}_id__in': new_parents}).delete()
+                spec.model.objects.bulk_create(objects)
+            else:
+                update_fields = [
+                    column for column in spec.columns
+                    if column in self.present_columns and column not in spec.unique_fields
+                ]
+                if not update_fields:
+                    spec.model.objects.bulk_create(objects, ignore_conflicts=True)
+                else:
+                    if any(f.name == 'updated_at' for f in spec.model._meta.concrete_fields):
+                        update_fields.append('updated_at')
+                    spec.model.objects.bulk_create(
+                        objects,
+                        update_conflicts=True,
+                        unique_fields=spec.unique_fields,
+                        update_fields=update_fields,
+                    )
+        self.written += len(objects)
+        self._remember(objects)
+
+    def _remember(self, objects):
+        if self.kind == 'product':
+            skus = [obj.sku for obj in objects]
+            self.touched_products.update(Product.objects.filter(sku__in=skus).values_list('id', flat=True))
+        elif self.kind in ('variant', 'image'):
+            self.touched_products.update(obj.product_id for obj in objects)
+
+    def finish(self):
+        """Redo the work model signals would have done for the imported rows"""
+        if self.kind == 'image':
+            product_ids = list(self.touched_products)
+            for start in range(0, len(product_ids), self.chunk_size):
+                refresh_primary_images(product_ids[start:start + self.chunk_size])
+        if self.kind == 'product':
+            product_ids = list(self.touched_products)
+            for start in range(0, len(product_ids), self.chunk_size):
+                chunk = Product.objects.filter(pk__in=product_ids[start:start + self.chunk_size])
+                search_engine.index_objects(SearchKind.PRODUCT, chunk.with_categories())
+        bump_version('products')
@@ -0,0 +1,128 @@
+"""
+Facet counts for the catalog sidebar.
+
+All counts come from one grouped query over the filtered products: rows are
+grouped by (main category, sub category) and every flag and price bucket is
+a conditional COUNT on that group, so the Python roll-up below never touches
+the database again. Results are cached per normalized filter set and products
+catalog version, so any catalog change retires every cached entry.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.versioning import get_versions
+
+FACETS_TIMEOUT = 60 * 15
+
+FACET_FLAGS = [
+    'is_featured', 'is_digital', 'is_exclusive', 'is_limited_edition',
+    'is_bestseller', 'is_new_arrival',
+]
+
+# (min, max) in KES, max is exclusive and None means open ended
+PRICE_BUCKETS = [
+    (0, 1000),
+    (1000, 2500),
+    (2500, 5000),
+    (5000, 10000),
+    (10000, None),
+]
+
+
+def _bucket_filter(low, high):
+    condition = Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+def compute_facets(queryset):
+    """Facet counts for a filtered Product queryset in a single query"""
+    aggregates = {'total': Count('id')}
+    for flag in FACET_FLAGS:
+        aggregates[flag] = Count('id', filter=Q(**{flag: True}))
+    for i, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'price_{i}'] = Count('id', filter=_bucket_filter(low, high))
+
+    rows = (
+        queryset.order_by()
+        .values(
+            'main_category_id', 'main_category__name', 'main_category__slug',
+            'sub_category_id', 'sub_category__name', 'sub_category__slug',
+        )
+        .annotate(**aggregates)
+    )
+
+    total = 0
+    flags = dict.fromkeys(FACET_FLAGS, 0)
+    prices = [0] * len(PRICE_BUCKETS)
+    main_categories = {}
+    sub_categories = {}
+    for row in rows:
+        total += row['total']
+        for flag in FACET_FLAGS:
+            flags[flag] += row[flag]
+        for i in range(len(PRICE_BUCKETS)):
+            prices[i] += row[f'price_{i}']
+
+        if row['main_category_id'] is not None:
+            main = main_categories.setdefault(row['main_category_id'], {
+                'id': row['main_category_id'],
+                'name': row['main_category__name'],
+                'slug': row['main_category__slug'],
+                'count': 0,
+            })
+            main['count'] += row['total']
+        if row['sub_category_id'] is not None:
+            sub = sub_categories.setdefault(row['sub_category_id'], {
+                'id': row['sub_category_id'],
+                'name': row['sub_category__name'],
+                'slug': row['sub_category__slug'],
+                'main_category': row['main_category_id'],
+                'count': 0,
+            })
+            sub['count'] += row['total']
+
+    return {
+        'total': total,
+        'main_categories': sorted(main_categories.values(), key=lambda item: (-item['count'], item['name'])),
+        'sub_categories': sorted(sub_categories.values(), key=lambda item: (-item['count'], item['name'])),
+        'flags': flags,
+        'price_ranges': [
+            {'min': low, 'max': high, 'count': count}
+            for (low, high), count in zip(PRICE_BUCKETS, prices)
+        ],
+    }
+
+
+def normalize_params(query_params, allowed):
+    """Stable representation of the filter params that affect the result"""
+    normalized = []
+    for name in sorted(allowed):
+        values = sorted(value.strip().lower() for value in query_params.getlist(name) if value.strip())
+        if values:
+            normalized.append((name, values))
+    return normalized
+
+
+def cache_key(normalized):
+    version, _ = get_versions(['products'])['products']
+    digest = hashlib.md5(repr(normalized).encode()).hexdigest()
+    return f'products:facets:{version}:{digest}'
+
+
+def cached_facets(normalized, filtered_queryset):
+    """
+    Facets for a normalized filter set; filtered_queryset() builds the
+    filtered queryset, and is only called (and the filters only validated)
+    on a miss
+    """
+    key = cache_key(normalized)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filtered_queryset())
+        cache.set(key, facets, FACETS_TIMEOUT)
+    return facets
+
@@ -0,0 +1,44 @@
+"""
+Stored primary-image URLs.
+
+Products keep the CDN URL of their primary image plus pre-sized Uploadcare
+transform URLs, refreshed whenever a ProductImage changes, so list endpoints
+can emit images without touching the images table.
+"""
+from .models import Product, ProductImage
+
+# Uploadcare CDN operations appended to the file's cdn_url
+IMAGE_VARIANTS = {
+    'thumb': '-/scale_crop/160x160/smart/-/format/auto/-/quality/smart/',
+    'card': '-/resize/480x/-/format/auto/-/quality/smart/',
+    'zoom': '-/resize/1600x/-/format/auto/-/quality/smart/',
+}
+
+
+def image_fields(image):
+    """(primary_image_url, image_variants) for an image field value, blank if there is none"""
+    if not image:
+        return '', {}
+    cdn_url = getattr(image, 'cdn_url', None)
+    if cdn_url:
+        if not cdn_url.endswith('/'):
+            cdn_url += '/'
+        return cdn_url, {name: cdn_url + operations for name, operations in IMAGE_VARIANTS.items()}
+    # Not on the CDN (plain file storage), every size is the original
+    url = getattr(image, 'url', None) or str(image)
+    return url, dict.fromkeys(IMAGE_VARIANTS, url)
+
+
+def refresh_primary_images(product_ids, batch_size=500):
+    """Recompute the stored image fields of the given products"""
+    product_ids = set(product_ids)
+    primary = {}
+    images = ProductImage.objects.filter(product_id__in=product_ids, is_primary=True).order_by('order', 'id')
+    for image in images.only('product_id', 'image'):
+        primary.setdefault(image.product_id, image.image)
+
+    products = []
+    for product_id in product_ids:
+        url, variants = image_fields(primary.get(product_id))
+        products.append(Product(pk=product_id, primary_image_url=url, image_variants=variants))
+    Product.objects.bulk_update(products, ['primary_image_url', 'image_variants'], batch_size=batch_size)
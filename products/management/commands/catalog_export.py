@@ -0,0 +1,41 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from products.catalog_io import FORMATS, KINDS, RowWriter, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream catalog rows (categories, products, variants, images) to CSV or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(KINDS))
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or '-' for stdout")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        kind = options['kind']
+
+        started = time.monotonic()
+        written = 0
+        if path == '-':
+            stream = sys.stdout
+        else:
+            stream = Path(path).open('w', newline='', encoding='utf-8')
+        try:
+            writer = RowWriter(stream, fmt, KINDS[kind].columns)
+            for row in export_rows(kind, chunk_size=options['chunk_size']):
+                writer.write(row)
+                written += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = time.monotonic() - started
+
+        # Keep stdout clean for the data when streaming to it
+        report = self.stderr if path == '-' else self.stdout
+        report.write(f'{written} {kind} rows exported in {elapsed:.2f}s')
@@ -0,0 +1,49 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from products.catalog_io import FORMATS, KINDS, CatalogImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk upsert catalog rows (categories, products, variants, images) from CSV or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(KINDS))
+        parser.add_argument('path', help="File to read, or '-' for stdin")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--max-errors', type=int, default=20, help='How many bad rows to list')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        importer = CatalogImporter(options['kind'], chunk_size=options['chunk_size'])
+
+        started = time.monotonic()
+        try:
+            if path == '-':
+                written = importer.run(read_rows(sys.stdin, fmt))
+            else:
+                with Path(path).open(newline='', encoding='utf-8') as stream:
+                    written = importer.run(read_rows(stream, fmt))
+        except FileNotFoundError:
+            raise CommandError(f'No such file: {path}')
+        except IntegrityError as exc:
+            raise CommandError(f'Import stopped, a chunk violated a constraint: {exc}')
+        importer.finish()
+        elapsed = time.monotonic() - started
+
+        for line_number, error in importer.errors[:options['max_errors']]:
+            self.stderr.write(f'line {line_number}: {error}')
+        if len(importer.errors) > options['max_errors']:
+            self.stderr.write(f'... and {len(importer.errors) - options["max_errors"]} more')
+
+        rate = written / elapsed if elapsed else written
+        self.stdout.write(
+            f'{written} {options["kind"]} rows written, {len(importer.errors)} skipped '
+            f'in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        )
+        self.stdout.write(self.style.SUCCESS('Catalog import finished.'))
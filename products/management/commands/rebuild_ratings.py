@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import Product, ProductReview
+from services.models import Service, Therapist, ServiceReview
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored rating totals for products, services and therapists from their reviews'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Product.rebuild_ratings(ProductReview.objects.filter(is_approved=True), 'product')
+            Service.rebuild_ratings(ServiceReview.objects.all(), 'service')
+            Therapist.rebuild_ratings(ServiceReview.objects.all(), 'therapist')
+
+        for model in (Product, Service, Therapist):
+            rated = model.objects.filter(rating_count__gt=0).count()
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {rated} rated')
+        self.stdout.write(self.style.SUCCESS('Successfully rebuilt rating totals.'))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.2 on 2026-10-17 02:27
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductReview = apps.get_model('products', 'ProductReview')
+    per_product = ProductReview.objects.filter(
+        is_approved=True, product=OuterRef('pk')
+    ).order_by().values('product')
+    Product.objects.update(
+        rating_sum=Coalesce(Subquery(per_product.annotate(total=Sum('rating')).values('total')), 0),
+        rating_count=Coalesce(Subquery(per_product.annotate(total=Count('pk')).values('total')), 0),
+    )
+    Product.objects.update(average_rating=Case(
+        When(rating_count__gt=0, then=Cast('rating_sum', FloatField()) / F('rating_count')),
+        default=Value(0.0),
+        output_field=FloatField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_category_image_alter_maincategory_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='average_rating',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
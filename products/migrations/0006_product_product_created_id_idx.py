@@ -0,0 +1,17 @@
+# Generated by Django 5.2.2 on 2026-10-17 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_average_rating_product_rating_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+        ),
+    ]
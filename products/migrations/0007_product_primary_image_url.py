@@ -0,0 +1,57 @@
+# Generated by Django 5.2.2 on 2026-10-17 02:37
+
+from django.db import migrations, models
+
+
+# Frozen copy of products.images at the time of this migration
+IMAGE_VARIANTS = {
+    'thumb': '-/scale_crop/160x160/smart/-/format/auto/-/quality/smart/',
+    'card': '-/resize/480x/-/format/auto/-/quality/smart/',
+    'zoom': '-/resize/1600x/-/format/auto/-/quality/smart/',
+}
+
+
+def image_fields(image):
+    if not image:
+        return '', {}
+    cdn_url = getattr(image, 'cdn_url', None)
+    if cdn_url:
+        if not cdn_url.endswith('/'):
+            cdn_url += '/'
+        return cdn_url, {name: cdn_url + operations for name, operations in IMAGE_VARIANTS.items()}
+    url = getattr(image, 'url', None) or str(image)
+    return url, dict.fromkeys(IMAGE_VARIANTS, url)
+
+
+def backfill_primary_images(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+    primary = {}
+    for image in ProductImage.objects.filter(is_primary=True).order_by('order', 'id'):
+        primary.setdefault(image.product_id, image.image)
+    products = []
+    for product_id, image in primary.items():
+        url, variants = image_fields(image)
+        products.append(Product(pk=product_id, primary_image_url=url, image_variants=variants))
+    Product.objects.bulk_update(products, ['primary_image_url', 'image_variants'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_product_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_primary_images, migrations.RunPython.noop),
+    ]
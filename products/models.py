@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import Prefetch
 from pyuploadcare.dj.models import ImageField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from core.models import RatedModel
 
 User = get_user_model()
 
@@ -71,7 +73,27 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class Product(models.Model):
+class ProductQuerySet(models.QuerySet):
+    """Catalog query helpers so list endpoints render without per-row queries"""
+
+    def with_categories(self):
+        return self.select_related('category', 'main_category', 'sub_category')
+
+    def with_images(self):
+        return self.prefetch_related(
+            Prefetch('images', queryset=ProductImage.objects.order_by('order', 'id'))
+        )
+
+    def for_listing(self):
+        """Everything ProductListSerializer reads"""
+        return self.with_categories().with_images()
+
+    def for_simple(self):
+        """Everything ProductSimpleSerializer reads"""
+        return self.with_categories()
+
+
+class Product(RatedModel):
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
@@ -116,13 +138,22 @@ class Product(models.Model):
     # Uploadcare image field
     from pyuploadcare.dj.models import ImageField
     image = ImageField(blank=True, manual_crop='')
+
+    # Copied from the primary ProductImage by products.images, don't edit by hand
+    primary_image_url = models.URLField(max_length=500, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -178,6 +209,10 @@ class ProductVariant(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.name}: {self.value}"
 
+    @property
+    def price(self):
+        return self.product.price + self.price_adjustment
+
 class ProductReview(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
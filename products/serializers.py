@@ -1,9 +1,26 @@
 from rest_framework import serializers
+from core.sparse import SparseFieldsetMixin
 from .models import (
     MainCategory, SubCategory, Category, Product, ProductImage, 
     ProductVariant, ProductReview, Wishlist
 )
 
+def image_url(image_field, request=None):
+    # Works for both Uploadcare (cdn_url) and regular Django ImageField (url)
+    url = getattr(image_field, 'cdn_url', None) or getattr(image_field, 'url', None) or str(image_field)
+    if request and url:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def primary_image_url(product, request=None):
+    # Stored on the product by products.images, no query needed
+    url = product.primary_image_url
+    if request and url:
+        return request.build_absolute_uri(url)
+    return url or None
+
+
 # ------------------------------
 # CATEGORY SERIALIZERS
 # ------------------------------
@@ -19,9 +36,13 @@ class MainCategorySerializer(serializers.ModelSerializer):
         ]
     
     def get_subcategory_count(self, obj):
+        if hasattr(obj, 'active_subcategory_count'):
+            return obj.active_subcategory_count
         return obj.subcategories.filter(is_active=True).count()
     
     def get_product_count(self, obj):
+        if hasattr(obj, 'active_product_count'):
+            return obj.active_product_count
         return obj.products.filter(is_active=True).count()
 
 
@@ -37,6 +58,8 @@ class SubCategorySerializer(serializers.ModelSerializer):
         ]
     
     def get_product_count(self, obj):
+        if hasattr(obj, 'active_product_count'):
+            return obj.active_product_count
         return obj.products.filter(is_active=True).count()
 
 
@@ -48,6 +71,8 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'image', 'product_count']
     
     def get_product_count(self, obj):
+        if hasattr(obj, 'active_product_count'):
+            return obj.active_product_count
         return obj.products.filter(is_active=True).count()
 
 
@@ -62,18 +87,9 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image', 'alt_text', 'is_primary', 'order']
 
     def get_image(self, obj):
-        request = self.context.get('request')
-        image_field = obj.image
-
-        if not image_field:
+        if not obj.image:
             return None
-
-        # Works for both Uploadcare (cdn_url) and regular Django ImageField (url)
-        image_url = getattr(image_field, 'cdn_url', None) or getattr(image_field, 'url', None) or str(image_field)
-
-        if request and image_url:
-            return request.build_absolute_uri(image_url)
-        return image_url
+        return image_url(obj.image, self.context.get('request'))
 
 
 # ------------------------------
@@ -100,7 +116,7 @@ class ProductReviewSerializer(serializers.ModelSerializer):
 # ------------------------------
 # PRODUCT LIST SERIALIZER
 # ------------------------------
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     main_category_name = serializers.CharField(source='main_category.name', read_only=True)
     sub_category_name = serializers.CharField(source='sub_category.name', read_only=True)
@@ -108,7 +124,7 @@ class ProductListSerializer(serializers.ModelSerializer):
     primary_image = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
     
     class Meta:
         model = Product
@@ -116,39 +132,29 @@ class ProductListSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'short_description', 'category_name', 
             'main_category_name', 'sub_category_name', 'page',
             'price', 'original_price', 'discount_percentage',
-            'primary_image', 'images',
+            'primary_image', 'image_variants', 'images',
             'is_featured', 'is_exclusive', 'is_limited_edition',
             'is_bestseller', 'is_new_arrival', 'is_in_stock',
             'is_on_sale', 'average_rating', 'review_count'
         ]
+        field_dependencies = {
+            'primary_image': ['primary_image_url'],
+            'average_rating': ['average_rating'],
+            'is_in_stock': ['stock_quantity'],
+            'is_on_sale': ['price', 'original_price'],
+        }
     
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if not primary_image:
-            return None
-
-        image_field = primary_image.image
-        image_url = getattr(image_field, 'cdn_url', None) or getattr(image_field, 'url', None) or str(image_field)
-
-        request = self.context.get('request')
-        if request and image_url:
-            return request.build_absolute_uri(image_url)
-        return image_url
+        return primary_image_url(obj, self.context.get('request'))
 
     def get_average_rating(self, obj):
-        reviews = obj.reviews.filter(is_approved=True)
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        return 0
-
-    def get_review_count(self, obj):
-        return obj.reviews.filter(is_approved=True).count()
+        return round(float(obj.average_rating), 1)
 
 
 # ------------------------------
 # PRODUCT DETAIL SERIALIZER
 # ------------------------------
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     main_category = MainCategorySerializer(read_only=True)
     sub_category = SubCategorySerializer(read_only=True)
@@ -156,7 +162,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     variants = ProductVariantSerializer(many=True, read_only=True)
     reviews = ProductReviewSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
     
     class Meta:
         model = Product
@@ -170,15 +176,16 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'meta_title', 'meta_description', 'images', 'variants',
             'reviews', 'average_rating', 'review_count', 'created_at', 'updated_at'
         ]
+        expandable_fields = ['category', 'main_category', 'sub_category', 'reviews']
+        field_dependencies = {
+            'average_rating': ['average_rating'],
+            'is_in_stock': ['stock_quantity'],
+            'is_on_sale': ['price', 'original_price'],
+            'is_low_stock': ['stock_quantity', 'low_stock_threshold'],
+        }
     
     def get_average_rating(self, obj):
-        reviews = obj.reviews.filter(is_approved=True)
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        return 0
-    
-    def get_review_count(self, obj):
-        return obj.reviews.filter(is_approved=True).count()
+        return round(float(obj.average_rating), 1)
 
 
 # ------------------------------
@@ -204,18 +211,8 @@ class ProductSimpleSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'name', 'slug', 'category_name',
-            'price', 'primary_image', 'is_in_stock'
+            'price', 'primary_image', 'image_variants', 'is_in_stock'
         ]
     
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if not primary_image:
-            return None
-
-        image_field = primary_image.image
-        image_url = getattr(image_field, 'cdn_url', None) or getattr(image_field, 'url', None) or str(image_field)
-
-        request = self.context.get('request')
-        if request and image_url:
-            return request.build_absolute_uri(image_url)
-        return image_url
+        return primary_image_url(obj, self.context.get('request'))
@@ -0,0 +1,41 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .images import refresh_primary_images
+from .models import Product, ProductImage, ProductReview
+
+
+def review_contribution(product_id, rating, is_approved):
+    """What a review adds to its product's stored rating totals"""
+    if not is_approved:
+        return {}
+    return {product_id: {'rating_sum': rating, 'rating_count': 1}}
+
+
+@receiver(pre_save, sender=ProductReview)
+def remember_review_state(sender, instance, **kwargs):
+    instance._rating_before = {}
+    if instance.pk:
+        row = sender.objects.filter(pk=instance.pk).values('product_id', 'rating', 'is_approved').first()
+        if row:
+            instance._rating_before = review_contribution(row['product_id'], row['rating'], row['is_approved'])
+
+
+@receiver(post_save, sender=ProductReview)
+def update_product_rating(sender, instance, **kwargs):
+    Product.apply_rating_changes(
+        getattr(instance, '_rating_before', {}),
+        review_contribution(instance.product_id, instance.rating, instance.is_approved),
+    )
+
+
+@receiver(post_delete, sender=ProductReview)
+def remove_product_rating(sender, instance, **kwargs):
+    Product.apply_rating_changes(
+        review_contribution(instance.product_id, instance.rating, instance.is_approved), {}
+    )
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def update_primary_image(sender, instance, **kwargs):
+    refresh_primary_images([instance.product_id])
@@ -0,0 +1,338 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from core.pagination import KeysetPagination
+from cart.models import Cart, CartItem
+from orders.models import Order, OrderItem
+
+from .catalog_io import KINDS, CatalogImporter, RowWriter, export_rows, read_rows
+from .models import Category, MainCategory, Product, ProductImage, ProductReview, SubCategory, Wishlist
+
+
+class CatalogTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='shopper@example.com', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.products = []
+
+    def add_products(self, count, featured=True):
+        """count products, each in its own categories and with two images"""
+        for _ in range(count):
+            number = len(self.products)
+            main = MainCategory.objects.create(name=f'Main {number}', slug=f'main-{number}', page='boutique')
+            product = Product.objects.create(
+                name=f'Product {number}', slug=f'product-{number}', sku=f'SKU{number}', description='-',
+                price=Decimal('10.00'), stock_quantity=5, is_featured=featured,
+                main_category=main,
+                sub_category=SubCategory.objects.create(main_category=main, name=f'Sub {number}', slug=f'sub-{number}'),
+                category=Category.objects.create(name=f'Category {number}', slug=f'category-{number}'),
+            )
+            for order in range(2):
+                ProductImage.objects.create(product=product, image='', is_primary=not order, order=order)
+            self.products.append(product)
+        return self.products
+
+
+class ProductQueryCountTests(CatalogTestCase):
+    """List endpoints run the same queries for one product as for many"""
+
+    def assertConstantQueries(self, queries, fetch, **kwargs):
+        self.add_products(1, **kwargs)
+        with self.assertNumQueries(queries):
+            single = fetch()
+        self.add_products(4, **kwargs)
+        cache.clear()
+        with self.assertNumQueries(queries):
+            several = fetch()
+        return single, several
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_product_list(self):
+        # versions, count, products, images
+        single, several = self.assertConstantQueries(4, lambda: self.get('/api/products/'))
+        self.assertEqual((single['count'], several['count']), (1, 5))
+        self.assertEqual(len(several['results'][0]['images']), 2)
+
+    def test_featured_products(self):
+        single, several = self.assertConstantQueries(4, lambda: self.get('/api/products/featured/'))
+        self.assertEqual((single['count'], several['count']), (1, 5))
+
+    def test_product_search(self):
+        # count, products, images
+        single, several = self.assertConstantQueries(3, lambda: self.get('/api/products/search/'))
+        self.assertEqual((single['count'], several['count']), (1, 5))
+
+    def test_wishlist(self):
+        self.client.force_authenticate(self.user)
+        self.add_products(1)
+        Wishlist.objects.create(user=self.user, product=self.products[0])
+        with self.assertNumQueries(4):  # count, wishlist rows, products, images
+            single = self.get('/api/products/wishlist/')
+        self.add_products(4)
+        for product in self.products[1:]:
+            Wishlist.objects.create(user=self.user, product=product)
+        with self.assertNumQueries(4):
+            several = self.get('/api/products/wishlist/')
+        self.assertEqual((len(single['results']), len(several['results'])), (1, 5))
+
+
+class ProductSimpleQueryCountTests(CatalogTestCase):
+    """Cart and order pages render ProductSimpleSerializer without per-line queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        self.order = Order.objects.create(
+            user=self.user, subtotal=0, total_amount=0,
+            **{f'{kind}_{name}': '-' for kind in ('shipping', 'billing') for name in [
+                'first_name', 'last_name', 'email', 'phone', 'address_line_1', 'city', 'state', 'postal_code',
+            ]},
+        )
+
+    def add_lines(self, count):
+        for product in self.add_products(count)[-count:]:
+            CartItem.objects.create(cart=self.cart, product=product, quantity=1)
+            OrderItem.objects.create(
+                order=self.order, product=product, quantity=1, unit_price=product.price, total_price=product.price,
+            )
+
+    def assertConstantQueries(self, url, queries):
+        self.add_lines(1)
+        with self.assertNumQueries(queries):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_lines(4)
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cart(self):
+        data = self.assertConstantQueries('/api/cart/', 3)  # cart, items, products with their categories
+        self.assertEqual(len(data['items']), 5)
+
+    def test_orders(self):
+        # count, orders, items, products with their categories, the user's profile
+        data = self.assertConstantQueries('/api/orders/', 5)
+        self.assertEqual(len(data['results'][0]['items']), 5)
+
+    def test_sparse_orders(self):
+        self.add_lines(2)
+        with self.assertNumQueries(3):  # count, orders, item ids
+            response = self.client.get('/api/orders/', {'fields': 'id,items'})
+        self.assertEqual(response.data['results'][0], {
+            'id': self.order.pk, 'items': list(self.order.items.values_list('pk', flat=True)),
+        })
+        response = self.client.get('/api/orders/', {'fields': 'id,items', 'expand': 'items'})
+        self.assertEqual(response.data['results'][0]['items'][0]['product']['name'], 'Product 0')
+
+
+class ProductFacetsTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_products(3)
+        Product.objects.filter(pk=self.products[0].pk).update(price=Decimal('3000.00'), is_bestseller=True)
+        Product.objects.filter(pk=self.products[1].pk).update(main_category=self.products[2].main_category)
+
+    def facets(self, **params):
+        response = self.client.get('/api/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_come_from_one_grouped_query(self):
+        with self.assertNumQueries(2):  # versions, the grouped query
+            facets = self.facets()
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual([main['count'] for main in facets['main_categories']], [2, 1])
+        self.assertEqual(facets['flags']['is_bestseller'], 1)
+        self.assertEqual([bucket['count'] for bucket in facets['price_ranges']], [2, 0, 1, 0, 0])
+
+    def test_filters_and_cache(self):
+        main = self.products[2].main_category_id
+        self.assertEqual(self.facets(main_category=main)['total'], 2)
+        self.assertEqual(self.facets()['total'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name='New', slug='new', sku='NEW', description='-', price=Decimal('5.00'), main_category_id=main,
+            )
+        # The new product bumped the catalog version
+        self.assertEqual(self.facets(main_category=main)['total'], 3)
+
+    def test_cache_hit_skips_the_filters(self):
+        main = self.products[2].main_category_id
+        self.facets(main_category=main)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.facets(main_category=main)['total'], 2)
+
+
+class ResponseCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_products(1)
+
+    def test_json_hits_keep_the_vary_header(self):
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'MISS')
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertIn('Authorization', response['Vary'])
+        self.assertIn('Accept', response['Vary'])
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            response = self.client.get('/api/services/categories/', HTTP_ACCEPT='text/html')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Cache', response)
+        self.assertEqual(self.client.get('/api/services/categories/')['X-Cache'], 'MISS')
+
+
+class ProductRatingTests(CatalogTestCase):
+    def assertRating(self, rating_sum, rating_count, average):
+        product = Product.objects.get(pk=self.products[0].pk)
+        self.assertEqual((product.rating_sum, product.rating_count), (rating_sum, rating_count))
+        self.assertEqual(product.average_rating, Decimal(average))
+
+    def test_totals_follow_review_edits(self):
+        self.add_products(1)
+        review = ProductReview.objects.create(product=self.products[0], user=self.user, rating=4, comment='-')
+        ProductReview.objects.create(
+            product=self.products[0], user=User.objects.create_user(email='b@example.com', password='secret'),
+            rating=5, comment='-',
+        )
+        self.assertRating(9, 2, '4.50')
+        review.rating = 2
+        review.save()
+        self.assertRating(7, 2, '3.50')
+        review.is_approved = False
+        review.save()
+        self.assertRating(5, 1, '5.00')
+        review.delete()
+        self.assertRating(5, 1, '5.00')
+
+
+@mock.patch.object(KeysetPagination, 'page_size', 2)
+class KeysetPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_products(5)
+
+    def page(self, url='/api/products/', **params):
+        response = self.client.get(url, {'pagination': 'cursor', **params})
+        return response.status_code, response.json()
+
+    def test_pages_follow_the_cursor(self):
+        newest_first = [product.pk for product in reversed(self.products)]
+        status, first = self.page()
+        self.assertEqual(status, 200)
+        self.assertEqual([row['id'] for row in first['results']], newest_first[:2])
+        self.assertTrue(first['has_next'])
+        self.assertNotIn('count', first)
+
+        # A product added meanwhile doesn't shift the pages that follow
+        self.add_products(1)
+        cache.clear()
+        seen = [row['id'] for row in first['results']]
+        url = first['next']
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.json()['results']]
+            url = response.json()['next']
+        self.assertEqual(seen, newest_first)
+
+    def test_other_orderings_are_refused(self):
+        self.assertEqual(self.page(ordering='price')[0], 400)
+        self.assertEqual(self.page(search='product')[0], 400)
+        self.assertEqual(self.page(ordering='-created_at')[0], 200)
+        self.assertEqual(self.page(cursor='not-a-cursor')[0], 404)
+
+
+class SparseFieldsetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_products(3)
+
+    def test_fields_limit_the_list_and_its_queries(self):
+        with self.assertNumQueries(3):  # versions, count, products; no images
+            response = self.client.get('/api/products/', {'fields': 'id,name,is_in_stock'})
+        self.assertEqual(response.status_code, 200)
+        for row in response.data['results']:
+            self.assertEqual(set(row), {'id', 'name', 'is_in_stock'})
+            self.assertTrue(row['is_in_stock'])
+        unknown = self.client.get('/api/products/', {'fields': 'id,nope'}).data['results']
+        self.assertEqual(set(unknown[0]), {'id'})
+
+    def test_relations_are_ids_unless_expanded(self):
+        product = self.products[0]
+        url = f'/api/products/{product.slug}/'
+        self.assertEqual(self.client.get(url).data['category']['name'], product.category.name)
+
+        data = self.client.get(url, {'fields': 'id,category,sub_category'}).data
+        self.assertEqual(data, {'id': product.pk, 'category': product.category_id, 'sub_category': product.sub_category_id})
+
+        data = self.client.get(url, {'fields': 'id,category,sub_category', 'expand': 'category'}).data
+        self.assertEqual(data['category']['name'], product.category.name)
+        self.assertEqual(data['sub_category'], product.sub_category_id)
+
+
+class CatalogImportExportTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_products(3)
+
+    def export(self, kind, fmt):
+        stream = StringIO()
+        writer = RowWriter(stream, fmt, KINDS[kind].columns)
+        for row in export_rows(kind):
+            writer.write(row)
+        return stream.getvalue()
+
+    def load(self, kind, text, fmt):
+        importer = CatalogImporter(kind)
+        with self.captureOnCommitCallbacks(execute=True):
+            importer.run(read_rows(StringIO(text), fmt))
+            importer.finish()
+        return importer
+
+    def test_roundtrip(self):
+        for fmt in ('csv', 'jsonl'):
+            with self.subTest(fmt=fmt):
+                products, images = self.export('product', fmt), self.export('image', fmt)
+                Product.objects.filter(pk=self.products[0].pk).update(price=Decimal('99.00'), name='Changed')
+                ProductImage.objects.filter(product=self.products[1]).delete()
+
+                self.assertEqual(self.load('product', products, fmt).errors, [])
+                self.assertEqual(self.load('image', images, fmt).errors, [])
+                self.assertEqual(self.export('product', fmt), products)
+                self.assertEqual(ProductImage.objects.filter(product=self.products[1]).count(), 2)
+                self.assertEqual(Product.objects.count(), 3)
+
+    def test_bad_rows_are_reported_by_line(self):
+        good = '{"sku": "NEW1", "slug": "new-1", "name": "New", "description": "-", "price": "4.50"}'
+        text = '\n'.join([
+            good,
+            '{"sku": "NEW2", "slug": ',
+            '["not", "an", "object"]',
+            '',
+            '{"sku": "NEW3", "slug": "new-3", "name": "New", "description": "-", "price": "x"}',
+            '{"sku": "NEW4", "slug": "new-4", "name": "New", "description": "-", "price": "1", "category": "nope"}',
+        ])
+        importer = self.load('product', text, 'jsonl')
+        self.assertEqual(importer.written, 1)
+        self.assertEqual([line for line, _ in importer.errors], [2, 3, 5, 6])
+        self.assertIn('invalid JSON', str(importer.errors[0][1]))
+        self.assertTrue(Product.objects.filter(sku='NEW1', price=Decimal('4.50')).exists())
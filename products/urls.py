@@ -4,6 +4,7 @@ from .views import (
     SubCategoryListView,
     CategoryListView,
     ProductListView,
+    ProductFacetsView,
     ProductDetailView,
     FeaturedProductsView,
     ProductReviewListCreateView,
@@ -19,6 +20,7 @@ urlpatterns = [
     path('sub-categories/', SubCategoryListView.as_view(), name='sub-category-list'),
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('', ProductListView.as_view(), name='product-list'),
+    path('facets/', ProductFacetsView.as_view(), name='product-facets'),
     path('featured/', FeaturedProductsView.as_view(), name='featured-products'),
     path('search/', product_search, name='product-search'),
     path('seed-subcategories/', seed_subcategories, name='seed-subcategories'),
@@ -2,7 +2,16 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from django.db.models import Count, Prefetch, Q
+from core.mixins import CachedResponseMixin, CatalogVersionMixin
+from core.pagination import KeysetPagination
+from core.sparse import SparseFieldsetViewMixin
+from search import engine as search_engine
+from search.filters import RankedSearchFilter
+from search.models import SearchKind
+from .facets import cached_facets, normalize_params
 from .models import MainCategory, SubCategory, Category, Product, ProductReview, Wishlist
 from .serializers import (
     MainCategorySerializer,
@@ -14,12 +23,17 @@ from .serializers import (
     WishlistSerializer
 )
 
-class MainCategoryListView(generics.ListAPIView):
-    queryset = MainCategory.objects.filter(is_active=True).order_by('page', 'order', 'name')
+class MainCategoryListView(CatalogVersionMixin, CachedResponseMixin, generics.ListAPIView):
+    catalog_groups = ('products',)
+    queryset = MainCategory.objects.filter(is_active=True).annotate(
+        active_subcategory_count=Count('subcategories', filter=Q(subcategories__is_active=True), distinct=True),
+        active_product_count=Count('products', filter=Q(products__is_active=True), distinct=True),
+    ).order_by('page', 'order', 'name')
     serializer_class = MainCategorySerializer
     permission_classes = [permissions.AllowAny]
 
-class SubCategoryListView(generics.ListAPIView):
+class SubCategoryListView(CatalogVersionMixin, CachedResponseMixin, generics.ListAPIView):
+    catalog_groups = ('products',)
     serializer_class = SubCategorySerializer
     permission_classes = [permissions.AllowAny]
     
@@ -27,7 +41,9 @@ class SubCategoryListView(generics.ListAPIView):
         main_category_id = self.request.query_params.get('main_category')
         page = self.request.query_params.get('page')
         
-        queryset = SubCategory.objects.filter(is_active=True)
+        queryset = SubCategory.objects.filter(is_active=True).select_related('main_category').annotate(
+            active_product_count=Count('products', filter=Q(products__is_active=True))
+        )
         
         if main_category_id:
             queryset = queryset.filter(main_category_id=main_category_id)
@@ -37,33 +53,59 @@ class SubCategoryListView(generics.ListAPIView):
             
         return queryset.order_by('main_category__order', 'order', 'name')
 
-class CategoryListView(generics.ListAPIView):
-    queryset = Category.objects.filter(is_active=True)
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
+    catalog_groups = ('products',)
+    queryset = Category.objects.filter(is_active=True).annotate(
+        active_product_count=Count('products', filter=Q(products__is_active=True))
+    )
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
-class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.filter(is_active=True)
+class ProductListView(CachedResponseMixin, SparseFieldsetViewMixin, generics.ListAPIView):
+    catalog_groups = ('products',)
+    queryset = Product.objects.for_listing().filter(is_active=True)
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter, RankedSearchFilter]
     filterset_fields = [
         'category', 'main_category', 'sub_category', 'sub_category__slug', 'main_category__page',
         'is_featured', 'is_digital', 'is_exclusive', 'is_limited_edition', 
         'is_bestseller', 'is_new_arrival'
     ]
-    search_fields = ['name', 'description', 'short_description', 'sku']
-    ordering_fields = ['name', 'price', 'created_at']
+    search_kind = SearchKind.PRODUCT
+    ordering_fields = ['name', 'price', 'average_rating', 'created_at']
     ordering = ['-created_at']
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductFacetsView(generics.GenericAPIView):
+    """
+    Sidebar counts for the products matching the same filters as ProductListView.
+    Not response-cached: the facets cache is keyed on the normalized filters,
+    so a hit needs neither the filters nor the response rebuilt.
+    """
     queryset = Product.objects.filter(is_active=True)
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter]
+    filterset_fields = ProductListView.filterset_fields
+    search_kind = SearchKind.PRODUCT
+
+    def get(self, request, *args, **kwargs):
+        allowed = list(self.filterset_fields) + [RankedSearchFilter.search_param]
+        normalized = normalize_params(request.query_params, allowed)
+        return Response(cached_facets(normalized, lambda: self.filter_queryset(self.get_queryset())))
+
+class ProductDetailView(CatalogVersionMixin, SparseFieldsetViewMixin, generics.RetrieveAPIView):
+    catalog_groups = ('products',)
+    queryset = Product.objects.for_listing().filter(is_active=True).prefetch_related(
+        'variants', Prefetch('reviews', queryset=ProductReview.objects.select_related('user'))
+    )
     serializer_class = ProductDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
 
-class FeaturedProductsView(generics.ListAPIView):
-    queryset = Product.objects.filter(is_active=True, is_featured=True)
+class FeaturedProductsView(CachedResponseMixin, SparseFieldsetViewMixin, generics.ListAPIView):
+    catalog_groups = ('products',)
+    queryset = Product.objects.for_listing().filter(is_active=True, is_featured=True)
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -84,7 +126,9 @@ class WishlistView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
+        return Wishlist.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('product', queryset=Product.objects.for_listing())
+        )
     
     def create(self, request, *args, **kwargs):
         product_id = request.data.get('product_id')
@@ -131,10 +175,12 @@ def product_search(request):
     min_price = request.GET.get('min_price', '')
     max_price = request.GET.get('max_price', '')
     
-    products = Product.objects.filter(is_active=True)
+    products = Product.objects.for_listing().filter(is_active=True)
     
     if query:
-        products = products.filter(name__icontains=query)
+        products = search_engine.search(products, SearchKind.PRODUCT, query)
+    else:
+        products = products.order_by('-created_at')
     
     if category:
         products = products.filter(category__slug=category)
@@ -145,8 +191,10 @@ def product_search(request):
     if max_price:
         products = products.filter(price__lte=max_price)
     
-    serializer = ProductListSerializer(products, many=True, context={'request': request})
-    return Response(serializer.data)
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(products, request)
+    serializer = ProductListSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])  # TODO: Change to admin only in production
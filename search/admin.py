@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'title', 'updated_at')
+    list_filter = ('kind',)
+    search_fields = ('title',)
+    readonly_fields = ('vector', 'updated_at')
@@ -0,0 +1,39 @@
+from products.models import Product
+from services.models import Service
+from . import engine
+from .models import SearchKind
+
+
+def _join(*parts):
+    return ' '.join(part for part in parts if part)
+
+
+def product_document(product):
+    return (
+        _join(product.name, product.sku),
+        _join(
+            product.short_description,
+            product.main_category.name if product.main_category_id else '',
+            product.sub_category.name if product.sub_category_id else '',
+            product.category.name if product.category_id else '',
+        ),
+        product.description,
+    )
+
+
+def service_document(service):
+    return (
+        service.name,
+        _join(service.short_description, service.category.name),
+        _join(service.description, service.benefits),
+    )
+
+
+engine.register(
+    SearchKind.PRODUCT, Product, product_document,
+    queryset=Product.objects.with_categories(),
+)
+engine.register(
+    SearchKind.SERVICE, Service, service_document,
+    queryset=Service.objects.select_related('category'),
+)
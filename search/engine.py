@@ -0,0 +1,174 @@
+"""
+Catalog search index.
+
+Each searchable object gets one SearchDocument holding its text split into
+three weight classes (title > summary > body). On PostgreSQL the document is
+stored as a weighted tsvector behind a GIN index and queried with SearchRank;
+elsewhere the same text is broken into an inverted index of SearchTerm rows
+and ranked by summed term weight. Both paths do prefix matching on the last
+query word so results stay useful while the user is still typing.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, When
+
+from .models import SearchDocument, SearchTerm
+
+SEARCH_CONFIG = 'english'
+TERM_WEIGHTS = {'title': 8, 'summary': 4, 'body': 1}
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+_registry = {}
+
+
+def register(kind, model, build_document, queryset=None):
+    """
+    Make a model searchable. build_document(obj) returns (title, summary, body);
+    queryset is what rebuilds iterate over (add select_related for the builder).
+    """
+    _registry[kind] = {
+        'model': model,
+        'build': build_document,
+        'queryset': queryset if queryset is not None else model.objects.all(),
+    }
+
+
+def kind_for_model(model):
+    for kind, spec in _registry.items():
+        if spec['model'] is model:
+            return kind
+    return None
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in re.findall(r'\w+', (text or '').lower())]
+
+
+def uses_full_text():
+    return connection.vendor == 'postgresql'
+
+
+def index_objects(kind, objects):
+    """Create or refresh the search documents of the given objects"""
+    build = _registry[kind]['build']
+    documents = []
+    for obj in objects:
+        title, summary, body = build(obj)
+        documents.append(SearchDocument(kind=kind, object_id=obj.pk, title=title, summary=summary, body=body))
+    if not documents:
+        return
+
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'summary', 'body', 'updated_at'],
+        )
+        stored = SearchDocument.objects.filter(kind=kind, object_id__in=[doc.object_id for doc in documents])
+        if uses_full_text():
+            stored.update(vector=(
+                SearchVector('title', weight='A', config=SEARCH_CONFIG)
+                + SearchVector('summary', weight='B', config=SEARCH_CONFIG)
+                + SearchVector('body', weight='C', config=SEARCH_CONFIG)
+            ))
+        else:
+            _write_terms(kind, stored)
+
+
+def _write_terms(kind, documents):
+    documents = list(documents)
+    SearchTerm.objects.filter(document__in=documents).delete()
+    terms = []
+    for document in documents:
+        weights = {}
+        for field, weight in TERM_WEIGHTS.items():
+            for token in set(tokenize(getattr(document, field))):
+                weights[token] = weights.get(token, 0) + weight
+        terms.extend(
+            SearchTerm(document=document, kind=kind, term=token, weight=weight)
+            for token, weight in weights.items()
+        )
+    SearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def remove_objects(kind, object_ids):
+    SearchDocument.objects.filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+
+def reindex(kind, condition=None, chunk_size=500):
+    """Refresh the documents of the kind's objects matching condition (a Q, default all), returns the count"""
+    queryset = _registry[kind]['queryset']
+    if condition is not None:
+        queryset = queryset.filter(condition)
+    indexed = 0
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            index_objects(kind, chunk)
+            indexed += len(chunk)
+            chunk = []
+    index_objects(kind, chunk)
+    indexed += len(chunk)
+    return indexed
+
+
+def rebuild(kind, chunk_size=500):
+    """Reindex every object of a kind and drop documents of deleted objects, returns the count"""
+    indexed = reindex(kind, chunk_size=chunk_size)
+    live_ids = _registry[kind]['model'].objects.values('pk')
+    SearchDocument.objects.filter(kind=kind).exclude(object_id__in=live_ids).delete()
+    return indexed
+
+
+def _matching_documents(kind, tokens):
+    """Documents matching every token (the last one as a prefix), annotated with object_id and rank"""
+    if uses_full_text():
+        query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=SEARCH_CONFIG
+        )
+        return (
+            SearchDocument.objects.filter(kind=kind, vector=query)
+            .annotate(rank=SearchRank(F('vector'), query))
+            .values('object_id', 'rank')
+        )
+
+    *words, prefix = tokens
+    conditions = [Q(term=word) for word in words]
+    # A range instead of LIKE so the (kind, term) index is used on every backend
+    conditions.append(Q(term__gte=prefix, term__lt=prefix + '\uffff'))
+    hits = {
+        f'hit_{i}': Max(Case(When(condition, then=1), default=0, output_field=IntegerField()))
+        for i, condition in enumerate(conditions)
+    }
+    return (
+        SearchTerm.objects.filter(kind=kind)
+        .filter(reduce(or_, conditions))
+        .values(object_id=F('document__object_id'))
+        .annotate(rank=Sum('weight'), **hits)
+        .filter(**{name: 1 for name in hits})
+        .values('object_id', 'rank')
+    )
+
+
+def search(queryset, kind, text, order=True):
+    """
+    Narrow a queryset of the kind's model to objects matching text, annotated
+    with search_rank and (unless order=False) sorted best match first.
+    """
+    tokens = tokenize(text)[:MAX_QUERY_TERMS]
+    if not tokens:
+        return queryset.none()
+
+    matches = _matching_documents(kind, tokens)
+    rank = matches.filter(object_id=OuterRef('pk')).values('rank')[:1]
+    queryset = queryset.filter(pk__in=matches.values('object_id')).annotate(search_rank=Subquery(rank))
+    if order:
+        queryset = queryset.order_by('-search_rank', '-pk')
+    return queryset
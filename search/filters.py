@@ -0,0 +1,20 @@
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+from . import engine
+
+
+class RankedSearchFilter(SearchFilter):
+    """
+    SearchFilter backed by the precomputed search index instead of icontains
+    scans. Set search_kind on the view. Results are ordered by relevance
+    unless the request asks for an explicit ordering, so place this backend
+    after OrderingFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        kind = getattr(view, 'search_kind', None)
+        terms = ' '.join(self.get_search_terms(request))
+        if not kind or not terms:
+            return super().filter_queryset(request, queryset, view)
+        explicit_ordering = bool(request.query_params.get(api_settings.ORDERING_PARAM))
+        return engine.search(queryset, kind, terms, order=not explicit_ordering)
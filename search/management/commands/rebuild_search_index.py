@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from search import engine
+from search.models import SearchKind
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product and service search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', choices=SearchKind.values, action='append',
+            help='Only rebuild this kind (repeatable); defaults to all'
+        )
+
+    def handle(self, *args, **options):
+        for kind in options['kind'] or SearchKind.values:
+            count = engine.rebuild(kind)
+            self.stdout.write(f'Indexed {count} {kind} documents')
+        self.stdout.write(self.style.SUCCESS('Successfully rebuilt the search index.'))
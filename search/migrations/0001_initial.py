@@ -0,0 +1,60 @@
+# Generated by Django 5.2.2 on 2026-10-17 02:29
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_vector_index(apps, schema_editor):
+    # GIN is PostgreSQL-only; other backends search through SearchTerm instead
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX search_document_vector_gin ON search_searchdocument USING gin (vector)'
+        )
+
+
+def drop_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_document_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('service', 'Service')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.TextField(help_text='Highest weight: name, SKU')),
+                ('summary', models.TextField(blank=True, help_text='Medium weight: short description, categories')),
+                ('body', models.TextField(blank=True, help_text='Lowest weight: full description')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('service', 'Service')], max_length=20)),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='search.searchdocument')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term'], name='search_sear_kind_f96ccd_idx')],
+                'unique_together': {('document', 'term')},
+            },
+        ),
+        migrations.RunPython(create_vector_index, drop_vector_index),
+    ]
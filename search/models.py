@@ -0,0 +1,40 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchKind(models.TextChoices):
+    PRODUCT = 'product', 'Product'
+    SERVICE = 'service', 'Service'
+
+
+class SearchDocument(models.Model):
+    """Precomputed search text for one catalog object, split by ranking weight"""
+    kind = models.CharField(max_length=20, choices=SearchKind.choices)
+    object_id = models.PositiveBigIntegerField()
+    title = models.TextField(help_text="Highest weight: name, SKU")
+    summary = models.TextField(blank=True, help_text="Medium weight: short description, categories")
+    body = models.TextField(blank=True, help_text="Lowest weight: full description")
+    # tsvector of title/summary/body, only maintained on PostgreSQL (GIN indexed)
+    vector = SearchVectorField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}: {self.title}"
+
+
+class SearchTerm(models.Model):
+    """Inverted index used on databases without full-text search (SQLite)"""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='terms')
+    kind = models.CharField(max_length=20, choices=SearchKind.choices)
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ['document', 'term']
+        indexes = [models.Index(fields=['kind', 'term'])]
+
+    def __str__(self):
+        return f"{self.term} ({self.weight})"
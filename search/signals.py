@@ -0,0 +1,46 @@
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from products.models import Category, MainCategory, Product, SubCategory
+from services.models import Service, ServiceCategory
+from . import documents, engine
+from .models import SearchKind
+
+# Category models whose name is part of other objects' documents: (kind, lookup to the category)
+CATEGORY_LOOKUPS = {
+    MainCategory: (SearchKind.PRODUCT, 'main_category'),
+    SubCategory: (SearchKind.PRODUCT, 'sub_category'),
+    Category: (SearchKind.PRODUCT, 'category'),
+    ServiceCategory: (SearchKind.SERVICE, 'category'),
+}
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Service)
+def index_catalog_object(sender, instance, **kwargs):
+    engine.index_objects(engine.kind_for_model(sender), [instance])
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Service)
+def unindex_catalog_object(sender, instance, **kwargs):
+    engine.remove_objects(engine.kind_for_model(sender), [instance.pk])
+
+
+def remember_category_name(sender, instance, raw=False, **kwargs):
+    instance._name_before = None
+    if instance.pk and not raw:
+        instance._name_before = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+def reindex_category_objects(sender, instance, created=False, raw=False, **kwargs):
+    """A renamed category changes the documents of everything filed under it"""
+    if created or raw or getattr(instance, '_name_before', None) == instance.name:
+        return
+    kind, lookup = CATEGORY_LOOKUPS[sender]
+    engine.reindex(kind, Q(**{lookup: instance.pk}))
+
+
+for category_model in CATEGORY_LOOKUPS:
+    pre_save.connect(remember_category_name, sender=category_model)
+    post_save.connect(reindex_category_objects, sender=category_model)
@@ -0,0 +1,72 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from products.models import Category, Product
+from services.models import Service, ServiceCategory
+
+from . import engine
+from .models import SearchDocument, SearchKind
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Fragrance', slug='fragrance')
+        cls.rose = cls.product('Rose Oil', 'A light floral oil.')
+        cls.musk = cls.product('Amber Musk', 'Warm musk with a hint of rose.')
+        cls.candle = cls.product('Vanilla Candle', 'Soy wax candle.')
+
+    @classmethod
+    def product(cls, name, description):
+        return Product.objects.create(
+            name=name, slug=name.lower().replace(' ', '-'), sku=name.upper().replace(' ', ''),
+            description=description, price=Decimal('10.00'), category=cls.category,
+        )
+
+    def search(self, text):
+        return list(engine.search(Product.objects.all(), SearchKind.PRODUCT, text))
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('rose'), [self.rose, self.musk])
+        self.assertEqual(self.search('ros'), [self.rose, self.musk])  # the last word is a prefix
+        self.assertEqual(self.search('rose musk'), [self.musk])
+        self.assertEqual(self.search('   '), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.candle.name = 'Rosewood Candle'
+        self.candle.save()
+        self.assertIn(self.candle, self.search('rosewood'))
+        self.candle.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind=SearchKind.PRODUCT, object_id=self.candle.pk).exists())
+
+    def test_category_rename_reindexes_its_products(self):
+        self.assertEqual(self.search('perfume'), [])
+        self.category.name = 'Perfume'
+        self.category.save()
+        self.assertEqual(len(self.search('perfume')), 3)
+
+    def test_rebuild_drops_stale_documents(self):
+        # e.g. left behind by a raw delete that sent no signals
+        SearchDocument.objects.create(kind=SearchKind.PRODUCT, object_id=self.candle.pk + 100, title='ghost')
+        call_command('rebuild_search_index', kind=[SearchKind.PRODUCT], stdout=StringIO())
+        self.assertEqual(SearchDocument.objects.filter(kind=SearchKind.PRODUCT).count(), 3)
+
+    def test_search_endpoints_are_ranked_and_paginated(self):
+        response = APIClient().get('/api/products/search/', {'q': 'rose'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.rose.pk, self.musk.pk])
+
+        Service.objects.create(
+            name='Rose Facial', category=ServiceCategory.objects.create(name='Face'), description='-',
+            price=50, duration=45,
+        )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(email='client@example.com', password='secret'))
+        response = client.get('/api/services/search/', {'q': 'facial'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Rose Facial'])
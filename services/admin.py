@@ -20,7 +20,7 @@ class TherapistAvailabilityInline(admin.TabularInline):
 
 @admin.register(Therapist)
 class TherapistAdmin(admin.ModelAdmin):
-    list_display = ['user', 'experience_years', 'rating', 'hourly_rate', 'is_available']
+    list_display = ['user', 'experience_years', 'average_rating', 'hourly_rate', 'is_available']
     list_filter = ['is_available', 'experience_years', 'specializations', 'created_at']
     search_fields = ['user__first_name', 'user__last_name', 'user__email', 'bio']
     filter_horizontal = ['specializations']
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.2 on 2026-10-17 02:27
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    ServiceReview = apps.get_model('services', 'ServiceReview')
+    for model_name, target in (('Service', 'service'), ('Therapist', 'therapist')):
+        model = apps.get_model('services', model_name)
+        per_row = ServiceReview.objects.filter(**{target: OuterRef('pk')}).order_by().values(target)
+        model.objects.update(
+            rating_sum=Coalesce(Subquery(per_row.annotate(total=Sum('rating')).values('total')), 0),
+            rating_count=Coalesce(Subquery(per_row.annotate(total=Count('pk')).values('total')), 0),
+        )
+        model.objects.update(average_rating=Case(
+            When(rating_count__gt=0, then=Cast('rating_sum', FloatField()) / F('rating_count')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_service_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='average_rating',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='therapist',
+            name='average_rating',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='therapist',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='therapist',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import Count, Prefetch, Q
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from core.models import RatedModel
 
 User = get_user_model()
 
@@ -21,11 +23,13 @@ class ServiceCategory(models.Model):
         return self.name
 
 
-class Therapist(models.Model):
+class Therapist(RatedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     specializations = models.ManyToManyField(ServiceCategory, blank=True)
     bio = models.TextField(blank=True)
     experience_years = models.PositiveIntegerField(default=0)
+    # Entered by hand before reviews were counted, kept for its data; the API's
+    # rating is average_rating
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
     is_available = models.BooleanField(default=True)
@@ -39,10 +43,24 @@ class Therapist(models.Model):
 
     @property
     def total_reviews(self):
-        return self.servicereview_set.count()
+        return self.rating_count
 
 
-class Service(models.Model):
+class ServiceQuerySet(models.QuerySet):
+
+    def for_listing(self):
+        """Everything ServiceSerializer reads"""
+        return self.prefetch_related(
+            Prefetch('category', queryset=ServiceCategory.objects.annotate(
+                active_services_count=Count('services', filter=Q(services__is_active=True))
+            )),
+            Prefetch('therapists', queryset=Therapist.objects.select_related('user')),
+            'addons',
+            Prefetch('servicereview_set', queryset=ServiceReview.objects.select_related('therapist__user')),
+        )
+
+
+class Service(RatedModel):
     DURATION_CHOICES = [
         (30, '30 minutes'),
         (60, '1 hour'),
@@ -68,19 +86,14 @@ class Service(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ServiceQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
-    @property
-    def average_rating(self):
-        reviews = self.servicereview_set.all()
-        if reviews:
-            return sum([review.rating for review in reviews]) / len(reviews)
-        return 0
-
     @property
     def total_reviews(self):
-        return self.servicereview_set.count()
+        return self.rating_count
 
 
 class ServicePackage(models.Model):
@@ -4,6 +4,7 @@ from .models import (
     PackageService, ServiceAddon, TherapistAvailability, ServiceReview
 )
 from accounts.serializers import UserSerializer
+from core.sparse import SparseFieldsetMixin
 
 
 class ServiceCategorySerializer(serializers.ModelSerializer):
@@ -14,6 +15,8 @@ class ServiceCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'image', 'is_active', 'services_count', 'created_at']
 
     def get_services_count(self, obj):
+        if hasattr(obj, 'active_services_count'):
+            return obj.active_services_count
         return obj.services.filter(is_active=True).count()
 
 
@@ -29,6 +32,9 @@ class TherapistSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     specializations = ServiceCategorySerializer(many=True, read_only=True)
     availability = TherapistAvailabilitySerializer(many=True, read_only=True)
+    # Reviews drive average_rating, served under the old rating name too instead of the hand-entered column
+    rating = serializers.DecimalField(source='average_rating', max_digits=3, decimal_places=2, read_only=True)
+    average_rating = serializers.ReadOnlyField()
     total_reviews = serializers.ReadOnlyField()
 
     class Meta:
@@ -36,12 +42,13 @@ class TherapistSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'specializations', 'bio', 'experience_years', 
             'rating', 'hourly_rate', 'is_available', 'profile_image', 
-            'certifications', 'availability', 'total_reviews', 'created_at'
+            'certifications', 'availability', 'average_rating', 'total_reviews', 'created_at'
         ]
 
 
 class TherapistSimpleSerializer(serializers.ModelSerializer):
     name = serializers.CharField(source='user.get_full_name', read_only=True)
+    rating = serializers.DecimalField(source='average_rating', max_digits=3, decimal_places=2, read_only=True)
     
     class Meta:
         model = Therapist
@@ -63,7 +70,7 @@ class ServiceReviewSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'therapist', 'rating', 'comment', 'created_at']
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = ServiceCategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
     therapists = TherapistSimpleSerializer(many=True, read_only=True)
@@ -84,6 +91,10 @@ class ServiceSerializer(serializers.ModelSerializer):
             'image', 'benefits', 'preparation_notes', 'is_active', 'is_featured',
             'addons', 'average_rating', 'total_reviews', 'reviews', 'created_at'
         ]
+        expandable_fields = ['category', 'therapists', 'reviews']
+        field_dependencies = {
+            'total_reviews': ['rating_count'],
+        }
 
     def create(self, validated_data):
         therapist_ids = validated_data.pop('therapist_ids', [])
@@ -0,0 +1,43 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Service, Therapist, ServiceReview
+
+
+def review_contributions(row):
+    """What a review adds to the stored rating totals of its service and therapist"""
+    totals = {'rating_sum': row['rating'], 'rating_count': 1}
+    service = {row['service_id']: totals}
+    therapist = {row['therapist_id']: totals} if row['therapist_id'] else {}
+    return service, therapist
+
+
+def review_state(instance):
+    return {
+        'service_id': instance.service_id,
+        'therapist_id': instance.therapist_id,
+        'rating': instance.rating,
+    }
+
+
+@receiver(pre_save, sender=ServiceReview)
+def remember_review_state(sender, instance, **kwargs):
+    instance._rating_before = ({}, {})
+    if instance.pk:
+        row = sender.objects.filter(pk=instance.pk).values('service_id', 'therapist_id', 'rating').first()
+        if row:
+            instance._rating_before = review_contributions(row)
+
+
+@receiver(post_save, sender=ServiceReview)
+def update_service_rating(sender, instance, **kwargs):
+    service_before, therapist_before = getattr(instance, '_rating_before', ({}, {}))
+    service_after, therapist_after = review_contributions(review_state(instance))
+    Service.apply_rating_changes(service_before, service_after)
+    Therapist.apply_rating_changes(therapist_before, therapist_after)
+
+
+@receiver(post_delete, sender=ServiceReview)
+def remove_service_rating(sender, instance, **kwargs):
+    service, therapist = review_contributions(review_state(instance))
+    Service.apply_rating_changes(service, {})
+    Therapist.apply_rating_changes(therapist, {})
@@ -1,13 +1,18 @@
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg
+from django.db.models import Avg
 from .models import (
     ServiceCategory, Therapist, Service, ServicePackage, 
     ServiceAddon, TherapistAvailability, ServiceReview
 )
+from core.mixins import CachedResponseMixin, CatalogVersionMixin
+from core.sparse import SparseFieldsetViewMixin
+from search import engine as search_engine
+from search.models import SearchKind
 from .serializers import (
     ServiceCategorySerializer, TherapistSerializer, ServiceSerializer,
     ServicePackageSerializer, ServiceAddonSerializer, 
@@ -16,7 +21,9 @@ from .serializers import (
 )
 
 
-class ServiceCategoryListView(generics.ListCreateAPIView):
+class ServiceCategoryListView(CachedResponseMixin, generics.ListCreateAPIView):
+    catalog_groups = ('services',)
+    cache_authenticated = True
     queryset = ServiceCategory.objects.filter(is_active=True)
     serializer_class = ServiceCategorySerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -30,14 +37,26 @@ class ServiceCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ServiceCategorySerializer
 
 
+class TherapistOrderingFilter(filters.OrderingFilter):
+    """?ordering=rating sorts by average_rating, the value served as rating"""
+    aliases = {'rating': 'average_rating'}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view) or []
+        return [
+            ('-' if term.startswith('-') else '') + self.aliases.get(term.lstrip('-'), term.lstrip('-'))
+            for term in ordering
+        ]
+
+
 class TherapistListView(generics.ListCreateAPIView):
     queryset = Therapist.objects.filter(is_available=True)
     serializer_class = TherapistSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, TherapistOrderingFilter]
     filterset_fields = ['specializations', 'experience_years']
     search_fields = ['user__first_name', 'user__last_name', 'bio', 'certifications']
-    ordering_fields = ['rating', 'experience_years', 'created_at']
-    ordering = ['-rating']
+    ordering_fields = ['rating', 'average_rating', 'experience_years', 'created_at']
+    ordering = ['-average_rating']
 
 
 class TherapistDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -45,13 +64,16 @@ class TherapistDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TherapistSerializer
 
 
-class ServiceListView(generics.ListCreateAPIView):
-    queryset = Service.objects.filter(is_active=True)
+class ServiceListView(CatalogVersionMixin, CachedResponseMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
+    catalog_groups = ('services',)
+    # Output does not depend on who is asking, so logged-in reads share the cache
+    cache_authenticated = True
+    queryset = Service.objects.for_listing().filter(is_active=True)
     serializer_class = ServiceSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'duration', 'is_featured', 'therapists']
     search_fields = ['name', 'description', 'short_description', 'benefits']
-    ordering_fields = ['name', 'price', 'duration', 'created_at']
+    ordering_fields = ['name', 'price', 'duration', 'average_rating', 'created_at']
     ordering = ['name']
 
     def get_queryset(self):
@@ -74,13 +96,13 @@ class ServiceListView(generics.ListCreateAPIView):
         return queryset
 
 
-class ServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Service.objects.all()
+class ServiceDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Service.objects.for_listing()
     serializer_class = ServiceSerializer
 
 
-class FeaturedServicesView(generics.ListAPIView):
-    queryset = Service.objects.filter(is_active=True, is_featured=True)
+class FeaturedServicesView(SparseFieldsetViewMixin, generics.ListAPIView):
+    queryset = Service.objects.for_listing().filter(is_active=True, is_featured=True)
     serializer_class = ServiceSerializer
     ordering = ['-created_at']
 
@@ -173,12 +195,9 @@ def service_search(request):
     services = Service.objects.filter(is_active=True)
     
     if query:
-        services = services.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(category__name__icontains=query)
-        )
+        services = search_engine.search(services, SearchKind.SERVICE, query)
+    else:
+        services = services.order_by('name')
     
     if category:
         services = services.filter(category_id=category)
@@ -195,8 +214,10 @@ def service_search(request):
     if therapist:
         services = services.filter(therapists=therapist)
     
-    serializer = ServiceSerializer(services, many=True)
-    return Response(serializer.data)
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(services, request)
+    serializer = ServiceSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])